@@ -0,0 +1,111 @@
+"""
+Solves many maps at once, maps are spread over worker processes and results are written as JSON lines.
+
+    python batch.py generated/ 'maps/*.txt' --turns 1000 --workers 8 > results.jsonl
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from binary_map import EXTENSION, load_graph
+from main import save_princess, get_trace_distance, SEARCHES
+
+
+def expand_maps(patterns):
+    """
+    :param patterns: directories (every *.txt and binary map inside), glob patterns or map files
+    :return: sorted list of map files, without duplicates
+    """
+    files = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            files.update(glob.glob(os.path.join(pattern, '*.txt')))
+            files.update(glob.glob(os.path.join(pattern, '*' + EXTENSION)))
+        else:
+            files.update(glob.glob(pattern))
+    return sorted(files)
+
+
+def solve_map(file, max_turns, compact=False, tour='held_karp', search='dijkstra'):
+    """
+    Solves one map file, errors are returned in result instead of raised, so one broken map does not stop batch
+    :return: dictionary {'map': file, 'turns': turns, 'path': [[x, y], ...]} or {'map': file, 'error': message},
+        path is [] and turns is None if there is no solution
+    """
+    try:
+        graph = load_graph(file, compact)
+        path = save_princess(graph, max_turns, tour=tour, search=search)
+    except (OSError, ValueError) as e:      # unreadable, invalid or corrupt map, bugs are raised
+        return {'map': file, 'error': '{}: {}'.format(type(e).__name__, e)}
+    return {'map': file, 'turns': get_trace_distance(graph, path) if path else None,
+            'path': [[node.x, node.y] for node in path]}
+
+
+def _solve_chunk(files, max_turns, options):
+    return [solve_map(file, max_turns, **options) for file in files]
+
+
+def solve_maps(files, max_turns, workers=None, chunk_size=4, ordered=True, **options):
+    """
+    Solves maps in worker processes, maps are sent to workers in chunks to lower overhead of small maps
+    :param files: list of map files
+    :param max_turns: same as in save_princess
+    :param workers: number of processes, None for number of CPUs, 1 solves in this process
+    :param chunk_size: number of maps sent to worker at once
+    :param ordered: yield results in order of files, otherwise as soon as they are completed
+    :param options: compact, tour and search, same as in save_princess
+    :return: generator of results of solve_map
+    """
+    chunks = [files[i:i + chunk_size] for i in range(0, len(files), chunk_size)]
+    if workers == 1:
+        for chunk in chunks:
+            yield from _solve_chunk(chunk, max_turns, options)
+        return
+
+    with ProcessPoolExecutor(workers) as executor:
+        futures = [executor.submit(_solve_chunk, chunk, max_turns, options) for chunk in chunks]
+        for future in (futures if ordered else as_completed(futures)):
+            yield from future.result()
+
+
+def write_jsonl(results, f):
+    """
+    Writes every result on its own line as soon as it is available
+    :return: number of written results
+    """
+    count = 0
+    for result in results:
+        f.write(json.dumps(result) + '\n')
+        f.flush()
+        count += 1
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Save princesses on many maps in parallel.')
+    parser.add_argument('maps', nargs='+', help='map files, directories or glob patterns')
+    parser.add_argument('--turns', type=int, default=1000, help='dragon must be killed in less turns')
+    parser.add_argument('--workers', type=int, default=None, help='number of processes, default is number of CPUs')
+    parser.add_argument('--chunk-size', type=int, default=4, help='maps sent to worker at once')
+    parser.add_argument('--unordered', action='store_true', help='write results as soon as they are completed')
+    parser.add_argument('--compact', action='store_true', help='use CompactTerrainGraph')
+    parser.add_argument('--tour', default='held_karp', choices=('held_karp', 'permutations', 'anytime'))
+    parser.add_argument('--search', default='dijkstra', choices=SEARCHES)
+    parser.add_argument('--output', default=None, help='output file, default is standard output')
+    args = parser.parse_args(argv)
+
+    files = expand_maps(args.maps)
+    results = solve_maps(files, args.turns, args.workers, args.chunk_size, not args.unordered,
+                         compact=args.compact, tour=args.tour, search=args.search)
+    if args.output is None:
+        write_jsonl(results, sys.stdout)
+    else:
+        with open(args.output, 'w') as f:
+            write_jsonl(results, f)
+
+
+if __name__ == '__main__':
+    main()
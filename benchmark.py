@@ -0,0 +1,206 @@
+"""
+Benchmark suite over seeded generated maps, every case is same on every run so results can be compared.
+
+    python benchmark.py --sizes 20 100 500 1000 2000 --compact --output results.json
+    python benchmark.py --baseline results.json        # exits with 1 when some phase is slower than baseline
+
+Case names and results carry terrain_generator.VERSION, baseline of maps from other version of generator is refused
+(exit code 2), same case would be different map.
+"""
+import argparse
+import itertools
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from collections import namedtuple
+
+from main import TerrainGraph, CompactTerrainGraph, shortest_path_any, shortest_path_all, save_princess, SEARCHES
+from search_stats import SearchStats
+from terrain_generator import generate_random_terrain, VERSION as GENERATOR_VERSION
+
+Case = namedtuple('Case', ['size', 'princesses', 'teleport_density', 'generators', 'seed'])
+
+GENERATOR_PLACEMENTS = ('none', 'start', 'random')
+PHASES = ('build', 'shortest_path_any', 'shortest_path_all', 'save_princess')
+# fewer 'N' than in terrain_generator, so most of map is reachable and searches have work to do
+SYMBOLS_PROBABILITY = {'C': 10, 'H': 5, 'N': 3}
+
+
+def case_name(case):
+    return '{0}x{0}-p{1}-t{2}-g{3}-s{4}-v{5}'.format(*case, GENERATOR_VERSION)
+
+
+def generate_case(case):
+    """
+    :return: list of map lines, same for same case
+    """
+    rng = random.Random(case.seed)
+    terrain = generate_random_terrain(case.size, case.size, case.princesses, case.teleport_density,
+                                      case.generators == 'random', rng, SYMBOLS_PROBABILITY)
+    terrain = [list(line) for line in terrain]
+    if terrain[0][0] == 'N':    # start must be walkable
+        terrain[0][0] = 'C'
+    if case.generators == 'start' and case.size > 1 and terrain[0][1] not in 'DP':
+        terrain[0][1] = 'G'
+    return [''.join(line) for line in terrain]
+
+
+def cases(sizes, princesses, teleport_densities, generators, seed=0):
+    """
+    :return: list of Cases, every combination of parameters
+    """
+    return [Case(*parameters, seed) for parameters in itertools.product(sizes, princesses, teleport_densities,
+                                                                        generators)]
+
+
+def measure(function, repeat=1, memory=False, setup=None):
+    """
+    :param function: function without parameters, or with one when setup is given
+    :param repeat: best of repeat runs is taken
+    :param memory: run once more with tracemalloc to get peak memory, (tracing is slow, so it is not timed)
+    :param setup: function called before every run, it is not timed and its result is passed to function
+    :return: tuple (result, seconds, peak_bytes), result of last timed run, peak_bytes is None without memory
+    """
+    def arguments():
+        return () if setup is None else (setup(),)
+
+    seconds = None
+    result = None
+    for _ in range(repeat):
+        args = arguments()
+        started = time.perf_counter()
+        result = function(*args)
+        elapsed = time.perf_counter() - started
+        seconds = elapsed if seconds is None else min(seconds, elapsed)
+
+    peak = None
+    if memory:
+        args = arguments()
+        tracemalloc.start()
+        try:
+            function(*args)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return result, seconds, peak
+
+
+def run_case(case, compact=False, search='dijkstra', repeat=3, memory=False):
+    """
+    Times graph construction, shortest_path_any (start -> dragon), shortest_path_all (start -> princesses)
+    and save_princess separately
+    :return: dictionary {phase: {'seconds': s, 'peak_bytes': b, 'expansions': e}, ...}, expansions are states
+        settled by timed search (SearchStats 'expanded'), None for phases which are not single search
+    """
+    terrain = generate_case(case)
+    graph_class = CompactTerrainGraph if compact else TerrainGraph
+    graph, seconds, peak = measure(lambda: graph_class(terrain), repeat, memory)
+    results = {'build': {'seconds': seconds, 'peak_bytes': peak, 'expansions': None}}
+
+    def fresh_stats():
+        graph.planners.clear()      # 'lpa' keeps planners on graph, next run would be only update of warm one
+        return SearchStats()
+
+    start = graph.get_node(0, 0)
+    functions = {
+        'shortest_path_any': lambda stats: (shortest_path_any(start, {graph.dragon}, graph, search=search,
+                                                              stats=stats), stats),
+        'shortest_path_all': lambda stats: (shortest_path_all(start, set(graph.princesses), graph, search=search,
+                                                              stats=stats), stats),
+    }
+    for phase, function in functions.items():
+        (_, stats), seconds, peak = measure(function, repeat, memory, fresh_stats)
+        results[phase] = {'seconds': seconds, 'peak_bytes': peak, 'expansions': stats.counters['expanded']}
+
+    _, seconds, peak = measure(lambda _: save_princess(graph, sys.maxsize, search=search), repeat, memory,
+                               fresh_stats)
+    results['save_princess'] = {'seconds': seconds, 'peak_bytes': peak, 'expansions': None}
+    return results
+
+
+def run(case_list, compact=False, search='dijkstra', repeat=3, memory=False, verbose=False):
+    """
+    :return: dictionary with environment and {case name: result of run_case} under 'cases'
+    """
+    results = {
+        'python': platform.python_version(),
+        'generator_version': GENERATOR_VERSION,
+        'compact': compact,
+        'search': search,
+        'cases': {},
+    }
+    for case in case_list:
+        name = case_name(case)
+        results['cases'][name] = run_case(case, compact, search, repeat, memory)
+        if verbose:
+            print(name, ' '.join('{}={:.4f}s'.format(phase, results['cases'][name][phase]['seconds'])
+                                 for phase in PHASES), file=sys.stderr)
+    return results
+
+
+def compare(results, baseline, tolerance=0.25, min_seconds=0.01):
+    """
+    Finds phases which are slower than in baseline, cases missing in one of runs are skipped
+    :param tolerance: allowed slowdown, 0.25 means 25 %
+    :param min_seconds: phases faster than this in both runs are ignored, (too noisy)
+    :return: list of (case name, phase, baseline seconds, seconds) of slower phases
+    :raises ValueError: if maps of baseline were generated by other version of terrain generator
+    """
+    if baseline.get('generator_version') != results.get('generator_version'):
+        raise ValueError('Baseline maps are from terrain generator version {}, these are from version {}, '
+                         'run baseline again.'.format(baseline.get('generator_version'),
+                                                      results.get('generator_version')))
+    regressions = []
+    for name, phases in results['cases'].items():
+        if name not in baseline['cases']:
+            continue
+        for phase, measured in phases.items():
+            before = baseline['cases'][name].get(phase)
+            if before is None or max(before['seconds'], measured['seconds']) < min_seconds:
+                continue
+            if measured['seconds'] > before['seconds'] * (1 + tolerance):
+                regressions.append((name, phase, before['seconds'], measured['seconds']))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark on seeded generated maps.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[20, 100], help='map is size x size')
+    parser.add_argument('--princesses', type=int, nargs='+', default=[3])
+    parser.add_argument('--teleports', type=float, nargs='+', default=[0.0, 0.01], help='fraction of teleport tiles')
+    parser.add_argument('--generators', nargs='+', default=['none', 'random'], choices=GENERATOR_PLACEMENTS)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--compact', action='store_true', help='use CompactTerrainGraph')
+    parser.add_argument('--search', default='dijkstra', choices=SEARCHES)
+    parser.add_argument('--repeat', type=int, default=3, help='best of repeat runs is taken')
+    parser.add_argument('--memory', action='store_true', help='measure peak memory with tracemalloc')
+    parser.add_argument('--output', default=None, help='write results as JSON')
+    parser.add_argument('--baseline', default=None, help='JSON results to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown against baseline')
+    args = parser.parse_args(argv)
+
+    case_list = cases(args.sizes, args.princesses, args.teleports, args.generators, args.seed)
+    results = run(case_list, args.compact, args.search, args.repeat, args.memory, verbose=True)
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline is None:
+        return 0
+    with open(args.baseline, 'r') as f:
+        baseline = json.load(f)
+    try:
+        regressions = compare(results, baseline, args.tolerance)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    for name, phase, before, after in regressions:
+        print('SLOWER {} {}: {:.4f}s -> {:.4f}s'.format(name, phase, before, after))
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
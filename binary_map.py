@@ -0,0 +1,159 @@
+"""
+Binary map format, loaded with mmap without creating Python object for every tile.
+
+Layout (integers are little endian):
+    header      magic, width, height, dragon index (-1 if missing), number of princesses, number of generators,
+                offset of tiles, number of tiles in each of 10 teleport groups
+    tables      int32 indexes of princesses, of generators and of teleport tiles (group '0' first)
+    padding     zeros up to offset of tiles, which is multiple of ALIGNMENT
+    tiles       one byte per tile, symbol of tile (x, y) is on index y*width+x
+
+Tiles start on boundary usable as mmap offset on every platform, so loaded graph reads them directly from
+page cache and worker processes loading same file share its pages. Map is mapped copy on write,
+graph.set_tile changes only memory of its process, never the file.
+
+    binary_map.convert('map.txt', 'map.map')
+    graph = binary_map.load('map.map')
+    save_princess(graph, 1000)
+"""
+import argparse
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from main import TerrainGraph, CompactTerrainGraph, load_map_from_file
+
+MAGIC = b'MAP1'
+# magic, width, height, dragon, number of princesses, number of generators, offset of tiles, teleport group sizes
+HEADER = struct.Struct('<4sIIiIIQ10I')
+ALIGNMENT = 65536       # mmap.ALLOCATIONGRANULARITY is 4096 on most systems, 65536 on Windows
+EXTENSION = '.map'
+
+
+def save(graph, file):
+    """
+    Writes CompactTerrainGraph into binary map file
+    """
+    dragon = graph.vertex(graph.dragon) if graph.dragon is not None else -1
+    princesses = array('i', sorted(map(graph.vertex, graph.princesses)))
+    generators = array('i', sorted(map(graph.vertex, graph.generators)))
+    groups = [graph.teleports.get(ord('0') + digit, array('i')) for digit in range(10)]
+    with open(file, 'wb') as f:
+        write_header(f, graph.width, graph.height, dragon, princesses, generators, groups)
+        f.write(graph.tiles)
+
+
+def write_header(f, width, height, dragon, princesses, generators, groups):
+    """
+    Writes everything before tiles, header, tables and padding, caller writes width*height tiles right after it
+    (see terrain_generator.py, which streams generated rows)
+    :param f: binary file
+    :param dragon: index of dragon tile, -1 if there is no dragon
+    :param princesses: array('i') of indexes of 'P' tiles
+    :param generators: array('i') of indexes of 'G' tiles
+    :param groups: list of 10 array('i'), indexes of tiles of teleport groups '0' to '9'
+    """
+    tables = [princesses, generators] + groups
+    size = HEADER.size + sum(len(table) for table in tables) * 4
+    offset = -(-size // ALIGNMENT) * ALIGNMENT
+    f.write(HEADER.pack(MAGIC, width, height, dragon, len(princesses), len(generators), offset, *map(len, groups)))
+    for table in tables:
+        if sys.byteorder == 'big':
+            table = array('i', table)
+            table.byteswap()
+        table.tofile(f)
+    f.write(bytes(offset - size))
+
+
+def convert(map_file, binary_file):
+    """
+    Converts text map into binary map file
+    :raises ValueError: if text map is not valid
+    """
+    save(CompactTerrainGraph.from_file(map_file), binary_file)
+
+
+def load(file):
+    """
+    :return: CompactTerrainGraph over tiles mapped from binary map file
+    :raises ValueError: if file is not binary map, it is truncated or its index tables do not match tiles
+    """
+    with open(file, 'rb') as f:
+        header = f.read(HEADER.size)
+        if len(header) != HEADER.size:
+            raise ValueError('Not a binary map: ' + str(file))
+        magic, width, height, dragon, num_princesses, num_generators, offset, *group_sizes = HEADER.unpack(header)
+        if magic != MAGIC or offset % ALIGNMENT:
+            raise ValueError('Not a binary map: ' + str(file))
+
+        tables = []
+        for length in [num_princesses, num_generators] + group_sizes:
+            table = array('i')
+            try:
+                table.fromfile(f, length)
+            except EOFError:
+                raise ValueError('Binary map is truncated: ' + str(file))
+            if sys.byteorder == 'big':
+                table.byteswap()
+            tables.append(table)
+
+        f.seek(0, 2)
+        if f.tell() != offset + width * height:
+            raise ValueError('Binary map is truncated: ' + str(file))
+        tiles = mmap.mmap(f.fileno(), width * height, access=mmap.ACCESS_COPY, offset=offset)
+
+    princesses, generators, groups = tables[0], tables[1], tables[2:]
+    try:
+        _check_tables(tiles, [(b'D', [dragon] if dragon != -1 else []), (b'P', princesses), (b'G', generators)] +
+                      [(str(digit).encode(), group) for digit, group in enumerate(groups)])
+    except ValueError as e:
+        tiles.close()
+        raise ValueError('Binary map is corrupt: {} ({})'.format(file, e))
+    teleports = {ord('0') + digit: group for digit, group in enumerate(groups) if group}
+    return CompactTerrainGraph.from_buffer(tiles, width, height, dragon, princesses, generators, teleports)
+
+
+def _check_tables(tiles, tables):
+    """
+    Checks that every index of tables points into map at tile with symbol of its table,
+    only key tiles are read, so tiles are not scanned
+    :param tables: [(symbol, indexes), ...]
+    :raises ValueError: for first wrong index
+    """
+    size = len(tiles)
+    for symbol, indexes in tables:
+        for index in indexes:
+            if not 0 <= index < size:
+                raise ValueError('{} tile index {} is outside of map'.format(symbol.decode(), index))
+            if tiles[index:index + 1] != symbol:
+                raise ValueError('{} tile index {} points at {} tile'.format(
+                    symbol.decode(), index, tiles[index:index + 1].decode(errors='replace')))
+
+
+def load_graph(file, compact=False):
+    """
+    Loads text or binary map (recognized by EXTENSION) into graph
+    :param compact: build CompactTerrainGraph from text map instead of TerrainGraph, binary map is always compact
+    :return: TerrainGraph or CompactTerrainGraph
+    """
+    if file.endswith(EXTENSION):
+        return load(file)
+    if compact:
+        return CompactTerrainGraph.from_file(file)
+    return TerrainGraph(load_map_from_file(file))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Convert text maps into binary maps.')
+    parser.add_argument('maps', nargs='+', help='text map files, binary map is written next to each of them')
+    args = parser.parse_args(argv)
+    for map_file in args.maps:
+        binary_file = os.path.splitext(map_file)[0] + EXTENSION
+        convert(map_file, binary_file)
+        print(map_file, '->', binary_file)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+"""
+Cache of built graphs and searched legs for workloads which solve same maps again and again.
+
+Everything is keyed by sha256 of map content (landmarks.terrain_fingerprint), so same map given as lines,
+TerrainGraph or CompactTerrainGraph hits same entries. Graphs and legs are kept in in-process LRU,
+legs can also be stored in sqlite database, which is shared by processes and outlives them.
+Database is trimmed to max_bytes, least recently used legs are evicted first.
+
+    cache = SolveCache(path='legs.sqlite')
+    save_princess(terrain, 1000, cache=cache)     # builds graph and searches legs
+    save_princess(terrain, 1000, cache=cache)     # no graph construction, no search
+
+Graphs returned by cache are shared by all callers, they must not be changed with set_tile.
+"""
+import hashlib
+import json
+import sqlite3
+import time
+import weakref
+from collections import OrderedDict
+
+from landmarks import terrain_fingerprint
+from main import TerrainGraph, CompactTerrainGraph
+
+
+class LRU:
+    """
+    Dictionary with limited number of items, least recently used item is dropped when it is full
+    """
+    def __init__(self, max_items):
+        self.max_items = max_items
+        self.items = OrderedDict()
+
+    def get(self, key, default=None):
+        if key not in self.items:
+            return default
+        self.items.move_to_end(key)
+        return self.items[key]
+
+    def put(self, key, value):
+        self.items[key] = value
+        self.items.move_to_end(key)
+        while len(self.items) > self.max_items:
+            self.items.popitem(last=False)
+
+    def __len__(self):
+        return len(self.items)
+
+
+class SolveCache:
+    def __init__(self, max_graphs=4, max_legs=65536, path=None, max_bytes=64 * 2 ** 20):
+        """
+        :param max_graphs: number of graphs kept in memory
+        :param max_legs: number of legs kept in memory
+        :param path: sqlite database file for legs, None to keep legs only in memory
+        :param max_bytes: size of legs stored in database, (size of JSON values, not of database file)
+        """
+        self.graphs = LRU(max_graphs)           # {(fingerprint, compact): graph, ...}
+        self.legs = LRU(max_legs)               # {key: value, ...}     key is JSON string, see MapLegs
+        self.fingerprints = weakref.WeakKeyDictionary()     # {graph: fingerprint, ...}     graphs built by cache
+        self.max_bytes = max_bytes
+        self.db = None
+        if path is not None:
+            self.db = sqlite3.connect(path)
+            self.db.execute('CREATE TABLE IF NOT EXISTS legs (key TEXT PRIMARY KEY, value TEXT, size INTEGER, '
+                            'used REAL)')
+            self.db.execute('CREATE INDEX IF NOT EXISTS legs_used ON legs (used)')
+            self.db.commit()
+
+    def graph(self, terrain, compact=False, fingerprint=None):
+        """
+        :param terrain: list of map lines, None to only look graph up
+        :param fingerprint: sha256 digest of lines joined by new lines, when caller already knows it
+            (map_id of service.py), so map is not hashed again
+        :return: TerrainGraph or CompactTerrainGraph of terrain, built only if it is not in cache,
+            None if it is not in cache and terrain is None
+        """
+        if fingerprint is None:
+            fingerprint = hashlib.sha256('\n'.join(terrain).encode()).digest()
+        graph = self.graphs.get((fingerprint, compact))
+        if graph is None:
+            if terrain is None:
+                return None
+            graph = CompactTerrainGraph(terrain) if compact else TerrainGraph(terrain)
+            self.graphs.put((fingerprint, compact), graph)
+            self.fingerprints[graph] = fingerprint
+        return graph
+
+    def fingerprint(self, graph):
+        """
+        :return: fingerprint of graph, remembered for graphs built by cache, computed for others
+            (they can be changed by set_tile)
+        """
+        return self.fingerprints.get(graph) or terrain_fingerprint(graph)
+
+    def for_map(self, graph, search):
+        """
+        :return: MapLegs, legs of graph searched by search
+        """
+        return MapLegs(self, self.fingerprint(graph).hex(), search)
+
+    def get(self, key):
+        """
+        :param key: JSON string
+        :return: value, or None if it is not in cache
+        """
+        value = self.legs.get(key)
+        if value is None and self.db is not None:
+            row = self.db.execute('SELECT value FROM legs WHERE key = ?', (key,)).fetchone()
+            if row is not None:
+                self.db.execute('UPDATE legs SET used = ? WHERE key = ?', (time.time(), key))
+                self.db.commit()
+                value = json.loads(row[0])
+                self.legs.put(key, value)
+        return value
+
+    def put(self, key, value):
+        """
+        :param key: JSON string
+        :param value: JSON serializable value
+        """
+        self.legs.put(key, value)
+        if self.db is not None:
+            data = json.dumps(value, separators=(',', ':'))
+            self.db.execute('INSERT OR REPLACE INTO legs VALUES (?, ?, ?, ?)', (key, data, len(data), time.time()))
+            self.evict()
+            self.db.commit()
+
+    def evict(self):
+        """
+        Deletes least recently used legs from database until they fit into max_bytes
+        """
+        total, = self.db.execute('SELECT COALESCE(SUM(size), 0) FROM legs').fetchone()
+        if total <= self.max_bytes:
+            return
+        for key, size in self.db.execute('SELECT key, size FROM legs ORDER BY used').fetchall():
+            self.db.execute('DELETE FROM legs WHERE key = ?', (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+
+class MapLegs:
+    """
+    Legs of one map in SolveCache, leg is (trace, distance, teleport_activated), trace is stored as coordinates
+    """
+    def __init__(self, cache, fingerprint, search):
+        self.cache = cache
+        self.prefix = [fingerprint, search]
+
+    def get(self, graph, kind, arguments):
+        """
+        :param graph: graph to create Nodes of legs from
+        :param kind: name of cached function
+        :param arguments: tuple of its parameters, Nodes and sets of them are stored as coordinates
+        :return: list of legs [(destination, trace, distance, teleport_activated), ...], None if it is not in cache
+        """
+        value = self.cache.get(self._key(kind, arguments))
+        if value is None:
+            return None
+        return [(graph.get_node(*destination), [graph.get_node(x, y) for x, y in trace], distance, tp)
+                for destination, trace, distance, tp in value]
+
+    def put(self, kind, arguments, legs):
+        """
+        :param legs: list of legs [(destination, trace, distance, teleport_activated), ...]
+        """
+        self.cache.put(self._key(kind, arguments),
+                       [((destination.x, destination.y), [(node.x, node.y) for node in trace], distance, tp)
+                        for destination, trace, distance, tp in legs])
+
+    def _key(self, kind, arguments):
+        def encode(argument):
+            if hasattr(argument, 'x'):
+                return [argument.x, argument.y]
+            if isinstance(argument, (set, frozenset)):
+                return sorted(map(encode, argument))
+            return argument
+        return json.dumps(self.prefix + [kind] + [encode(argument) for argument in arguments])
@@ -0,0 +1,238 @@
+"""
+Optional NumPy engine, computes distances from one source to every tile of map.
+
+Distances are relaxed by whole-array sweeps (left, right, down, up) until nothing changes,
+teleports are group-minimum reductions over tiles with same number. Same as searches in main.py
+there are two layers, without and with activated teleports, stepping on 'G' moves into second one.
+"""
+import sys
+
+try:
+    import numpy as np
+except ImportError:     # numpy is optional, only this engine needs it
+    np = None
+
+INFINITY = 2 ** 60      # unreachable, small enough to not overflow int64 when adding costs
+
+# where predecessor of tile is, stored in directions array
+SOURCE, FROM_TOP, FROM_BOTTOM, FROM_LEFT, FROM_RIGHT, TELEPORT, ACTIVATION = range(7)
+
+WALL = 2 ** 40       # cost of leaving tile which cannot be left, used inside sweeps, no real path is that long
+
+
+def _sweep(distances, cost):
+    """
+    Walks every row from left to right at once, in one pass
+        candidate[x] = min over k <= x of (distances[k] + cost[k] + ... + cost[x-1])
+    with prefix sums S[x] = cost[0] + ... + cost[x-1] it is S[x] + min over k <= x of (distances[k] - S[k]),
+    which is running minimum. Paths over walls are at least WALL long and are dropped.
+    :return: array of candidate distances
+    """
+    prefix = np.zeros_like(distances)
+    np.cumsum(cost[:, :-1], axis=1, out=prefix[:, 1:])
+    candidate = prefix + np.minimum.accumulate(distances - prefix, axis=1)
+    candidate[candidate >= WALL] = INFINITY
+    return candidate
+
+
+class TerrainGrid:
+    """
+    Cost grid of map for NumPy engine, build it once and compute as many distance fields as needed.
+    """
+
+    def __init__(self, graph):
+        """
+        :param graph: TerrainGraph or CompactTerrainGraph
+        """
+        if np is None:
+            raise ImportError('NumPy engine requires numpy.')
+
+        if hasattr(graph, 'tiles'):     # compact graph, tiles are already in one buffer
+            self.symbols = np.frombuffer(bytes(graph.tiles), dtype=np.uint8).reshape(graph.height, graph.width)
+        else:
+            width = max(x for x, _ in graph.nodes) + 1
+            height = max(y for _, y in graph.nodes) + 1
+            self.symbols = np.full((height, width), ord('N'), dtype=np.uint8)     # missing tiles cannot be left
+            for (x, y), node in graph.nodes.items():
+                self.symbols[y, x] = ord(node.value)
+
+        table = np.full(256, INFINITY, dtype=np.int64)
+        for symbol, cost in graph.FOOT_DISTANCE.items():
+            if cost != sys.maxsize:
+                table[ord(symbol)] = cost
+        self.cost = table[self.symbols]                 # cost of leaving tile, INFINITY if it cannot be left
+        self.generators = self.symbols == ord('G')
+        self.teleports = []         # [(mask, cost), ...]      tiles of teleport group and cost of teleporting
+        for symbol, cost in graph.TELEPORT_DISTANCE.items():
+            mask = self.symbols == ord(symbol)
+            if mask.sum() > 1:
+                self.teleports.append((mask, cost))
+
+    @property
+    def shape(self):
+        return self.symbols.shape
+
+    def distance_field(self, source, teleports_activated=False, generators_activate=True):
+        """
+        :param source: (x, y) coordinates of source tile
+        :param teleports_activated: true if teleports are already activated at source
+        :param generators_activate: false to stay in starting layer, ('G' behaves as normal tile)
+        :return: tuple (distances, directions), both arrays have shape (2, height, width),
+            first index is layer (1 means teleports are active), distances of unreachable tiles are INFINITY,
+            directions says where predecessor of tile is (FROM_TOP, ..., TELEPORT, ACTIVATION, or SOURCE)
+        """
+        height, width = self.shape
+        distances = np.full((2, height, width), INFINITY, dtype=np.int64)
+        directions = np.zeros((2, height, width), dtype=np.int8)
+        x, y = source
+        if generators_activate and self.generators[y, x]:
+            teleports_activated = True
+
+        if teleports_activated:
+            distances[1, y, x] = 0
+            self._relax(distances[1], directions[1], self.cost, self.teleports)
+            return distances, directions
+
+        distances[0, y, x] = 0
+        if not generators_activate or not self.generators.any():
+            self._relax(distances[0], directions[0], self.cost, ())
+            return distances, directions
+
+        # without teleports 'G' can be reached but not left, walking further goes in second layer
+        self._relax(distances[0], directions[0], np.where(self.generators, INFINITY, self.cost), ())
+        activated = self.generators & (distances[0] < INFINITY)
+        distances[1][activated] = distances[0][activated]
+        directions[1][activated] = ACTIVATION
+        distances[0][self.generators] = INFINITY
+        self._relax(distances[1], directions[1], self.cost, self.teleports)
+        return distances, directions
+
+    @staticmethod
+    def _relax(distances, directions, cost, teleports):
+        """
+        Relaxes distances of one layer in place, until nothing changes
+        :param cost: cost of leaving tile
+        :param teleports: [(mask, cost), ...]   teleport groups which can be used
+        """
+        cost = np.minimum(cost, WALL)
+        # (direction, view) every sweep goes along rows of view from left to right
+        views = (
+            (FROM_LEFT, lambda array: array),
+            (FROM_RIGHT, lambda array: array[:, ::-1]),
+            (FROM_TOP, lambda array: array.T),
+            (FROM_BOTTOM, lambda array: array[::-1].T),
+        )
+        changed = True
+        while changed:
+            changed = False
+            for direction, view in views:
+                layer_distances = view(distances)
+                candidate = _sweep(layer_distances, view(cost))
+                better = candidate < layer_distances
+                if better.any():
+                    layer_distances[better] = candidate[better]
+                    view(directions)[better] = direction
+                    changed = True
+
+            for mask, teleport_cost in teleports:
+                best = distances[mask].min()
+                if best >= INFINITY:
+                    continue
+                better = mask & (distances > best + teleport_cost)
+                if better.any():
+                    distances[better] = best + teleport_cost
+                    directions[better] = TELEPORT
+                    changed = True
+
+    def path(self, distances, directions, target, layer=None):
+        """
+        Follows directions back to source
+        :param target: (x, y) coordinates of target tile
+        :param layer: layer where path ends, None for layer with lower distance (with teleports when same)
+        :return: array of (x, y, layer) from source to target, [] if target is unreachable
+        """
+        x, y = target
+        if layer is None:
+            layer = 1 if distances[1, y, x] <= distances[0, y, x] else 0
+        if distances[layer, y, x] >= INFINITY:
+            return []
+
+        trace = [(x, y, layer)]
+        while True:
+            direction = directions[layer, y, x]
+            if direction == SOURCE:
+                break
+            elif direction == FROM_TOP:
+                y -= 1
+            elif direction == FROM_BOTTOM:
+                y += 1
+            elif direction == FROM_LEFT:
+                x -= 1
+            elif direction == FROM_RIGHT:
+                x += 1
+            elif direction == ACTIVATION:   # same tile, just without teleports, it is not added again
+                layer = 0
+                continue
+            elif direction == TELEPORT:
+                # predecessor is tile of group with lowest distance, which was not reached by teleport itself
+                group = self.symbols == self.symbols[y, x]
+                layer_distances = distances[layer]
+                candidates = group & (layer_distances == layer_distances[group].min()) & \
+                    (directions[layer] != TELEPORT)
+                y, x = divmod(int(np.flatnonzero(candidates)[0]), self.shape[1])
+            trace.append((x, y, layer))
+        return trace[::-1]
+
+
+def distance_field(graph, source, teleports_activated=False):
+    """
+    Distances from source to every tile, for example for heatmaps
+    :param graph: TerrainGraph or CompactTerrainGraph
+    :param source: source node
+    :param teleports_activated: true if teleports are already activated at source
+    :return: tuple (distances, directions), see TerrainGrid.distance_field
+    """
+    return terrain_grid(graph).distance_field((source.x, source.y), teleports_activated)
+
+
+def terrain_grid(graph):
+    """
+    :return: TerrainGrid of graph, built by first call and kept in graph.grid for next ones, graph.set_tile drops it
+    """
+    if graph.grid is None:
+        graph.grid = TerrainGrid(graph)
+    return graph.grid
+
+
+def field_search(graph, source, targets, teleports_activated=False, generators_activate=True):
+    """
+    Search engine for main.find_paths, parameters and return value are same as in main.dijkstra,
+    but shortest_distances and predecessors contain only states on paths to targets,
+    cost grid is built only once for graph (see terrain_grid)
+    """
+    grid = terrain_grid(graph)
+    distances, directions = grid.distance_field(graph.coords(source), teleports_activated, generators_activate)
+
+    def state(x, y, layer):
+        return graph.vertex(graph.get_node(x, y)), bool(layer)
+
+    shortest_distances = {}
+    predecessors = {}
+    for target in targets:
+        x, y = graph.coords(target)
+        for layer in (0, 1):
+            trace = grid.path(distances, directions, (x, y), layer)
+            if not trace:
+                continue
+            previous = None
+            for tx, ty, tl in trace:
+                current = state(tx, ty, tl)
+                shortest_distances[current] = int(distances[tl, ty, tx])
+                if previous is not None:
+                    predecessors[current] = previous
+                previous = current
+
+    sx, sy = graph.coords(source)
+    layer = bool(teleports_activated or generators_activate and grid.generators[sy, sx])
+    shortest_distances[state(sx, sy, layer)] = 0
+    return shortest_distances, predecessors
@@ -0,0 +1,295 @@
+"""
+Hierarchical (HPA*) search for very large maps.
+
+Map is split into square clusters. Abstract graph contains only entrances (pairs of passable tiles on both sides
+of border between two clusters), teleport tiles and generators, connected by
+    - walking distance inside cluster between abstract tiles of same cluster (computed when tile is first expanded),
+    - step over border between paired entrances,
+    - teleport edges through hub of teleport group (only with activated teleports).
+Query connects source and targets to abstract tiles of their clusters, searches abstract graph with A* of main.dijkstra
+(same layers as flat search) and then refines only clusters along found path.
+
+Border is split into segments of consecutive open pairs, short segment has entrance in middle, longer one on both
+ends and then every `spacing` tiles. With spacing=1 every border tile is entrance and result is exact, otherwise
+path is at most (2 * (spacing // 2) + 1) * max_cost turns longer than optimal for every cluster border which
+optimal path crosses (walk along segment to closest entrance and back on other side), max_cost is 2 for 'H'.
+
+First queries pay for searches inside clusters they touch (or call build() up front), later queries on same map
+search only abstract graph and clusters along path. Index is worth it for many queries on one big map.
+
+    graph.hierarchy = ClusterHierarchy(graph, cluster_size=32)
+    save_princess(graph, 1000, search='hpa')
+"""
+import sys
+
+from priority_queue import PriorityQueue
+
+
+class ClusterHierarchy:
+    def __init__(self, graph, cluster_size=16, spacing=None):
+        """
+        :param graph: TerrainGraph or CompactTerrainGraph
+        :param cluster_size: clusters are cluster_size x cluster_size tiles
+        :param spacing: distance between entrances on same border segment, 1 for exact search,
+            None for cluster_size
+        """
+        if cluster_size < 1:
+            raise ValueError('Cluster size must be at least 1.')
+        self.graph = graph
+        self.cluster_size = cluster_size
+        self.spacing = cluster_size if spacing is None else max(1, spacing)
+        if hasattr(graph, 'tiles'):
+            self.width, self.height = graph.width, graph.height
+        else:
+            self.width = max(x for x, _ in graph.nodes) + 1
+            self.height = max(y for _, y in graph.nodes) + 1
+
+        self.members = {}       # {(cx, cy): {vertex, ...}, ...}     abstract tiles of cluster
+        self.crossings = {}     # {vertex: [(vertex, cost), ...], ...}     steps over cluster border
+        self.teleports = {}     # {tile vertex: (hub vertex, cost), ...}
+        self.hubs = {}          # {hub vertex: [tile vertex, ...], ...}
+        self._intra = {}        # {vertex: [(vertex, cost), ...], ...}     walking inside cluster, computed lazily
+
+        self._find_entrances()
+        for node in graph.generators:
+            self._add_member(graph.vertex(node))
+        for hub, tiles in _teleport_groups(graph):
+            self.hubs[hub] = tiles
+            for tile in tiles:
+                self.teleports[tile] = (hub, graph.TELEPORT_DISTANCE[graph.symbol(tile)])
+                self._add_member(tile)
+
+    def cluster(self, vertex):
+        """
+        :return: tuple (cx, cy) of cluster containing vertex, hubs are in no cluster (cx is negative)
+        """
+        x, y = self.graph.coords(vertex)
+        return x // self.cluster_size, y // self.cluster_size
+
+    def _passable(self, vertex):
+        return self.graph.FOOT_DISTANCE.get(self.graph.symbol(vertex), sys.maxsize) != sys.maxsize
+
+    def _add_member(self, vertex):
+        self.members.setdefault(self.cluster(vertex), set()).add(vertex)
+
+    def _find_entrances(self):
+        graph = self.graph
+        size = self.cluster_size
+
+        def vertex(x, y):
+            node = graph.get_node(x, y)
+            return None if node is None else graph.vertex(node)
+
+        # (pairs along vertical borders, pairs along horizontal borders), pair is (tile, tile on other side)
+        borders = []
+        for x in range(size - 1, self.width - 1, size):
+            borders.append([(vertex(x, y), vertex(x + 1, y)) for y in range(self.height)])
+        for y in range(size - 1, self.height - 1, size):
+            borders.append([(vertex(x, y), vertex(x, y + 1)) for x in range(self.width)])
+
+        for border in borders:
+            segment = []
+            for i, pair in enumerate(border):
+                if i % size == 0:       # segment is between two clusters only
+                    self._add_segment(segment)
+                    segment = []
+                a, b = pair
+                if a is not None and b is not None:
+                    if self._passable(a) and self._passable(b):
+                        segment.append(pair)
+                        continue
+                    # step into impassable tile is dead end, it matters only when that tile is target
+                    if self._passable(a) != self._passable(b):
+                        self._add_step(*(pair if self._passable(a) else reversed(pair)))
+                self._add_segment(segment)
+                segment = []
+            self._add_segment(segment)
+
+    def _add_segment(self, segment):
+        """
+        :param segment: list of consecutive open pairs of tiles along border of two clusters
+        """
+        if len(segment) > self.spacing:
+            chosen = set(range(0, len(segment), self.spacing)) | {len(segment) - 1}
+        else:       # short segment has single entrance in middle
+            chosen = {len(segment) // 2} if segment else set()
+        for i in chosen:
+            self._add_crossing(*segment[i])
+
+    def _add_crossing(self, a, b):
+        self._add_step(a, b)
+        self._add_step(b, a)
+        self._add_member(b)
+
+    def _add_step(self, a, b):
+        self.crossings.setdefault(a, []).append((b, self.graph.FOOT_DISTANCE[self.graph.symbol(a)]))
+        self._add_member(a)
+
+    def cluster_search(self, source, cluster, target=None, reverse=False):
+        """
+        Walking Dijkstra which never leaves cluster
+        :param target: stop when it is settled
+        :param reverse: search over reversed edges, distances are to source instead of from it
+        :return: tuple (distances, predecessors), {vertex: distance, ...} and {vertex: parent, ...}
+        """
+        graph = self.graph
+        edges = graph.reverse_neighbours if reverse else graph.neighbours
+        size = self.cluster_size
+        cx, cy = cluster
+        distances = {source: 0}
+        predecessors = {}
+        done = set()
+        outside = set()     # neighbours in other clusters, coordinates are checked only once for every vertex
+        queue = PriorityQueue()
+        queue.push(source, 0)
+        while queue:
+            distance, vertex = queue.pop()
+            done.add(vertex)
+            if vertex == target:
+                break
+            for neighbour, cost in edges(vertex, False):
+                if neighbour in done or neighbour in outside:
+                    continue
+                current_distance = distance + cost
+                known = distances.get(neighbour)
+                if known is None:
+                    x, y = graph.coords(neighbour)
+                    if x // size != cx or y // size != cy:
+                        outside.add(neighbour)
+                        continue
+                elif current_distance >= known:
+                    continue
+                distances[neighbour] = current_distance
+                predecessors[neighbour] = vertex
+                queue.push(neighbour, current_distance)
+        return distances, predecessors
+
+    def intra_edges(self, vertex):
+        """
+        :return: list of (vertex, cost) to other abstract tiles of same cluster, walking inside cluster,
+            computed when it is first needed
+        """
+        if vertex not in self._intra:
+            cluster = self.cluster(vertex)
+            members = self.members.get(cluster, ())
+            edges = []
+            if vertex in members:
+                distances, _ = self.cluster_search(vertex, cluster)
+                edges = [(member, distances[member]) for member in members
+                         if member != vertex and member in distances]
+            self._intra[vertex] = edges
+        return self._intra[vertex]
+
+    def build(self):
+        """
+        Computes walking distances inside every cluster now instead of when they are first needed
+        """
+        for members in self.members.values():
+            for member in members:
+                self.intra_edges(member)
+
+    def search(self, source, targets, teleports_activated=False, generators_activate=True, stats=None,
+               max_distance=sys.maxsize):
+        """
+        Search engine for main.find_paths, parameters and return value are same as in main.dijkstra,
+        but shortest_distances and predecessors contain only states on paths to targets
+        """
+        from main import dijkstra, astar_heuristic, best_state, get_predecesors_trace
+
+        # connect source and targets to abstract tiles of their clusters
+        extra = {}          # {vertex: [(vertex, cost), ...], ...}     edges from source and into targets
+        distances, _ = self.cluster_search(source, self.cluster(source))
+        extra[source] = [(vertex, distances[vertex]) for vertex in self.members.get(self.cluster(source), ())
+                         if vertex in distances and vertex != source]
+        extra[source] += [(target, distances[target]) for target in targets if target in distances]
+        for target in targets:
+            cluster = self.cluster(target)
+            to_target, _ = self.cluster_search(target, cluster, reverse=True)
+            for vertex in self.members.get(cluster, ()):
+                if vertex in to_target and vertex != target:
+                    extra.setdefault(vertex, []).append((target, to_target[vertex]))
+
+        # abstract edges are real distances between real vertices, so A* heuristic of graph stays consistent
+        heuristic = astar_heuristic(self.graph, targets, generators_activate) if targets else None
+        abstract_distances, abstract_predecessors = dijkstra(_AbstractGraph(self, extra), source, targets,
+                                                             teleports_activated, generators_activate, heuristic,
+                                                             stats, max_distance)
+
+        layer = teleports_activated or generators_activate and self.graph.symbol(source) == 'G'
+        shortest_distances = {(source, layer): 0}
+        predecessors = {}
+        for target in targets:
+            state, distance = best_state(abstract_distances, target)
+            if distance == sys.maxsize:
+                continue
+            vertices = self._refine([vertex for vertex, _ in get_predecesors_trace(abstract_predecessors, state)])
+            if vertices:
+                self._merge(vertices, layer, generators_activate, shortest_distances, predecessors)
+        return shortest_distances, predecessors
+
+    def _refine(self, abstract_path):
+        """
+        :return: list of vertices, abstract path with walking inside clusters filled in
+        """
+        if not abstract_path:
+            return []
+        vertices = [abstract_path[0]]
+        for a, b in zip(abstract_path, abstract_path[1:]):
+            cluster = self.cluster(a)
+            if a in self.hubs or b in self.hubs or cluster != self.cluster(b):    # teleport or border step
+                vertices.append(b)
+                continue
+            _, parents = self.cluster_search(a, cluster, target=b)
+            segment = [b]
+            while segment[-1] != a:
+                segment.append(parents[segment[-1]])
+            vertices.extend(reversed(segment[:-1]))
+        return vertices
+
+    def _merge(self, vertices, layer, generators_activate, shortest_distances, predecessors):
+        """
+        Adds path into result of search, states which are already there keep their predecessors,
+        so every trace followed by predecessors has distances which match it
+        """
+        graph = self.graph
+        previous = (vertices[0], layer)
+        for vertex in vertices[1:]:
+            previous_vertex, previous_layer = previous
+            cost = min(cost for neighbour, cost in graph.neighbours(previous_vertex, previous_layer)
+                       if neighbour == vertex)
+            state = (vertex, previous_layer or generators_activate and graph.symbol(vertex) == 'G')
+            if state not in shortest_distances:
+                shortest_distances[state] = shortest_distances[previous] + cost
+                predecessors[state] = previous
+            previous = state
+
+
+class _AbstractGraph:
+    """
+    Abstract graph in shape which main.dijkstra expects
+    """
+
+    def __init__(self, hierarchy, extra):
+        self.hierarchy = hierarchy
+        self.extra = extra
+        self.generators = hierarchy.graph.generators
+        self.symbol = hierarchy.graph.symbol
+
+    def neighbours(self, vertex, teleports_activated=False):
+        hierarchy = self.hierarchy
+        if vertex in hierarchy.hubs:
+            return [(tile, 0) for tile in hierarchy.hubs[vertex]]
+        edges = hierarchy.intra_edges(vertex) + hierarchy.crossings.get(vertex, []) + self.extra.get(vertex, [])
+        if teleports_activated and vertex in hierarchy.teleports:
+            edges.append(hierarchy.teleports[vertex])
+        return edges
+
+
+def _teleport_groups(graph):
+    """
+    :return: list of (hub vertex, [tile vertex, ...]) for every teleport group
+    """
+    if hasattr(graph, 'tiles'):
+        size = len(graph.tiles)
+        return [(size + symbol - ord('0'), list(tiles)) for symbol, tiles in graph.teleports.items()]
+    return [(graph.hubs[symbol], list(tiles)) for symbol, tiles in graph.teleports.items()]
@@ -0,0 +1,206 @@
+"""
+Incremental re-planning (LPA*) for maps which change between turns.
+
+IncrementalPlanner keeps shortest path tree from one source over layered states (vertex, teleports_active),
+same as main.dijkstra. Every state has g (distance settled by search) and rhs (lowest g of predecessor plus cost
+of edge), state is consistent when both are same. When graph.set_tile changes tile, only states of that tile,
+its neighbours and teleport hubs get new rhs. Search then repairs tree starting from them, so small edit costs
+search over region whose distances really changed, not whole map.
+
+    graph = CompactTerrainGraph(terrain)
+    save_princess(graph, 1000, search='lpa')       # planners are kept in graph.planners
+    graph.set_tile(10, 20, 'N')
+    save_princess(graph, 1000, search='lpa')       # repairs trees of previous searches
+
+Every planner keeps distances of all states it has searched, memory grows with number of different sources.
+"""
+import heapq
+import sys
+
+INFINITY = sys.maxsize
+# internal distance is distance * SCALE + number of steps, so even teleport edges (cost 0) cost something
+# and LPA* never keeps tile and hub which lean on each other after their real support is gone
+SCALE = 2 ** 32
+
+
+class IncrementalPlanner:
+    def __init__(self, graph, source, teleports_activated=False, generators_activate=True):
+        """
+        :param graph: TerrainGraph or CompactTerrainGraph
+        :param source: source vertex, other parameters are same as in main.dijkstra
+        """
+        self.graph = graph
+        self.source = source
+        self.teleports_activated = teleports_activated
+        self.generators_activate = generators_activate
+        self.reset()
+
+    def reset(self):
+        """
+        Forgets tree, next search starts from scratch
+        """
+        self.source_symbol = self.graph.symbol(self.source)
+        layer = self.teleports_activated or self.generators_activate and self.source_symbol == 'G'
+        self.can_activate = self.generators_activate and not layer
+        self.source_state = (self.source, layer)
+        self.g = {}                             # {state: distance, ...}     distance settled by search
+        self.rhs = {self.source_state: 0}       # {state: distance, ...}     lowest g of predecessor + cost
+        self._heap = []                         # [(key, state), ...]     may contain stale entries
+        self._keys = {}                         # {state: key, ...}     inconsistent states, key is min(g, rhs)
+        self._pushes = 0
+        self._push(self.source_state, 0)
+
+    def changed(self, vertices):
+        """
+        Called by graph.set_tile, edges into vertices or out of them changed
+        :param vertices: vertices whose edges changed
+        """
+        if self.graph.symbol(self.source) != self.source_symbol:     # source layer may be different
+            self.reset()
+            return
+        for vertex in vertices:
+            for layer in (False, True):
+                state = (vertex, layer)
+                if state != self.source_state:
+                    self._recompute(state)
+                    self._update(state)
+
+    def search(self, targets, stats=None, max_distance=INFINITY):
+        """
+        Repairs tree until all targets are settled, parameters and return value are same as in main.dijkstra,
+        but shortest_distances and predecessors contain only states on paths to targets
+        """
+        self._compute(targets, stats, max_distance)
+
+        g = self.g
+        settled = self._top()       # states closer than lowest key in queue are consistent, farther ones may not be
+        shortest_distances = {self.source_state: 0}
+        predecessors = {}
+        for target in targets:
+            for layer in (False, True):
+                state = (target, layer)
+                distance = g.get(state, INFINITY)
+                if distance >= settled or distance // SCALE > max_distance:
+                    continue
+                while state != self.source_state and state not in predecessors:
+                    shortest_distances[state] = g[state] // SCALE
+                    predecessors[state] = self._parent(state)
+                    state = predecessors[state]
+        return shortest_distances, predecessors
+
+    def _parent(self, state):
+        """
+        Tree is not stored, parent of settled state is found from distances, (every edge costs at least one step)
+        :return: predecessor with distance + cost same as distance of state
+        """
+        g = self.g
+        distance = g[state]
+        for predecessor, cost in self._predecessors(state):
+            if g.get(predecessor, INFINITY) + cost == distance:
+                return predecessor
+
+    def _compute(self, targets, stats, max_distance):
+        g = self.g
+        rhs = self.rhs
+        pushes = self._pushes
+        pops = relaxations = expanded = 0
+        while True:
+            key = self._top()
+            # states up to distance of farthest target must be consistent, ties included (see main.best_state)
+            if key == INFINITY or key // SCALE > max_distance or key // SCALE > self._targets_bound(targets) // SCALE:
+                break
+            _, state = heapq.heappop(self._heap)
+            del self._keys[state]
+            pops += 1
+            expanded += 1
+            if g.get(state, INFINITY) > rhs.get(state, INFINITY):      # distance decreased, settle it
+                distance = g[state] = rhs[state]
+                for successor, cost in self._successors(state):
+                    relaxations += 1
+                    if distance + cost < rhs.get(successor, INFINITY):
+                        rhs[successor] = distance + cost
+                        self._update(successor)
+            else:       # distance increased, successors may have leaned on it
+                del g[state]
+                for successor, _ in self._successors(state):
+                    relaxations += 1
+                    if successor != self.source_state:
+                        self._recompute(successor)
+                        self._update(successor)
+                self._update(state)
+        if stats is not None:
+            stats.add(searches=1, pushes=self._pushes - pushes, pops=pops, relaxations=relaxations,
+                      expanded=expanded)
+
+    def _targets_bound(self, targets):
+        """
+        :return: highest over targets of their lowest key, sys.maxsize if some target is unreachable so far
+        """
+        g = self.g
+        rhs = self.rhs
+        bound = -1
+        for target in targets:
+            bound = max(bound, min(min(g.get((target, layer), INFINITY), rhs.get((target, layer), INFINITY))
+                                   for layer in (False, True)))
+        return bound
+
+    def _successors(self, state):
+        vertex, layer = state
+        symbol = self.graph.symbol
+        for neighbour, cost in self.graph.neighbours(vertex, layer):
+            yield (neighbour, layer or self.can_activate and symbol(neighbour) == 'G'), cost * SCALE + 1
+
+    def _predecessors(self, state):
+        """
+        :return: list of (state, cost) of edges leading into state, mirror of _successors
+        """
+        vertex, layer = state
+        graph = self.graph
+        x, _ = graph.coords(vertex)
+        if x < 0:       # hub is entered only with activated teleports
+            edges = [((tile, True), cost) for tile, cost in graph.reverse_neighbours(vertex, True)] if layer else []
+        else:
+            activates = self.can_activate and graph.symbol(vertex) == 'G'
+            edges = []
+            if layer:
+                edges += [((predecessor, True), cost) for predecessor, cost in graph.reverse_neighbours(vertex, True)]
+            if layer == activates:      # walking into state, stepping on 'G' moves walker into teleport layer
+                edges += [((predecessor, False), cost) for predecessor, cost in graph.reverse_neighbours(vertex, False)]
+        return [(predecessor, cost * SCALE + 1) for predecessor, cost in edges]
+
+    def _recompute(self, state):
+        """
+        Sets rhs of state from its predecessors
+        """
+        best = min((self.g[predecessor] + cost for predecessor, cost in self._predecessors(state)
+                    if predecessor in self.g), default=INFINITY)
+        if best == INFINITY:
+            self.rhs.pop(state, None)
+        else:
+            self.rhs[state] = best
+
+    def _update(self, state):
+        """
+        Queues inconsistent state with its key, removes consistent one from queue
+        """
+        g = self.g.get(state, INFINITY)
+        rhs = self.rhs.get(state, INFINITY)
+        if g != rhs:
+            self._push(state, min(g, rhs))
+        else:
+            self._keys.pop(state, None)
+
+    def _push(self, state, key):
+        if self._keys.get(state) != key:
+            self._keys[state] = key
+            heapq.heappush(self._heap, (key, state))
+            self._pushes += 1
+
+    def _top(self):
+        """
+        :return: lowest key in queue, stale entries are dropped, sys.maxsize if queue is empty
+        """
+        heap = self._heap
+        while heap and self._keys.get(heap[0][1]) != heap[0][0]:
+            heapq.heappop(heap)
+        return heap[0][0] if heap else INFINITY
@@ -0,0 +1,279 @@
+"""
+ALT (A*, landmarks, triangle inequality) preprocessing for repeated queries on same map.
+
+Few landmark tiles are picked and distances from them and to them are stored for every vertex.
+For any vertex v, target t and landmark L
+    d(v, t) >= d(L, t) - d(L, v)     and     d(v, t) >= d(v, L) - d(t, L)
+which is lower bound used by A* (search='alt' in main.find_paths). Bounds are consistent, so A* stays exact.
+
+Distances are stored for two graphs, walking only and with activated teleports. Walking distances are used
+only when teleports cannot be activated during search, otherwise teleport distances are lower bound for both layers.
+
+    graph = CompactTerrainGraph(load_map_from_file('map.txt'))
+    graph.landmarks = LandmarkIndex.for_map('map.txt', graph)      # built once, then loaded from map.txt.alt
+    save_princess(graph, 1000, search='alt')
+"""
+import hashlib
+import itertools
+import struct
+import sys
+from array import array
+
+UNREACHABLE = 2 ** 31 - 1       # stored distance of unreachable vertex, keeps bounds valid without special cases
+
+MAGIC = b'ALT1'
+HEADER = struct.Struct('<4sII32s')      # magic, number of landmarks, number of vertices, terrain fingerprint
+
+
+def terrain_lines(graph):
+    """
+    :return: list of map lines of TerrainGraph or CompactTerrainGraph
+    """
+    if hasattr(graph, 'tiles'):
+        width = graph.width
+        return [graph.tiles[y * width:(y + 1) * width].decode() for y in range(graph.height)]
+    rows = {}
+    for (x, y), node in graph.nodes.items():
+        rows.setdefault(y, []).append(node.value)
+    return [''.join(rows.get(y, ())) for y in range(graph.height)]
+
+
+def terrain_tiles(graph):
+    """
+    :return: tuple (tiles, width, height), symbols of TerrainGraph or CompactTerrainGraph as bytes, tile (x, y)
+        is on index y*width+x, tiles missing in shorter rows of TerrainGraph are 'N', (cannot be entered)
+    """
+    if hasattr(graph, 'tiles'):
+        return bytes(graph.tiles), graph.width, graph.height
+    width = graph.width
+    return ''.join(line.ljust(width, 'N') for line in terrain_lines(graph)).encode(), width, graph.height
+
+
+def terrain_fingerprint(graph):
+    """
+    :return: sha256 digest of map, same for TerrainGraph and CompactTerrainGraph of same map
+    """
+    return hashlib.sha256('\n'.join(terrain_lines(graph)).encode()).digest()
+
+
+def _vertex_indexes(graph):
+    """
+    :return: tuple (vertices, index), vertices is list of all vertices (tiles and hubs),
+        index is function vertex -> position in vertices
+    """
+    if hasattr(graph, 'tiles'):     # compact graph, vertex is already index, hubs follow tiles
+        return range(len(graph.tiles) + 10), int
+    vertices = list(graph.nodes.values()) + [graph.hubs.get(str(digit)) for digit in range(10)]
+    indexes = {vertex: i for i, vertex in enumerate(vertices) if vertex is not None}
+    return vertices, indexes.__getitem__
+
+
+def _distances(graph, source, index, size, teleports_activated, reverse):
+    """
+    Dial's algorithm over whole graph without layers, (teleports are either always or never usable)
+    :param reverse: distances to source instead of from it, searched over reversed edges
+    :return: array of distances indexed by vertex index, UNREACHABLE for unreachable vertices
+    """
+    edges = graph.reverse_neighbours if reverse else graph.neighbours
+    max_cost = max(cost for cost in itertools.chain(graph.FOOT_DISTANCE.values(), graph.TELEPORT_DISTANCE.values())
+                   if cost != sys.maxsize)
+    buckets = [[] for _ in range(max_cost + 1)]
+    distances = array('i', [UNREACHABLE]) * size
+    done = bytearray(size)
+
+    distances[index(source)] = 0
+    buckets[0].append(source)
+    queued = 1
+    distance = 0
+    while queued:
+        bucket = buckets[distance % len(buckets)]
+        while bucket:
+            vertex = bucket.pop()
+            queued -= 1
+            i = index(vertex)
+            if done[i] or distances[i] != distance:     # stale
+                continue
+            done[i] = 1
+            for neighbour, cost in edges(vertex, teleports_activated):
+                j = index(neighbour)
+                current_distance = distance + cost
+                if not done[j] and current_distance < distances[j]:
+                    distances[j] = current_distance
+                    buckets[current_distance % len(buckets)].append(neighbour)
+                    queued += 1
+        distance += 1
+    return distances
+
+
+def _terms(tables, targets):
+    """
+    :param tables: [(from_landmark, to_landmark), ...]
+    :param targets: vertex indexes, bound is for distance to closest of them
+    :return: [(from_landmark, to_landmark, d(L, targets), d(targets, L)), ...]     with lowest d(L, t)
+        and highest d(t, L) over targets, (both keep bounds valid for closest target)
+    """
+    return [(from_landmark, to_landmark, min(from_landmark[t] for t in targets), max(to_landmark[t] for t in targets))
+            for from_landmark, to_landmark in tables]
+
+
+def _bound(terms, i):
+    """
+    :return: lower bound of distance from vertex index i, best over landmarks
+    """
+    bound = 0
+    for from_landmark, to_landmark, landmark_to_target, target_to_landmark in terms:
+        bound = max(bound, landmark_to_target - from_landmark[i], to_landmark[i] - target_to_landmark)
+    return bound
+
+
+def _closest_bound(terms_of_targets, i):
+    """
+    :return: lowest of bounds to every target
+    """
+    return min(_bound(terms, i) for terms in terms_of_targets)
+
+
+class LandmarkIndex:
+    def __init__(self, graph, landmarks, tables):
+        """
+        Use build or load instead
+        :param landmarks: array of vertex indexes of landmarks
+        :param tables: {teleports_activated: [(from_landmark, to_landmark), ...], ...}     one pair of arrays
+            for every landmark, from_landmark[i] is distance from landmark to vertex i, to_landmark[i] back
+        """
+        self.vertices, self.index = _vertex_indexes(graph)
+        self.generators = [self.index(graph.vertex(node)) for node in graph.generators]     # vertex indexes
+        self.landmarks = landmarks
+        self.tables = tables
+        self.fingerprint = terrain_fingerprint(graph)
+
+    @classmethod
+    def build(cls, graph, k=8):
+        """
+        Picks up to k landmarks by farthest point rule, starting from tile [0,0] where every search starts:
+        next landmark is vertex farthest (walking) from already picked ones. Runs 4 searches over whole map
+        for each landmark, memory is 16 bytes per vertex and landmark.
+        :return: LandmarkIndex
+        """
+        vertices, index = _vertex_indexes(graph)
+        size = len(vertices)
+        tables = {False: [], True: []}
+        landmarks = array('i')
+        closest = _distances(graph, graph.vertex(graph.get_node(0, 0)), index, size, False, False)
+        tiles = range(len(graph.tiles)) if hasattr(graph, 'tiles') else range(len(graph.nodes))
+
+        for _ in range(k):
+            farthest = max(tiles, key=lambda i: closest[i] if closest[i] != UNREACHABLE else -1)
+            if closest[farthest] in (0, UNREACHABLE) and landmarks:     # every reachable vertex is landmark
+                break
+            landmarks.append(farthest)
+            landmark = vertices[farthest]
+            tables[False].append((_distances(graph, landmark, index, size, False, False),
+                                  _distances(graph, landmark, index, size, False, True)))
+            if graph.teleports:
+                tables[True].append((_distances(graph, landmark, index, size, True, False),
+                                     _distances(graph, landmark, index, size, True, True)))
+            else:       # without teleports both graphs are same
+                tables[True].append(tables[False][-1])
+            from_landmark = tables[False][-1][0]
+            for i in tiles:
+                if from_landmark[i] < closest[i]:
+                    closest[i] = from_landmark[i]
+        return cls(graph, landmarks, tables)
+
+    def heuristic(self, targets, teleports_activated=False, generators_activate=True):
+        """
+        Without activated teleports path either walks to target, or walks to generator and continues with teleports,
+        so bound is min(walking bound to target, walking bound to generators + lowest bound from generator to target).
+        :param targets: set of target vertices
+        :return: function state -> lower bound of distance to closest target, consistent (see dijkstra)
+        """
+        index = self.index
+        targets = [index(target) for target in targets]
+        walking = [_terms(self.tables[False], [target]) for target in targets]
+        teleporting = [_terms(self.tables[True], [target]) for target in targets]
+
+        if not generators_activate or teleports_activated or not self.generators:     # layer is never changed
+            def heuristic(state):
+                vertex, layer = state
+                return _closest_bound(teleporting if layer else walking, index(vertex))
+            return heuristic
+
+        to_generators = _terms(self.tables[False], self.generators)
+        from_generators = min(_bound(terms, generator) for terms in teleporting for generator in self.generators)
+
+        def heuristic(state):
+            vertex, layer = state
+            i = index(vertex)
+            if layer:
+                return _closest_bound(teleporting, i)
+            return min(_closest_bound(walking, i), _bound(to_generators, i) + from_generators)
+
+        return heuristic
+
+    def save(self, file):
+        """
+        Writes index into binary file, distances are stored as little endian 32 bit integers
+        """
+        with open(file, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, len(self.landmarks), len(self.vertices), self.fingerprint))
+            for values in itertools.chain([self.landmarks], self._arrays()):
+                if sys.byteorder == 'big':
+                    values = array('i', values)
+                    values.byteswap()
+                values.tofile(f)
+
+    @classmethod
+    def load(cls, file, graph):
+        """
+        :return: LandmarkIndex read from file
+        :raises ValueError: if file is not landmark index or it was built for different map
+        """
+        with open(file, 'rb') as f:
+            header = f.read(HEADER.size)
+            if len(header) != HEADER.size:
+                raise ValueError('Not a landmark index: ' + str(file))
+            magic, k, size, fingerprint = HEADER.unpack(header)
+            if magic != MAGIC:
+                raise ValueError('Not a landmark index: ' + str(file))
+            if fingerprint != terrain_fingerprint(graph) or size != len(_vertex_indexes(graph)[0]):
+                raise ValueError('Landmark index was built for different map: ' + str(file))
+
+            arrays = []
+            for length in [k] + [size] * (4 * k):
+                values = array('i')
+                try:
+                    values.fromfile(f, length)
+                except EOFError:
+                    raise ValueError('Landmark index is truncated: ' + str(file))
+                if sys.byteorder == 'big':
+                    values.byteswap()
+                arrays.append(values)
+
+        landmarks, rest = arrays[0], iter(arrays[1:])
+        tables = {False: [], True: []}
+        for _ in range(k):
+            for teleports_activated in (False, True):
+                tables[teleports_activated].append((next(rest), next(rest)))
+        return cls(graph, landmarks, tables)
+
+    @classmethod
+    def for_map(cls, map_file, graph, k=8):
+        """
+        Loads index stored next to map file (map_file + '.alt'), builds and stores it if it is missing or outdated
+        :return: LandmarkIndex
+        """
+        file = map_file + '.alt'
+        try:
+            return cls.load(file, graph)
+        except (OSError, ValueError):
+            pass
+        index = cls.build(graph, k)
+        index.save(file)
+        return index
+
+    def _arrays(self):
+        # same order as in load, landmark after landmark, walking before teleporting, from before to
+        for i in range(len(self.landmarks)):
+            for teleports_activated in (False, True):
+                yield from self.tables[teleports_activated][i]
@@ -1,10 +1,22 @@
 #! python3
 
+import os
+import random
 import sys
-import heapq
-from functools import total_ordering, reduce
+from array import array
+from functools import reduce, total_ordering
 
 import itertools
+import time
+import warnings
+
+from priority_queue import PriorityQueue
+from distance_field import field_search
+from hierarchy import ClusterHierarchy
+from incremental import IncrementalPlanner
+from landmarks import LandmarkIndex
+from paths import Path, write_path
+from search_stats import phase
 
 """
 Symbol: cost, description
@@ -23,6 +35,8 @@ get to all princesses in shortest time.
 
 @total_ordering
 class Node:
+    __slots__ = ('value', 'x', 'y')
+
     def __init__(self, value, x, y):
         self.value = value
         self.x = x
@@ -33,7 +47,8 @@ class Node:
 
     @staticmethod
     def _is_valid_operand(other):
-        return hasattr(other, 'value') and hasattr(other, 'x') and hasattr(other, 'y')
+        # isinstance is checked first, Nodes are compared a lot inside priority queues
+        return isinstance(other, Node) or hasattr(other, 'value') and hasattr(other, 'x') and hasattr(other, 'y')
 
     def __eq__(self, other):
         if not self._is_valid_operand(other):
@@ -45,8 +60,9 @@ class Node:
             return NotImplemented
         return (self.x, self.y, self.value) < (other.x, other.y, other.value)
 
-    def __hash__(self, *args, **kwargs):
-        return super().__hash__(*args, **kwargs)
+    def __hash__(self):
+        # equal Nodes must have equal hash, compact graphs create new Node objects for same tile
+        return hash((self.x, self.y))
 
 
 class TerrainGraph:
@@ -62,11 +78,20 @@ class TerrainGraph:
         if width == 0:
             raise ValueError('Map must be size at least 1x1.')
 
+        self.width = max(map(len, terrain))     # width of longest line, tile index is y * width + x (see paths.py)
+        self.height = height
         self.nodes = {}             # {(x, y): Node(...), ...}     fast access to Node in x,y coord
         self.edges = {}             # {Node(...): {Node(...): x, ...}}     fast access to neighbours of Node
-        self.teleports = {}         # {Node1(...): {Node2(...), ...}}     instant teleport from Node to Node2
+        self.teleports = {}         # {'0': [Node(...), ...], ...}     teleport groups, tiles with same number
+        self.hubs = {}              # {'0': Node('0', -1, 0), ...}     virtual hub Node of teleport group
         self.dragon = None          # Node(...)      Node where value is 'D' (can be only one)
         self.princesses = set()     # set(Node(...))    Nodes where value is 'P'
+        self.generators = set()     # set(Node(...))    Nodes where value is 'G'
+        self.landmarks = None       # LandmarkIndex(...)    needed by 'alt' search, see landmarks.py
+        self.hierarchy = None       # ClusterHierarchy(...)     needed by 'hpa' search, see hierarchy.py
+        self.reachability = None    # ReachabilityIndex(...)    rejects unreachable targets, see reachability.py
+        self.grid = None            # TerrainGrid(...)      cost grid of 'numpy' search, built by its first search
+        self.planners = {}          # {(source, teleports_activated, generators_activate): IncrementalPlanner(...)}
 
         teleports_coords = [[] for _ in range(10)]  # [[(x,y),...],...}     temporary, coordinates for teleports
         for y, line in enumerate(terrain):
@@ -82,6 +107,8 @@ class TerrainGraph:
                     self.dragon = node
                 elif symbol == 'P':
                     self.princesses.add(node)
+                elif symbol == 'G':
+                    self.generators.add(node)
 
         # connect basic paths
         for node in self.nodes.values():
@@ -106,33 +133,143 @@ class TerrainGraph:
             if right:
                 self.edges[node][right] = cost
 
-        # connect teleports
-        for teleport_num in range(len(teleports_coords)):   # for each teleport number
-            for node in teleports_coords[teleport_num]:     # for each node in teleport number set
-                self.teleports[node] = set()    # add teleport as key
-                for t in teleports_coords[teleport_num]:    # add other teleports from set
-                    if node != t:
-                        self.teleports[node].add(t)
+        # connect teleports, instead of edges between all tiles of group (n^2) every group has virtual hub,
+        # teleporting goes tile -> hub -> tile (2n edges), hub is outside of map
+        for teleport_num, group in enumerate(teleports_coords):
+            if group:
+                self.teleports[str(teleport_num)] = group
+                self.hubs[str(teleport_num)] = Node(str(teleport_num), -1, teleport_num)
 
     def get_node(self, x, y) -> Node:
         return self.nodes.get((x, y), None)
 
+    def set_tile(self, x, y, symbol):
+        """
+        Changes tile of map in place, its Node keeps identity and gets new value. Edges, teleport groups,
+        dragon, princesses and generators are updated. Landmarks, hierarchy, reachability and grid describe
+        old map, so they are dropped, incremental planners in self.planners are told which vertices changed.
+        :return: list of vertices whose edges changed (tile, its neighbours and teleport hubs), [] if tile is same
+        :raises ValueError: if there is no such tile, symbol is unknown or map would have second dragon
+        """
+        node = self.get_node(x, y)
+        if node is None:
+            raise ValueError('No tile at [{}, {}].'.format(x, y))
+        if symbol not in self.FOOT_DISTANCE:
+            raise ValueError('Unknown tile symbol: ' + str(symbol))
+        if symbol == 'D' and self.dragon is not None and self.dragon is not node:
+            raise ValueError('Map can have only one dragon.')
+        old = node.value
+        if old == symbol:
+            return []
+
+        # remove tile while Node still has old value, Nodes are compared with value
+        affected = [self.hubs[old]] if old in self.hubs else []
+        if old == 'D':
+            self.dragon = None
+        self.princesses.discard(node)
+        self.generators.discard(node)
+        if old in self.teleports:
+            self.teleports[old].remove(node)
+            if not self.teleports[old]:
+                del self.teleports[old]
+                del self.hubs[old]
+
+        node.value = symbol
+        if symbol == 'D':
+            self.dragon = node
+        elif symbol == 'P':
+            self.princesses.add(node)
+        elif symbol == 'G':
+            self.generators.add(node)
+        elif symbol in self.TELEPORT_DISTANCE:
+            if symbol not in self.teleports:
+                self.teleports[symbol] = []
+                self.hubs[symbol] = Node(symbol, -1, int(symbol))
+            self.teleports[symbol].append(node)
+            affected.append(self.hubs[symbol])
+
+        neighbours = [neighbour for neighbour in (self.get_node(x, y - 1), self.get_node(x, y + 1),
+                                                  self.get_node(x - 1, y), self.get_node(x + 1, y)) if neighbour]
+        cost = self.FOOT_DISTANCE[symbol]
+        self.edges[node] = {} if cost == sys.maxsize else {neighbour: cost for neighbour in neighbours}
+
+        affected += [node] + neighbours
+        self.landmarks = None
+        self.hierarchy = None
+        self.reachability = None
+        self.grid = None
+        for planner in self.planners.values():
+            planner.changed(affected)
+        return affected
+
     def get_neighbours(self, node, teleports_activated=False):
         neighbours = self.edges.get(node)
-        if teleports_activated and self.teleports.get(node):
-            for teleport_exist in self.teleports.get(node):         # get all teleport exits
-                cost = self.TELEPORT_DISTANCE[node.value]
+        if teleports_activated and node.value in self.teleports:
+            neighbours = dict(neighbours)   # copy, graph edges must stay same
+            cost = self.TELEPORT_DISTANCE[node.value]
+            for teleport_exist in self.teleports[node.value]:         # get all teleport exits
                 # check if teleport route is faster then by walking, (in case 0 its always faster)
-                if teleport_exist not in neighbours.keys() or cost < neighbours.get(teleport_exist):
+                if teleport_exist != node and (teleport_exist not in neighbours or cost < neighbours[teleport_exist]):
                     neighbours[teleport_exist] = cost   # add possible teleport exit with set cost by distance
         return neighbours
 
     def get_distance_to_neighbour(self, source, neighbour, teleports_activated=False):
         direct = self.edges.get(source).get(neighbour, sys.maxsize)
-        teleport = self.TELEPORT_DISTANCE.get(source.value) \
-            if teleports_activated and neighbour in self.teleports.get(source) else sys.maxsize
+        teleport = self.TELEPORT_DISTANCE.get(source.value, sys.maxsize) \
+            if teleports_activated and source != neighbour and source.value == neighbour.value else sys.maxsize
         return min(direct, teleport)
 
+    # search algorithms work with vertices, for this graph vertex is Node itself
+    def vertex(self, node):
+        return self.nodes.get((node.x, node.y))
+
+    def node(self, vertex) -> Node:
+        return vertex
+
+    def trace_nodes(self, vertices):
+        """
+        :return: array of Nodes for vertices, without teleport hubs
+        """
+        return [vertex for vertex in vertices if vertex.x >= 0]
+
+    def coords(self, vertex):
+        """
+        :return: tuple (x, y), x is -1 for teleport hub
+        """
+        return vertex.x, vertex.y
+
+    def symbol(self, vertex):
+        return vertex.value
+
+    def neighbours(self, vertex, teleports_activated=False):
+        """
+        :return: iterable of (neighbour_vertex, cost), teleport exits are reached through hub of teleport group
+        """
+        if vertex.x < 0:    # hub, exit to any tile of group, (group may be emptied by set_tile)
+            return [(teleport_exit, 0) for teleport_exit in self.teleports.get(vertex.value, ())]
+        neighbours = self.edges[vertex].items()
+        if teleports_activated and vertex.value in self.hubs:
+            return list(neighbours) + [(self.hubs[vertex.value], self.TELEPORT_DISTANCE[vertex.value])]
+        return neighbours
+
+    def reverse_neighbours(self, vertex, teleports_activated=False):
+        """
+        Edges leading into vertex, cost is paid when leaving tile, so it is cost of predecessor not of vertex
+        :return: list of (predecessor_vertex, cost)
+        """
+        if vertex.x < 0:    # hub, entered from any tile of group
+            return [(teleport, self.TELEPORT_DISTANCE[vertex.value])
+                    for teleport in self.teleports.get(vertex.value, ())]
+        result = []
+        for x, y in ((vertex.x, vertex.y - 1), (vertex.x, vertex.y + 1), (vertex.x - 1, vertex.y),
+                     (vertex.x + 1, vertex.y)):
+            predecessor = self.nodes.get((x, y))
+            if predecessor is not None and vertex in self.edges[predecessor]:
+                result.append((predecessor, self.edges[predecessor][vertex]))
+        if teleports_activated and vertex.value in self.hubs:
+            result.append((self.hubs[vertex.value], 0))
+        return result
+
     def __str__(self):
         nodes = "{"
         for coords, node in self.nodes.items():
@@ -148,170 +285,842 @@ class TerrainGraph:
         edges += "}"
 
         teleports = "{\n"
-        for src, dsts in self.teleports.items():
-            teleports += "\t" + str(src) + ": {"
-            for node in dsts:
-                teleports += "\n\t\t" + str(node) + ": " + str(self.TELEPORT_DISTANCE.get(node.value)) + ","
+        for teleport_num, group in self.teleports.items():
+            teleports += "\t" + teleport_num + " (" + str(self.TELEPORT_DISTANCE.get(teleport_num)) + "): {"
+            for node in group:
+                teleports += "\n\t\t" + str(node) + ","
             teleports += "\n\t},\n"
         teleports += "}"
 
         return "Terrain graph:\nNodes: " + nodes + "\nNormal edges: " + edges + "\nTeleports: " + teleports
 
 
-def shortest_path_any(start, end_nodes, graph, teleports_activated=False):
-    def change_distance(q, u, d):
+class CompactTerrainGraph:
+    """
+    Memory efficient version of TerrainGraph, suitable for big maps.
+
+    Tiles are stored in flat bytearray indexed by y*width+x, neighbours are computed from index
+    and costs are looked up in table built from TerrainGraph.FOOT_DISTANCE.
+    Vertices used by search algorithms are tile indexes, Node objects are created only when asked for.
+    """
+    FOOT_DISTANCE = TerrainGraph.FOOT_DISTANCE
+    TELEPORT_DISTANCE = TerrainGraph.TELEPORT_DISTANCE
+
+    def __init__(self, terrain):
+        height = len(terrain)
+        if height == 0:
+            raise ValueError('Map must be size at least 1x1.')
+        width = len(terrain[0])
+        if width == 0:
+            raise ValueError('Map must be size at least 1x1.')
+        if any(len(line) != width for line in terrain):
+            raise ValueError('All map lines must have same width.')
+        self._setup(bytearray(''.join(terrain), 'ascii'), width, height)
+
+    @classmethod
+    def from_buffer(cls, tiles, width, height, dragon=-1, princesses=None, generators=None, teleports=None):
         """
-        :param q: priority queue
-        :param u: vertex
-        :param d: new distance
+        Builds graph over existing buffer of tiles (bytearray, mmap, ...), buffer is not copied.
+        Key tiles can be given as indexes when they are already known (see binary_map.py), otherwise tiles are scanned.
+        :param tiles: tile symbols, tile (x, y) is on index y*width+x, must be writable for set_tile
+        :param dragon: index of dragon tile, -1 if there is no dragon
+        :param princesses: iterable of indexes of 'P' tiles
+        :param generators: iterable of indexes of 'G' tiles
+        :param teleports: {ord('0'): array('i', [index, ...]), ...}
+        :raises ValueError: if size of buffer does not match width and height
         """
-        for i, node in enumerate(q):
-            if node[1] == u:
-                q[i] = (d, node[1])
-                break
-        heapq.heapify(q)
+        if width <= 0 or height <= 0:
+            raise ValueError('Map must be size at least 1x1.')
+        if len(tiles) != width * height:
+            raise ValueError('Map buffer has {} tiles, expected {}x{}.'.format(len(tiles), width, height))
+        graph = cls.__new__(cls)
+        graph._setup(tiles, width, height, dragon, princesses, generators, teleports)
+        return graph
+
+    @classmethod
+    def from_file(cls, file, chunk_size=1 << 20):
+        """
+        Builds graph from text map file without holding its lines, file is read in chunks of chunk_size bytes
+        and every row is copied into tile buffer and scanned for key tiles as soon as it is complete.
+        Whitespace around rows is stripped and empty lines at end of file are ignored, same as in load_map_from_file.
+        :raises ValueError: if map is empty, rows have different width or there is empty line inside map
+        """
+        with open(file, 'rb') as f:
+            # text has at least as many bytes as tiles, buffer is cut to real size at the end, so it never grows
+            tiles = bytearray(os.fstat(f.fileno()).st_size)
+            size = width = height = 0
+            dragon = -1
+            princesses, generators = array('i'), array('i')
+            teleports = {}
+            rest = b''
+            blank = False       # empty line was found, only empty lines can follow
+            while True:
+                chunk = f.read(chunk_size)
+                lines = (rest + chunk).split(b'\n')
+                rest = lines.pop() if chunk else b''     # last line can continue in next chunk
+                for line in lines:
+                    line = line.strip()
+                    if not line:
+                        blank = True
+                        continue
+                    if blank:
+                        raise ValueError('Empty line inside map.')
+                    if height == 0:
+                        width = len(line)
+                    elif len(line) != width:
+                        raise ValueError('All map lines must have same width.')
+                    tiles[size:size + width] = line
+                    height += 1
+
+                    if line.translate(None, b'CHN'):      # row contains key tiles
+                        for symbol in b'DPG0123456789':
+                            index = line.find(symbol)
+                            while index != -1:
+                                if symbol == ord('D'):
+                                    if dragon == -1:
+                                        dragon = size + index
+                                elif symbol == ord('P'):
+                                    princesses.append(size + index)
+                                elif symbol == ord('G'):
+                                    generators.append(size + index)
+                                else:
+                                    teleports.setdefault(symbol, array('i')).append(size + index)
+                                index = line.find(symbol, index + 1)
+                    size += width
+                if not chunk:
+                    break
+        del tiles[size:]
+
+        if size == 0:
+            raise ValueError('Map must be size at least 1x1.')
+        return cls.from_buffer(tiles, width, height, dragon, princesses, generators, teleports)
+
+    def _setup(self, tiles, width, height, dragon=-1, princesses=None, generators=None, teleports=None):
+        self.width = width
+        self.height = height
+        self.tiles = tiles          # tile symbols, tile (x, y) is on index y*width+x
+        # cost of leaving tile indexed by its symbol, unknown symbols cannot be traversed
+        self.costs = array('q', [sys.maxsize] * 256)
+        for symbol, cost in self.FOOT_DISTANCE.items():
+            self.costs[ord(symbol)] = cost
+
+        self.teleports = {}         # {ord('0'): array('i', [index, ...]), ...}     tiles of each teleport group
+        # teleport group with number n has virtual hub vertex width*height+n, teleporting goes tile -> hub -> tile
+        self.dragon = None          # Node(...)      Node where value is 'D' (can be only one)
+        self.princesses = set()     # set(Node(...))    Nodes where value is 'P'
+        self.generators = set()     # set(Node(...))    Nodes where value is 'G'
+        self.landmarks = None       # LandmarkIndex(...)    needed by 'alt' search, see landmarks.py
+        self.hierarchy = None       # ClusterHierarchy(...)     needed by 'hpa' search, see hierarchy.py
+        self.reachability = None    # ReachabilityIndex(...)    rejects unreachable targets, see reachability.py
+        self.grid = None            # TerrainGrid(...)      cost grid of 'numpy' search, built by its first search
+        self.planners = {}          # {(source, teleports_activated, generators_activate): IncrementalPlanner(...)}
+
+        if princesses is None:      # key tiles are not known, scan tiles for them
+            dragon = self.tiles.find(b'D')
+            princesses = self._find(b'P')
+            generators = self._find(b'G')
+            teleports = {}
+            for symbol in self.TELEPORT_DISTANCE:
+                group = array('i', self._find(symbol.encode()))
+                if group:
+                    teleports[ord(symbol)] = group
+
+        if dragon != -1:
+            self.dragon = self.node(dragon)
+        self.princesses.update(map(self.node, princesses))
+        self.generators.update(map(self.node, generators))
+        self.teleports.update(teleports)
+
+    def _find(self, symbol):
+        """
+        :return: generator of indexes of tiles with symbol
+        """
+        index = self.tiles.find(symbol)
+        while index != -1:
+            yield index
+            index = self.tiles.find(symbol, index + 1)
 
-    teleport_trace = None
+    def get_node(self, x, y) -> Node:
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return self.node(y * self.width + x)
+        return None
 
-    gpt = get_predecesors_trace     # just alias for that long function name
+    def set_tile(self, x, y, symbol):
+        """
+        Changes tile of map in place, same as TerrainGraph.set_tile
+        :return: list of vertices whose edges changed (tile, its neighbours and teleport hubs), [] if tile is same
+        :raises ValueError: if there is no such tile, symbol is unknown or map would have second dragon
+        """
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            raise ValueError('No tile at [{}, {}].'.format(x, y))
+        if symbol not in self.FOOT_DISTANCE:
+            raise ValueError('Unknown tile symbol: ' + str(symbol))
+        vertex = y * self.width + x
+        if symbol == 'D' and self.dragon is not None and self.vertex(self.dragon) != vertex:
+            raise ValueError('Map can have only one dragon.')
+        old = self.tiles[vertex]
+        if old == ord(symbol):
+            return []
+
+        size = len(self.tiles)
+        affected = []
+        node = self.node(vertex)    # Node with old value, Nodes are compared with value
+        if old == ord('D'):
+            self.dragon = None
+        self.princesses.discard(node)
+        self.generators.discard(node)
+        if old in self.teleports:
+            self.teleports[old].remove(vertex)
+            if not self.teleports[old]:
+                del self.teleports[old]
+            affected.append(size + old - ord('0'))
+
+        self.tiles[vertex] = ord(symbol)
+        node = self.node(vertex)
+        if symbol == 'D':
+            self.dragon = node
+        elif symbol == 'P':
+            self.princesses.add(node)
+        elif symbol == 'G':
+            self.generators.add(node)
+        elif symbol in self.TELEPORT_DISTANCE:
+            self.teleports.setdefault(ord(symbol), array('i')).append(vertex)
+            affected.append(size + ord(symbol) - ord('0'))
+
+        affected += [vertex] + [neighbour for neighbour, exists in (
+            (vertex - self.width, y > 0), (vertex + self.width, y < self.height - 1),
+            (vertex - 1, x > 0), (vertex + 1, x < self.width - 1)) if exists]
+        self.landmarks = None
+        self.hierarchy = None
+        self.reachability = None
+        self.grid = None
+        for planner in self.planners.values():
+            planner.changed(affected)
+        return affected
 
-    # {Node(...): x, ...}       where x is distance from start node to Node
-    shortest_distances = {node: sys.maxsize for node in graph.nodes.values()}
-    shortest_distances[start] = 0       # where we start, its distance 0
-    predecessors = {}       # {Node1(...): Node2(...), ...}         where Node1 is child of Node2
+    def get_neighbours(self, node, teleports_activated=False):
+        source = self.vertex(node)
+        neighbours = {self.node(vertex): cost for vertex, cost in self.neighbours(source)}
+        symbol = self.tiles[source]
+        if teleports_activated and symbol in self.teleports:
+            cost = self.TELEPORT_DISTANCE[chr(symbol)]
+            for teleport_exit in map(self.node, self.teleports[symbol]):
+                if teleport_exit != node and (teleport_exit not in neighbours or cost < neighbours[teleport_exit]):
+                    neighbours[teleport_exit] = cost
+        return neighbours
 
-    # priority queue
-    calculated_distances = [(0, node) if node == start else (sys.maxsize, node) for node in graph.nodes.values()]
-    heapq.heapify(calculated_distances)
+    def get_distance_to_neighbour(self, source, neighbour, teleports_activated=False):
+        source, neighbour = self.vertex(source), self.vertex(neighbour)
+        direct = sys.maxsize
+        if abs(source - neighbour) == self.width or \
+                abs(source - neighbour) == 1 and source // self.width == neighbour // self.width:
+            direct = self.costs[self.tiles[source]]
+        symbol = chr(self.tiles[source])
+        teleport = self.TELEPORT_DISTANCE.get(symbol, sys.maxsize) \
+            if teleports_activated and source != neighbour and self.tiles[source] == self.tiles[neighbour] \
+            else sys.maxsize
+        return min(direct, teleport)
+
+    def vertex(self, node):
+        return node.y * self.width + node.x
+
+    def node(self, vertex) -> Node:
+        return Node(chr(self.tiles[vertex]), vertex % self.width, vertex // self.width)
+
+    def trace_nodes(self, vertices):
+        """
+        :return: array of Nodes for vertices, without teleport hubs
+        """
+        size = len(self.tiles)
+        return [self.node(vertex) for vertex in vertices if vertex < size]
+
+    def coords(self, vertex):
+        """
+        :return: tuple (x, y), x is -1 for teleport hub
+        """
+        if vertex >= len(self.tiles):
+            return -1, vertex - len(self.tiles)
+        return vertex % self.width, vertex // self.width
+
+    def symbol(self, vertex):
+        if vertex >= len(self.tiles):   # hub
+            return chr(vertex - len(self.tiles) + ord('0'))
+        return chr(self.tiles[vertex])
+
+    def neighbours(self, vertex, teleports_activated=False):
+        """
+        :return: list of (neighbour_vertex, cost), same order as in TerrainGraph (top, bottom, left, right, hub),
+            teleport exits are reached through hub of teleport group
+        """
+        size = len(self.tiles)
+        if vertex >= size:  # hub, exit to any tile of group, (group may be emptied by set_tile)
+            return [(teleport_exit, 0) for teleport_exit in self.teleports.get(vertex - size + ord('0'), ())]
+
+        symbol = self.tiles[vertex]
+        cost = self.costs[symbol]
+        if cost == sys.maxsize:     # cannot traverse
+            return []
+
+        width = self.width
+        x = vertex % width
+        result = []
+        if vertex >= width:
+            result.append((vertex - width, cost))
+        if vertex + width < size:
+            result.append((vertex + width, cost))
+        if x > 0:
+            result.append((vertex - 1, cost))
+        if x < width - 1:
+            result.append((vertex + 1, cost))
+
+        if teleports_activated and symbol in self.teleports:
+            result.append((size + symbol - ord('0'), self.TELEPORT_DISTANCE[chr(symbol)]))
+        return result
+
+    def reverse_neighbours(self, vertex, teleports_activated=False):
+        """
+        Edges leading into vertex, cost is paid when leaving tile, so it is cost of predecessor not of vertex
+        :return: list of (predecessor_vertex, cost)
+        """
+        size = len(self.tiles)
+        if vertex >= size:  # hub, entered from any tile of group
+            symbol = vertex - size + ord('0')
+            return [(teleport, self.TELEPORT_DISTANCE[chr(symbol)]) for teleport in self.teleports.get(symbol, ())]
+
+        tiles = self.tiles
+        costs = self.costs
+        width = self.width
+        x = vertex % width
+        result = []
+        for predecessor, exists in ((vertex - width, vertex >= width), (vertex + width, vertex + width < size),
+                                    (vertex - 1, x > 0), (vertex + 1, x < width - 1)):
+            if exists:
+                cost = costs[tiles[predecessor]]
+                if cost != sys.maxsize:
+                    result.append((predecessor, cost))
+
+        symbol = tiles[vertex]
+        if teleports_activated and symbol in self.teleports:
+            result.append((size + symbol - ord('0'), 0))
+        return result
+
+    def __str__(self):
+        width = self.width
+        rows = [self.tiles[y * width:(y + 1) * width].decode() for y in range(self.height)]
+        return "Compact terrain graph {}x{}:\n".format(width, self.height) + "\n".join(rows)
+
+
+def dijkstra(graph, source, targets, teleports_activated=False, generators_activate=True, heuristic=None,
+             stats=None, max_distance=sys.maxsize):
+    """
+    Dijkstra over layered state space (vertex, teleports_active), stepping on 'G' moves search
+    from layer without teleports into layer with teleports. That answers paths with and without
+    teleports in single search and graph is never changed.
+    :param graph: graph with specified distances
+    :param source: source vertex
+    :param targets: set of vertices, search ends when all of them have shortest path calculated
+    :param teleports_activated: true if teleports are already activated at source
+    :param generators_activate: false to stay in starting layer, ('G' behaves as normal tile)
+    :param heuristic: function state -> lower bound of distance to targets, makes search A*,
+        must be consistent (see astar_heuristic)
+    :param stats: SearchStats to count into, or None
+    :param max_distance: budget, states farther than it are not searched, search ends when every state
+        inside budget is settled
+    :return: tuple (shortest_distances, predecessors)
+        - shortest_distances: {(vertex, teleports_active): x, ...}     where x is distance from source,
+          missing state is unreachable (or farther than max_distance)
+        - predecessors: {state1: state2, ...}     where state1 is child of state2
+    """
+    if generators_activate and graph.symbol(source) == 'G':
+        teleports_activated = True
+    source = (source, teleports_activated)
+    shortest_distances = {source: 0}
+    predecessors = {}
+    pq = PriorityQueue()
+    pq.push(source, heuristic(source) if heuristic else 0)
+    done = set()
+    targets_to_compute = set(targets)
+    # target settled without teleports waits, it can be reached with activated teleports by same distance
+    can_activate = generators_activate and not teleports_activated and bool(graph.generators)
+    pending = {}        # {vertex: distance, ...}
+    pops = pushes = relaxations = 0     # counted in locals, so disabled stats cost nothing
 
-    done = set()       # nodes which already have shortest path calculated
+    while pq:
+        priority, cun = pq.pop()        # cun = closest unprocessed state
+        pops += 1
+        if priority > max_distance:     # everything else is over budget, (heuristic never overestimates)
+            break
+        if pending:
+            for vertex in [vertex for vertex, distance in pending.items() if distance < priority]:
+                del pending[vertex]
+                targets_to_compute.remove(vertex)
+            if not targets_to_compute:
+                break
 
-    while calculated_distances:
-        distance, cun = heapq.heappop(calculated_distances)        # cun = closest unprocessed node
+        distance = shortest_distances[cun]
         done.add(cun)
-        neighbours = graph.get_neighbours(cun, teleports_activated)
-        for neighbour in neighbours:
+        vertex, layer = cun
+        if vertex in targets_to_compute:
+            if layer or not can_activate:
+                targets_to_compute.remove(vertex)
+                pending.pop(vertex, None)
+                if not targets_to_compute:      # all targets are settled
+                    break
+            else:
+                pending[vertex] = distance
+
+        edges = graph.neighbours(vertex, layer)
+        relaxations += len(edges)
+        for neighbour, cost in edges:
+            # step on 'G' activates teleports
+            neighbour = (neighbour, layer or can_activate and graph.symbol(neighbour) == 'G')
             if neighbour not in done:
-                current_distance = shortest_distances.get(cun) + graph.get_distance_to_neighbour(cun, neighbour)
-                if current_distance < shortest_distances.get(neighbour):
-                    # chance distance of neighbour to distance of cun + distance from cun to neighbour
+                current_distance = distance + cost
+                if current_distance <= max_distance and \
+                        current_distance < shortest_distances.get(neighbour, sys.maxsize):
                     shortest_distances[neighbour] = current_distance
-                    # set neighbour's parent
                     predecessors[neighbour] = cun
-                    # chance distance in priority queue
-                    change_distance(calculated_distances, neighbour, current_distance)
+                    pq.push(neighbour, current_distance + heuristic(neighbour) if heuristic else current_distance)
+                    pushes += 1
+
+    if stats is not None:
+        _count_search(stats, predecessors, pushes + 1, pops, relaxations, len(done))
+    return shortest_distances, predecessors
 
-        # also check if cun is 'G' and calculate shortest_path_any(cun, end_nodes, graph, True)
-        if cun.value == 'G' and not teleports_activated:
-            teleport_trace, _ = shortest_path_any(cun, end_nodes, graph, True)
-            teleport_trace = gpt(predecessors, cun)[:-1] + teleport_trace
 
-    # determine which Node from end_nodes set has lowest distance from start
-    closest_end_node = list(end_nodes)
-    gtd = get_trace_distance    # just alias
-    reduce(lambda l, r: l if gtd(graph, gpt(predecessors, l)) < gtd(graph, gpt(predecessors, r)) else r,
-           closest_end_node)
-    closest_end_node = list(end_nodes)[0]
+def _count_search(stats, predecessors, pushes, pops, relaxations, expanded):
+    """
+    Adds counters of one finished search into stats, activations are counted from predecessors afterwards,
+    so search loop does not need to check them
+    """
+    activations = sum(1 for state, parent in predecessors.items() if state[1] and not parent[1])
+    stats.add(searches=1, pushes=pushes, pops=pops, relaxations=relaxations, expanded=expanded,
+              teleport_activations=activations)
 
-    foot_trace = gpt(predecessors, closest_end_node)
 
-    return (foot_trace, teleports_activated) if not teleport_trace or gtd(graph, foot_trace) < gtd(graph, teleport_trace) \
-        else (teleport_trace, True)
+def dial(graph, source, targets, teleports_activated=False, generators_activate=True, stats=None,
+         max_distance=sys.maxsize):
+    """
+    Dial's algorithm, Dijkstra with circular array of buckets instead of heap.
+    Edge costs are small integers (0 to 2), so bucket for distance d is buckets[d % (max_cost + 1)]
+    and every state is pushed and popped in O(1). Parameters and return value are same as in dijkstra.
+    """
+    if generators_activate and graph.symbol(source) == 'G':
+        teleports_activated = True
+    max_cost = max(cost for cost in itertools.chain(graph.FOOT_DISTANCE.values(), graph.TELEPORT_DISTANCE.values())
+                   if cost != sys.maxsize)
+    buckets = [[] for _ in range(max_cost + 1)]    # [[state, ...], ...]     may contain stale states
+
+    source = (source, teleports_activated)
+    shortest_distances = {source: 0}
+    predecessors = {}
+    buckets[0].append(source)
+    queued = 1      # number of states in buckets
+    done = set()
+    targets_to_compute = set(targets)
+    # same as in dijkstra, target settled without teleports waits for same distance with teleports
+    can_activate = generators_activate and not teleports_activated and bool(graph.generators)
+    pending = {}        # {vertex: distance, ...}
+
+    neighbours = graph.neighbours     # local aliases, this loop is hot
+    symbol = graph.symbol
+    get_distance = shortest_distances.get
+    size = len(buckets)
+    pops = pushes = relaxations = 0
 
+    distance = 0
+    while queued and distance <= max_distance:
+        if pending:
+            for vertex in [vertex for vertex, settled in pending.items() if settled < distance]:
+                del pending[vertex]
+                targets_to_compute.remove(vertex)
+            if not targets_to_compute:
+                break
 
-def shortest_path_all(source, end_nodes, graph, teleports_status=False):
+        bucket = buckets[distance % size]
+        while bucket:       # zero cost edges add into current bucket
+            cun = bucket.pop()
+            queued -= 1
+            pops += 1
+            if cun in done or shortest_distances[cun] != distance:    # stale
+                continue
+            done.add(cun)
+            vertex, layer = cun
+            if vertex in targets_to_compute:
+                if layer or not can_activate:
+                    targets_to_compute.remove(vertex)
+                    pending.pop(vertex, None)
+                    if not targets_to_compute:      # all targets are settled, ends both loops
+                        queued = 0
+                        break
+                else:
+                    pending[vertex] = distance
+
+            edges = neighbours(vertex, layer)
+            relaxations += len(edges)
+            for neighbour, cost in edges:
+                neighbour = (neighbour, layer or can_activate and symbol(neighbour) == 'G')
+                if neighbour not in done:
+                    current_distance = distance + cost
+                    if current_distance <= max_distance and current_distance < get_distance(neighbour, sys.maxsize):
+                        shortest_distances[neighbour] = current_distance
+                        predecessors[neighbour] = cun
+                        buckets[current_distance % size].append(neighbour)
+                        queued += 1
+                        pushes += 1
+        distance += 1
+
+    if stats is not None:
+        _count_search(stats, predecessors, pushes + 1, pops, relaxations, len(done))
+    return shortest_distances, predecessors
+
+
+def bidirectional(graph, source, targets, teleports_activated=False, generators_activate=True, stats=None,
+                  max_distance=sys.maxsize):
+    """
+    Bidirectional Dijkstra for point to point queries, search grows from source and backward from targets
+    over reversed edges (see reverse_neighbours), so each side only reaches about half of distance.
+    Cost is paid when leaving tile, reversed edge keeps cost of tile it leads from.
+    Finds only path to closest target, parameters are same as in dijkstra.
+    :return: tuple (shortest_distances, predecessors), both contain only states on found path
+        (only source if no target is reachable)
+    """
+    if generators_activate and graph.symbol(source) == 'G':
+        teleports_activated = True
+    can_activate = generators_activate and not teleports_activated and bool(graph.generators)
+    source = (source, teleports_activated)
+    # walking path is searched first, ('G' behaves as normal tile), its distance is budget of search with
+    # teleports, which is limited to what it can beat, path with activated teleports wins on same distance.
+    # Walking path through 'G' has path of same distance with activated teleports, so that one is found instead.
+    # Search with teleports is skipped when every 'G' is too far to beat walking path.
+    found = _bidirectional_path(graph, source, [(target, teleports_activated) for target in targets], False, stats,
+                                max_distance)
+    budget = max_distance if found is None else found[0]
+    if can_activate and _generator_bound(graph, source[0], targets) <= budget:
+        path = _bidirectional_path(graph, source, [(target, True) for target in targets], True, stats, budget)
+        if path is not None:
+            found = path
+
+    if found is None:
+        return {source: 0}, {}
+
+    # distances along path, from edge costs
+    _, path = found
+    shortest_distances = {source: 0}
+    predecessors = {}
+    for previous, state in zip(path, path[1:]):
+        cost = min(cost for vertex, cost in graph.neighbours(previous[0], previous[1]) if vertex == state[0])
+        shortest_distances[state] = shortest_distances[previous] + cost
+        predecessors[state] = previous
+    return shortest_distances, predecessors
+
+
+def _generator_bound(graph, source, targets):
+    """
+    Lower bound of distance from source to closest target over path which steps on 'G', Manhattan distances
+    scaled by lowest tile cost, after 'G' path can jump between any teleport tiles for free (as in astar_heuristic)
+    """
+    min_cost = min(graph.FOOT_DISTANCE.values())
+    teleport_coords = [graph.coords(vertex) for group in graph.teleports.values() for vertex in group]
+    target_coords = [graph.coords(target) for target in targets]
+    # distance from closest teleport tile to closest target
+    exit_bound = min((abs(x - tx) + abs(y - ty) for x, y in teleport_coords for tx, ty in target_coords),
+                     default=sys.maxsize)
+    sx, sy = graph.coords(source)
+    bound = sys.maxsize
+    for generator in graph.generators:
+        gx, gy = generator.x, generator.y
+        entry_bound = min((abs(x - gx) + abs(y - gy) for x, y in teleport_coords), default=sys.maxsize)
+        onward = min(min(abs(gx - tx) + abs(gy - ty) for tx, ty in target_coords), entry_bound + exit_bound)
+        bound = min(bound, abs(sx - gx) + abs(sy - gy) + onward)
+    return bound * min_cost
+
+
+def _bidirectional_path(graph, source, goals, can_activate, stats, max_distance):
+    """
+    Meets forward search from source state with backward search from goal states
+    :return: tuple (distance, [state, ...]) from source to one of goals, None if no goal is inside max_distance
+    """
+    symbol = graph.symbol
+    forward = {source: 0}                   # {state: distance from source, ...}
+    backward = {goal: 0 for goal in goals}  # {state: distance to closest goal, ...}
+    parents = {}                            # {state: previous state on path from source, ...}
+    children = {}                           # {state: next state on path to goal, ...}
+    forward_done = set()
+    backward_done = set()
+    forward_queue = PriorityQueue()
+    forward_queue.push(source, 0)
+    backward_queue = PriorityQueue()
+    for goal in goals:
+        backward_queue.push(goal, 0)
+
+    # best path found so far goes through meeting state, it has labels from both sides
+    best = max_distance + 1
+    meeting = source if source in backward else None
+    if meeting is not None:
+        best = 0
+    pops = pushes = relaxations = 0
+
+    while forward_queue and backward_queue:
+        forward_top, _ = forward_queue.peek()
+        backward_top, _ = backward_queue.peek()
+        # every path not seen yet is at least as long as sum of both tops
+        if forward_top + backward_top >= best:
+            break
+
+        pops += 1
+        # side with smaller frontier grows, (search stuck behind cliffs or next to teleports does not wait for other)
+        if len(forward_queue) <= len(backward_queue):
+            distance, state = forward_queue.pop()
+            forward_done.add(state)
+            vertex, layer = state
+            edges = graph.neighbours(vertex, layer)
+            relaxations += len(edges)
+            for neighbour, cost in edges:
+                neighbour = (neighbour, layer or can_activate and symbol(neighbour) == 'G')
+                current_distance = distance + cost
+                if neighbour in forward_done or current_distance > max_distance or \
+                        current_distance >= forward.get(neighbour, sys.maxsize):
+                    continue
+                forward[neighbour] = current_distance
+                parents[neighbour] = state
+                forward_queue.push(neighbour, current_distance)
+                pushes += 1
+                if neighbour in backward and current_distance + backward[neighbour] < best:
+                    best = current_distance + backward[neighbour]
+                    meeting = neighbour
+        else:
+            distance, state = backward_queue.pop()
+            backward_done.add(state)
+            vertex, layer = state
+            entered = can_activate and symbol(vertex) == 'G'    # 'G' is entered from layer without teleports
+            edges = graph.reverse_neighbours(vertex, layer)
+            relaxations += len(edges)
+            for predecessor, cost in edges:
+                if not layer:
+                    if can_activate and symbol(predecessor) == 'G':     # 'G' is never left without teleports
+                        continue
+                    predecessor_states = ((predecessor, False),)
+                elif entered:
+                    predecessor_states = ((predecessor, True), (predecessor, False))
+                else:
+                    predecessor_states = ((predecessor, True),)
+                current_distance = distance + cost
+                for predecessor_state in predecessor_states:
+                    if predecessor_state in backward_done or current_distance > max_distance or \
+                            current_distance >= backward.get(predecessor_state, sys.maxsize):
+                        continue
+                    backward[predecessor_state] = current_distance
+                    children[predecessor_state] = state
+                    backward_queue.push(predecessor_state, current_distance)
+                    pushes += 1
+                    if predecessor_state in forward and forward[predecessor_state] + current_distance < best:
+                        best = forward[predecessor_state] + current_distance
+                        meeting = predecessor_state
+
+    if stats is not None:
+        stats.add(searches=1, pushes=pushes + 1 + len(goals), pops=pops, relaxations=relaxations,
+                  expanded=len(forward_done) + len(backward_done))
+    if meeting is None:
+        return None
+
+    path = [meeting]
+    while path[-1] in parents:
+        path.append(parents[path[-1]])
+    path.reverse()
+    while path[-1] in children:
+        path.append(children[path[-1]])
+    return best, path
+
+
+def astar_heuristic(graph, targets, generators_activate=True):
+    """
+    Lower bound of distance to closest target, used by A*.
+    Without teleports its Manhattan distance scaled by lowest tile cost. Teleports can move us
+    anywhere for free, so when they are active (or can be activated by some 'G') bound is
+    lowered to distance from closest teleport tile to target.
+    Bound is consistent, so A* finds same distances as Dijkstra.
+    :param graph: graph with specified distances
+    :param targets: set of vertices
+    :param generators_activate: same as in dijkstra
+    :return: function state -> lower bound
+    """
+    min_cost = min(graph.FOOT_DISTANCE.values())
+    teleport_coords = [graph.coords(vertex) for group in graph.teleports.values() for vertex in group]
+    # [(x, y, exit_bound), ...]     exit_bound is distance from closest teleport tile to target
+    target_bounds = []
+    for target in targets:
+        tx, ty = graph.coords(target)
+        exit_bound = min((abs(x - tx) + abs(y - ty) for x, y in teleport_coords), default=sys.maxsize)
+        target_bounds.append((tx, ty, exit_bound))
+    teleports_reachable = generators_activate and bool(graph.generators)
+    hub_bound = min((bound for _, _, bound in target_bounds), default=0) * min_cost
+
+    def heuristic(state):
+        vertex, teleports_active = state
+        x, y = graph.coords(vertex)
+        if x < 0:   # teleport hub
+            return hub_bound
+        if teleports_active or teleports_reachable:
+            return min(min(abs(x - tx) + abs(y - ty), bound) for tx, ty, bound in target_bounds) * min_cost
+        return min(abs(x - tx) + abs(y - ty) for tx, ty, _ in target_bounds) * min_cost
+
+    return heuristic
+
+
+SEARCHES = ('dijkstra', 'astar', 'dial', 'numpy', 'bidirectional', 'alt', 'hpa', 'lpa')
+# held_karp_tour needs table of 2^k * k * 2 states, above this many princesses save_princess uses anytime_tour
+MAX_HELD_KARP_PRINCESSES = 16
+
+
+def find_paths(graph, source, targets, teleports_activated=False, generators_activate=True, search='dijkstra',
+               stats=None, max_distance=sys.maxsize):
+    """
+    Runs selected search algorithm, parameters and return value are same as in dijkstra
+    :param search: one of SEARCHES
+        - 'dijkstra': expands everything closer than farthest target
+        - 'astar': A* with astar_heuristic, expands less for point to point queries
+        - 'dial': Dijkstra with bucket queue, faster than heap for searches over whole map
+        - 'numpy': vectorized distance field over whole map, requires numpy (see distance_field.py)
+        - 'bidirectional': bidirectional Dijkstra for single target, (more targets are searched by dijkstra)
+        - 'alt': A* with landmark lower bounds of graph.landmarks (see landmarks.py), LandmarkIndex.build(graph)
+          is run when it is missing, (LandmarkIndex.for_map keeps index of map file on disk)
+        - 'hpa': search over cluster abstraction graph.hierarchy (see hierarchy.py), ClusterHierarchy(graph) is
+          built when it is missing, exact only with spacing=1, result contains only states on paths to targets
+        - 'lpa': incremental search (see incremental.py), planner for source is kept in graph.planners and
+          repairs its tree after graph.set_tile, result contains only states on paths to targets
+    :param stats: SearchStats to count into, or None
+    :param max_distance: budget, see dijkstra
+    Targets which graph.reachability (see reachability.py) knows to be unreachable are never searched for.
+    """
+    if graph.reachability is not None and targets:
+        reachable = {target for target in targets
+                     if graph.reachability.reachable(source, target, teleports_activated, generators_activate)}
+        if not reachable:
+            return {}, {}
+        targets = reachable
+
+    if search == 'dijkstra':
+        return dijkstra(graph, source, targets, teleports_activated, generators_activate, None, stats, max_distance)
+    if search == 'astar':
+        heuristic = astar_heuristic(graph, targets, generators_activate) if targets else None
+        return dijkstra(graph, source, targets, teleports_activated, generators_activate, heuristic, stats,
+                        max_distance)
+    if search == 'dial':
+        return dial(graph, source, targets, teleports_activated, generators_activate, stats, max_distance)
+    if search == 'alt':
+        if graph.landmarks is None:     # built on first use, set_tile drops it
+            graph.landmarks = LandmarkIndex.build(graph)
+        heuristic = None
+        if targets:
+            landmark_bound = graph.landmarks.heuristic(targets, teleports_activated, generators_activate)
+            distance_bound = astar_heuristic(graph, targets, generators_activate)
+
+            def heuristic(state):     # both bounds are consistent, so higher of them is consistent too
+                return max(landmark_bound(state), distance_bound(state))
+        return dijkstra(graph, source, targets, teleports_activated, generators_activate, heuristic, stats,
+                        max_distance)
+    if search == 'hpa':
+        if graph.hierarchy is None:     # built on first use, set_tile drops it
+            graph.hierarchy = ClusterHierarchy(graph)
+        return graph.hierarchy.search(source, targets, teleports_activated, generators_activate, stats, max_distance)
+    if search == 'lpa':
+        key = (source, teleports_activated, generators_activate)
+        if key not in graph.planners:
+            graph.planners[key] = IncrementalPlanner(graph, source, teleports_activated, generators_activate)
+        return graph.planners[key].search(targets, stats, max_distance)
+    if search == 'bidirectional':
+        if len(targets) == 1:
+            return bidirectional(graph, source, targets, teleports_activated, generators_activate, stats, max_distance)
+        return dijkstra(graph, source, targets, teleports_activated, generators_activate, None, stats, max_distance)
+    if search == 'numpy':
+        if stats is not None:   # distance field has no queue, only searches are counted
+            stats.add(searches=1)
+        # field is computed over whole map, budget only drops targets over it
+        shortest_distances, predecessors = field_search(graph, source, targets, teleports_activated,
+                                                        generators_activate)
+        for state in [state for state, distance in shortest_distances.items() if distance > max_distance]:
+            del shortest_distances[state]
+            predecessors.pop(state, None)
+        return shortest_distances, predecessors
+    raise ValueError('Unknown search: ' + str(search))
+
+
+def best_state(shortest_distances, vertex):
+    """
+    :return: tuple (state, distance) with lower distance for vertex from result of dijkstra,
+        when distances are same state with activated teleports wins
+    """
+    foot = shortest_distances.get((vertex, False), sys.maxsize)
+    teleport = shortest_distances.get((vertex, True), sys.maxsize)
+    if teleport <= foot:
+        return (vertex, True), teleport
+    return (vertex, False), foot
+
+
+def shortest_path_any(start, end_nodes, graph, teleports_activated=False, search='dijkstra', stats=None,
+                      max_distance=sys.maxsize):
+    """
+    Calculates shortest path to closest of end_nodes
+    :param start: source node, starting node
+    :param end_nodes: set of destinations
+    :param graph: graph with specified distances
+    :param teleports_activated: true if teleports are already activated, false otherwise
+    :param search: search algorithm, one of SEARCHES
+    :param stats: SearchStats, search and trace reconstruction are timed as phases 'search' and 'trace'
+    :param max_distance: budget, destinations farther than it are treated as unreachable, search stops
+        when it is exceeded (see dijkstra)
+    :return: tuple (path, teleport_activated), path is Path (see paths.py) with cost of its distance,
+        it is empty if no destination is reachable
+    """
+    end_vertices = [graph.vertex(node) for node in end_nodes]
+    with phase(stats, 'search'):
+        shortest_distances, predecessors = find_paths(graph, graph.vertex(start), set(end_vertices),
+                                                      teleports_activated, search=search, stats=stats,
+                                                      max_distance=max_distance)
+
+    # determine which vertex from end_nodes has lowest distance from start
+    state, distance = min((best_state(shortest_distances, vertex) for vertex in end_vertices), key=lambda r: r[1])
+    if distance == sys.maxsize:
+        return Path(graph), teleports_activated
+
+    with phase(stats, 'trace'):
+        path = Path.from_vertices(graph, (vertex for vertex, _ in get_predecesors_trace(predecessors, state)), distance)
+    return path, state[1]
+
+
+def shortest_path_all(source, end_nodes, graph, teleports_status=False, search='dijkstra', stats=None):
     """
     Calculates shortest paths for all specified end_nodes
     :param source: source node, starting node
     :param end_nodes: set of destinations
     :param graph: graph with specified distances
     :param teleports_status: true if teleports are already activated, false otherwise
+    :param search: search algorithm, one of SEARCHES
+    :param stats: SearchStats, same as in shortest_path_any
     :return: dictionary of {key: value}, exactly:
         {destination: (array_of_nodes, distance, teleport_activated)}
         - array_of_nodes: array of Nodes on shortest path
         - distance: sum of distances in array_of_nodes
-        - teleport_activated: true if Node.value == 'G' is in array_of_nodes, (teleports are activated now on)
+        - teleport_activated: true if teleports are active at destination ('G' is in array_of_nodes
+          or teleports_status)
     """
-    # todo: use dynamic programming, look aside dict: {NodeA: {NodeB: 5}}, distance from A to B is 5
-    # todo: | do not allow all 'caching', with 1000x1000 map = 1M nodes this yields to 1T integers
-    def change_distance(priority_queue, node, d):
-        """
-        :param priority_queue: priority queue
-        :param node: vertex
-        :param d: new distance
-        """
-        for i, distance_node_tupple in enumerate(priority_queue):
-            if distance_node_tupple[1] == node:
-                priority_queue[i] = (d, distance_node_tupple[1])
-                break
-        heapq.heapify(priority_queue)
-
-    teleport_traces = {}            # used to save traces with teleport activated
-
-    gpt = get_predecesors_trace     # just alias for that long function name
-
-    # {Node(...): x, ...}       where x is distance from start node to Node
-    shortest_distances = {node: sys.maxsize for node in graph.nodes.values()}
-    shortest_distances[source] = 0       # where we start, its distance 0
-    predecessors = {}       # {Node1(...): Node2(...), ...}         where Node1 is child of Node2
-
-    # priority queue
-    pq = [(0, node) if node == source else (sys.maxsize, node) for node in graph.nodes.values()]
-    heapq.heapify(pq)
-
-    done = set()       # nodes which already have shortest path calculated
-    destinations_to_compute = len(end_nodes)
-
-    while pq:
-        distance, cun = heapq.heappop(pq)        # cun = closest unprocessed node
-        done.add(cun)
-        if cun in end_nodes:
-            destinations_to_compute -= 1
-            # we got all destiantions computed, we can end algo
-            if destinations_to_compute == 0:
-                break
+    end_vertices = {graph.vertex(node) for node in end_nodes}
+    with phase(stats, 'search'):
+        shortest_distances, predecessors = find_paths(graph, graph.vertex(source), end_vertices, teleports_status,
+                                                      search=search, stats=stats)
 
-        neighbours = graph.get_neighbours(cun, teleports_status)
-        for neighbour in neighbours:
-            if neighbour not in done:
-                current_distance = shortest_distances.get(cun) + graph.get_distance_to_neighbour(cun, neighbour)
-                if current_distance < shortest_distances.get(neighbour):
-                    # chance distance of neighbour to distance of cun + distance from cun to neighbour
-                    shortest_distances[neighbour] = current_distance
-                    # set neighbour's parent
-                    predecessors[neighbour] = cun
-                    # chance distance in priority queue
-                    change_distance(pq, neighbour, current_distance)
-
-        # if teleports are not activated yet then:
-        # check if cun is 'G' and calculate shortest_path_any(cun, end_nodes, graph, True)
-        if not teleports_status and cun.value == 'G':   # todo: test this code
-            teleport_traces = shortest_path_all(cun, end_nodes, graph, True)
-            for destination, data in teleport_traces.values():
-                teleport_traces[destination] = (gpt(predecessors, cun)[:-1] + data[0], distance + data[1], True)
-
-    # calculate foot traces
-    foot_traces = {}
-    for destination_node in end_nodes:
-        trace = gpt(predecessors, destination_node)
-        tp_activated = teleports_status
-        if not tp_activated:    # check if we activated teleports in trace
-            tp_activated = reduce(lambda l, r: l or r.value == 'G', trace, False)   # activate teleport if its in trace
-        foot_traces[destination_node] = (trace, get_trace_distance(graph, trace), tp_activated)
-
-    # compare foot and teleport traces and return fastest
-    if not teleports_status or teleport_traces != {}:   # teleport doesnt exist or we had teleport from start
-        return foot_traces
-    else:
-        final_traces = {}
+    traces = {}
+    with phase(stats, 'trace'):
         for destination in end_nodes:
-            via_teleport = teleport_traces.get(destination)
-            via_no_teleport = foot_traces.get(destination)
-            # todo: TypeError: 'NoneType' object is not subscriptable, when 'G' is present in map
-            final_traces[destination] = teleport_traces.get(destination) if via_teleport[1] < via_no_teleport[1] \
-                else foot_traces.get(destination)
+            state, distance = best_state(shortest_distances, graph.vertex(destination))
+            if distance == sys.maxsize:
+                traces[destination] = ([], sys.maxsize, teleports_status)
+                continue
+            trace = graph.trace_nodes(vertex for vertex, _ in get_predecesors_trace(predecessors, state))
+            traces[destination] = (trace, distance, state[1])
 
-        return final_traces
+    return traces
 
 
 def get_predecesors_trace(dictonary, destination):
@@ -327,36 +1136,350 @@ def get_predecesors_trace(dictonary, destination):
     trace = [destination]
 
     current = destination
-    while dictonary.get(current):
-        current = dictonary.get(current)
+    while current in dictonary:
+        current = dictonary[current]
         trace.append(current)
 
     return trace[::-1]      # reverse list, because on trace[0] is start and trace[n] is end
 
 
-def get_trace_distance(graph, trace):
+def get_trace_distance(graph, trace, teleports_activated=False):
     """
     Returns sum of distances on specified trace
     :param graph: graph which to get distances
-    :param trace: array of nodes
+    :param trace: array of nodes, or Path which already knows its cost and is not walked
+    :param teleports_activated: true if teleports are activated at start of trace, stepping on 'G' activates them
     :return: sum of distances of nodes inside trace, [] returns sys.maxsize
     """
     if not trace:
         return sys.maxsize
+    if isinstance(trace, Path) and trace.cost is not None:
+        return trace.cost
 
+    teleports_activated = teleports_activated or trace[0].value == 'G'
     distance = 0
     for i in range(1, len(trace)):
-        distance += graph.get_distance_to_neighbour(trace[i-1], trace[i])
+        distance += graph.get_distance_to_neighbour(trace[i-1], trace[i], teleports_activated)
+        teleports_activated = teleports_activated or trace[i].value == 'G'
     return distance
 
 
+def key_point_matrix(graph, start, teleports_activated=False, search='dijkstra', stats=None, map_legs=None):
+    """
+    Calculates shortest paths between key points: start (dragon), princesses and 'G' generators.
+    Uses one multi-target search for each source and teleport status, teleports are never activated inside search,
+    activation is done by walking to generator, which is also key point.
+    :param graph: graph with specified distances
+    :param start: node where princesses tour starts
+    :param teleports_activated: true if teleports are activated at start
+    :param search: search algorithm, one of SEARCHES
+    :param stats: SearchStats, same as in shortest_path_any
+    :param map_legs: MapLegs (see cache.py) to take rows of matrix from and to store them into, or None
+    :return: dictionary of {(source, teleports_active): {destination: (array_of_nodes, distance, teleport_activated)}}
+        - teleports_active: teleport status used for searching from source
+        - teleport_activated: true if teleports are activated after array_of_nodes ('G' is in array_of_nodes)
+    """
+    def traces(source, end_nodes, tp_active):
+        if map_legs is None:
+            return search_traces(source, end_nodes, tp_active)
+        cached = map_legs.get(graph, 'key_point_matrix', (source, end_nodes, tp_active))
+        if stats is not None:
+            stats.add(cache_hits=cached is not None, cache_misses=cached is None)
+        if cached is not None:
+            return {destination: (trace, distance, tp) for destination, trace, distance, tp in cached}
+        result = search_traces(source, end_nodes, tp_active)
+        map_legs.put('key_point_matrix', (source, end_nodes, tp_active),
+                     [(destination,) + leg for destination, leg in result.items()])
+        return result
+
+    def search_traces(source, end_nodes, tp_active):
+        end_vertices = {graph.vertex(node) for node in end_nodes}
+        with phase(stats, 'search'):
+            distances, predecessors = find_paths(graph, graph.vertex(source), end_vertices, tp_active, False, search,
+                                                 stats)
+        result = {}
+        with phase(stats, 'trace'):
+            for destination in end_nodes:
+                state = (graph.vertex(destination), tp_active)
+                distance = distances.get(state, sys.maxsize)
+                if distance == sys.maxsize:     # unreachable, do not save it
+                    continue
+                trace = graph.trace_nodes(v for v, _ in get_predecesors_trace(predecessors, state))
+                result[destination] = (trace, distance, tp_active or any(node.value == 'G' for node in trace))
+        return result
+
+    return {(source, tp_active): traces(source, end_nodes, tp_active)
+            for source, end_nodes, tp_active in key_point_searches(graph, start, teleports_activated)}
+
+
+def key_point_searches(graph, start, teleports_activated=False):
+    """
+    :return: list of (source, end_nodes, teleports_active), searches needed by key_point_matrix, they are
+        independent of each other
+    """
+    searches = []
+    princesses = set(graph.princesses)
+    generators = set(graph.generators)
+
+    # walking, generators are destinations so we can activate teleports on them
+    if not teleports_activated:
+        searches.append((start, (princesses | generators) - {start}, False))
+    for princess in princesses:
+        searches.append((princess, (princesses | generators) - {princess}, False))
+
+    # teleporting, needed only if it can be activated
+    if teleports_activated or generators:
+        searches.append((start, princesses - {start}, True))
+        for source in (princesses | generators) - {start}:
+            searches.append((source, princesses - {source}, True))
+
+    return searches
+
+
+def held_karp_tour(start, princesses, matrix, teleports_activated=False):
+    """
+    Finds order of princesses with lowest sum of distances, using Held-Karp dynamic programming
+    over bitmasks of saved princesses, last saved princess and teleport status.
+    :param start: node where tour starts
+    :param princesses: nodes to visit
+    :param matrix: key points matrix from key_point_matrix function
+    :param teleports_activated: true if teleports are activated at start
+    :return: tuple (array_of_nodes, distance, teleport_activated), ([], sys.maxsize, False) if there is no tour
+    :raises ValueError: if there are more than MAX_HELD_KARP_PRINCESSES princesses, (use anytime_tour)
+    """
+    princesses = sorted(princesses)
+    k = len(princesses)
+    if k > MAX_HELD_KARP_PRINCESSES:
+        raise ValueError('Held-Karp tour supports at most {} princesses, got {}, use anytime_tour.'.format(
+            MAX_HELD_KARP_PRINCESSES, k))
+    if k == 0:
+        return [], sys.maxsize, False
+    legs = tour_legs(start, princesses, matrix, teleports_activated)
+
+    # state index: ((mask * k) + last) * 2 + tp
+    # costs fit into 4 byte ints unless legs are very long, costs and parents of 16 princesses take
+    # 2^16 * 16 * 2 * (4 + 4) bytes = 16 MiB
+    longest = max((distance for options in legs.values() for distance, _ in options.values()), default=0)
+    typecode = 'i' if longest * (k + 1) < 2 ** 31 - 1 else 'q'
+    infinity = 2 ** (8 * array(typecode).itemsize - 1) - 1
+    costs = array(typecode, [infinity]) * ((1 << k) * k * 2)
+    parents = array('i', [-1]) * len(costs)
+    # {(last, tp): [(nxt, new_tp, distance), ...], ...}     legs from last princess, unpacked once
+    transitions = {(last, tp): [(nxt, new_tp, distance) for nxt in range(k) if nxt != last
+                                for new_tp, (distance, _) in legs.get((last, nxt, bool(tp)), {}).items()]
+                   for last in range(k) for tp in (0, 1)}
+
+    for j in range(k):
+        for new_tp, (distance, _) in legs.get((k, j, teleports_activated), {}).items():
+            state = (((1 << j) * k) + j) * 2 + new_tp
+            if distance < costs[state]:
+                costs[state] = distance
+
+    for mask in range(1, 1 << k):
+        for last in range(k):
+            if not mask >> last & 1:
+                continue
+            for tp in (0, 1):
+                state = ((mask * k) + last) * 2 + tp
+                cost = costs[state]
+                if cost == infinity:
+                    continue
+                for nxt, new_tp, distance in transitions[(last, tp)]:
+                    if mask >> nxt & 1:
+                        continue
+                    next_state = ((mask | 1 << nxt) * k + nxt) * 2 + new_tp
+                    if cost + distance < costs[next_state]:
+                        costs[next_state] = cost + distance
+                        parents[next_state] = state
+
+    full = (1 << k) - 1
+    best_state = min(range(full * k * 2, (full + 1) * k * 2), key=lambda s: costs[s])
+    if costs[best_state] == infinity:
+        return [], sys.maxsize, False
+
+    # reconstruct order of (princess_index, tp) from last to first
+    order = []
+    state = best_state
+    while state != -1:
+        order.append(((state // 2) % k, state % 2))
+        state = parents[state]
+    order.reverse()
+
+    return join_legs(legs, k, order, teleports_activated), costs[best_state], bool(order[-1][1])
+
+
+def tour_legs(start, princesses, matrix, teleports_activated=False):
+    """
+    Options of every leg of tour, walking to generator and teleporting from there is option too
+    :param princesses: sorted list of princess nodes, other parameters are same as in held_karp_tour
+    :return: {(i, j, tp): {new_tp: (distance, array_of_nodes)}, ...}     options to get from i to j with teleport
+        status tp, index len(princesses) is start, missing option means there is no path
+    """
+    generators = [source for source, tp in matrix if tp and source.value == 'G']
+
+    def leg(source, tp, destination):
+        """
+        :return: {new_tp: (distance, array_of_nodes)}     shortest paths from source to destination
+        """
+        options = {}
+        found = matrix.get((source, tp), {}).get(destination)
+        if found:
+            options[found[2]] = (found[1], found[0])
+        if not tp:      # walk to some generator and teleport from there
+            to_generators = matrix.get((source, False), {})
+            best = None
+            for generator in generators:
+                first = to_generators.get(generator)
+                second = matrix[(generator, True)].get(destination)
+                if first and second and (best is None or first[1] + second[1] < best[0]):
+                    best = (first[1] + second[1], first[0], second[0])
+            if best and (True not in options or best[0] < options[True][0]):
+                options[True] = (best[0], best[1][:-1] + best[2])
+        if True in options and False in options and options[True][0] <= options[False][0]:
+            del options[False]      # activated teleports are never worse
+        return options
+
+    # legs[(i, j, tp)]      options to get from i to j, where index k is start
+    legs = {}
+    for i, source in enumerate(princesses + [start]):
+        for tp in (False, True):
+            if (source, tp) not in matrix and not (tp and (source, False) in matrix and generators):
+                continue
+            for j, destination in enumerate(princesses):
+                if i != j:
+                    legs[(i, j, tp)] = leg(source, tp, destination)
+    return legs
+
+
+def join_legs(legs, start, order, teleports_activated=False):
+    """
+    :param legs: options of legs from tour_legs
+    :param start: index of start in legs
+    :param order: list of (princess_index, tp), tp is teleport status after reaching princess
+    :return: array of Nodes of whole tour
+    """
+    trace = []
+    previous, previous_tp = start, teleports_activated
+    for princess_index, tp in order:
+        _, leg_trace = legs[(previous, princess_index, bool(previous_tp))][bool(tp)]
+        trace = trace[:-1] + leg_trace
+        previous, previous_tp = princess_index, tp
+    return trace
+
+
+def anytime_tour(start, princesses, matrix, teleports_activated=False, budget=1.0):
+    """
+    Finds good order of princesses when there are too many of them for held_karp_tour. Starts with nearest
+    neighbour tour and improves it with 2-opt (reversing part of order) and Or-opt (moving one to three
+    princesses elsewhere) moves until no move helps. Then, until budget runs out or tour reaches lower bound,
+    best order is perturbed and improved again (iterated local search). Teleport status along order is chosen
+    optimally for every tried order, (legs are asymmetric, so every move is evaluated over whole order).
+    :param start, princesses, matrix, teleports_activated: same as in held_karp_tour
+    :param budget: seconds, improvement stops after it, (nearest neighbour tour is always finished)
+    :return: tuple (array_of_nodes, distance, teleport_activated, gap, rounds), ([], sys.maxsize, False, 0, 0)
+        if there is no tour
+        - gap: distance minus lower bound (every princess is entered by her cheapest leg), 0 means optimal
+        - rounds: number of improving moves and perturbations made
+    """
+    deadline = time.perf_counter() + budget
+    princesses = sorted(princesses)
+    k = len(princesses)
+    if k == 0:
+        return [], sys.maxsize, False, 0, 0
+    legs = tour_legs(start, princesses, matrix, teleports_activated)
+    infinity = sys.maxsize
+
+    def evaluate(order):
+        """
+        :return: tuple (distance, [(princess_index, tp), ...]), distance is sys.maxsize if order is not possible
+        """
+        costs = {teleports_activated: (0, [])}      # {tp: (distance, order with tp)}     best for each status
+        previous = k
+        for princess in order:
+            new_costs = {}
+            for tp, (cost, chosen) in costs.items():
+                for new_tp, (distance, _) in legs.get((previous, princess, tp), {}).items():
+                    if cost + distance < new_costs.get(new_tp, (infinity,))[0]:
+                        new_costs[new_tp] = (cost + distance, chosen + [(princess, new_tp)])
+            if not new_costs:
+                return infinity, []
+            costs = new_costs
+            previous = princess
+        return min(costs.values())
+
+    # nearest neighbour, always continues to closest princess not saved yet
+    order = []
+    previous, tp = k, teleports_activated
+    left = set(range(k))
+    while left:
+        options = [(distance, princess, new_tp) for princess in left
+                   for new_tp, (distance, _) in legs.get((previous, princess, tp), {}).items()]
+        if not options:
+            return [], sys.maxsize, False, 0, 0
+        _, previous, tp = min(options)
+        order.append(previous)
+        left.remove(previous)
+    best, chosen = evaluate(order)
+
+    # cheapest leg into every princess, from start or from other princess, with any teleport status
+    lower_bound = sum(min((distance for (i, j, _), options in legs.items() if j == princess
+                           for distance, _ in options.values()), default=0) for princess in range(k))
+
+    def local_search(order, best, chosen):
+        """
+        Makes first improving move until no move helps or budget runs out
+        :return: tuple (order, distance, chosen, moves)
+        """
+        moves = 0
+        improved = True
+        while improved and time.perf_counter() < deadline:
+            improved = False
+            candidates = itertools.chain(
+                (order[:i] + order[i:j + 1][::-1] + order[j + 1:] for i in range(k) for j in range(i + 1, k)),
+                (rest[:position] + order[i:i + length] + rest[position:]
+                 for length in (1, 2, 3) for i in range(k - length + 1)
+                 for rest in [order[:i] + order[i + length:]] for position in range(len(rest) + 1) if position != i))
+            for candidate in candidates:
+                distance, candidate_chosen = evaluate(candidate)
+                if distance < best:
+                    order, best, chosen = candidate, distance, candidate_chosen
+                    moves += 1
+                    improved = True
+                    break
+                if time.perf_counter() >= deadline:
+                    break
+        return order, best, chosen, moves
+
+    rounds = 0
+    if best != infinity:
+        order, best, chosen, rounds = local_search(order, best, chosen)
+    # local optimum is left by double bridge move (three parts of order swapped) or by reversing two parts of order,
+    # neither can be undone by one 2-opt or Or-opt move, and is searched again, tour not worse than best is kept.
+    # rng is seeded, so runs differ only by how much of budget they get
+    rng = random.Random(k)
+    while best != infinity and best > lower_bound and k >= 4 and time.perf_counter() < deadline:
+        a, b, c = sorted(rng.sample(range(1, k), 3))
+        if rng.random() < 0.5:
+            kicked = order[:a] + order[c:] + order[b:c] + order[a:b]
+        else:
+            kicked = order[:a] + order[a:b][::-1] + order[b:c] + order[c:][::-1]
+        distance, kicked_chosen = evaluate(kicked)
+        kicked, distance, kicked_chosen, moves = local_search(kicked, distance, kicked_chosen)
+        rounds += moves + 1
+        if distance <= best:        # equal tour is accepted too, next perturbation starts elsewhere on plateau
+            order, best, chosen = kicked, distance, kicked_chosen
+
+    if best == infinity:
+        return [], sys.maxsize, False, 0, 0
+
+    return join_legs(legs, k, chosen, teleports_activated), best, bool(chosen[-1][1]), best - lower_bound, rounds
+
+
 def print_path(path, style='default'):
-    if style in {'default', 'verbose'}:
-        for node in path:
-            print(node)
-    elif style == 'minimal':
-        for node in path:
-            print('({},{})'.format(node.x, node.y))
+    """
+    Prints path with single write, style is one of paths.STYLES ('default', 'verbose', 'minimal', 'directions', 'rle')
+    """
+    write_path(path, style, sys.stdout)
 
 
 def load_map_from_file(file):
@@ -367,68 +1490,183 @@ def load_map_from_file(file):
     return terrain_map
 
 
-def save_princess(terrain, max_turns, verbose=False):
-    graph = TerrainGraph(terrain)
+def save_princess(terrain, max_turns, verbose=False, compact=False, tour='held_karp', search='dijkstra',
+                  stats=None, cache=None, workers=1, budget=1.0):
+    """
+    Finds path which kills dragon in less than max_turns and then saves all princesses
+    :param terrain: list of map lines, or already built TerrainGraph / CompactTerrainGraph
+    :param max_turns: dragon must be reached in less turns
+    :param verbose: print progress
+    :param compact: build CompactTerrainGraph instead of TerrainGraph, (use for big maps)
+    :param tour: how to find order of princesses
+        - 'held_karp': dynamic programming over key points matrix, O(2^k * k^2) for k princesses,
+          'anytime' is used instead when there are more than MAX_HELD_KARP_PRINCESSES princesses
+        - 'permutations': tries all k! orders, searching each leg separately
+        - 'anytime': heuristic over key points matrix improved until budget runs out, for many princesses
+    :param search: search algorithm used for dragon and princesses, one of SEARCHES
+    :param stats: SearchStats to count searches into and time phases 'build', 'dragon' and 'princesses', or None
+    :param cache: SolveCache (see cache.py) to take graph and legs from and to store them into, or None
+    :param workers: processes searching key point matrix of 'held_karp' and 'anytime' tours, None for number of CPUs,
+        (see parallel_matrix.py, pool is started once and reused by later calls), 1 searches in this process
+    :param budget: seconds for improving 'anytime' tour
+    :return: Path (see paths.py) from [0,0] to last saved princess, empty Path if there is no solution
+    """
+    if tour not in {'held_karp', 'permutations', 'anytime'}:
+        raise ValueError('Unknown tour method: ' + str(tour))
+    if search not in SEARCHES:
+        raise ValueError('Unknown search: ' + str(search))
+
+    if isinstance(terrain, (TerrainGraph, CompactTerrainGraph)):
+        graph = terrain
+    else:
+        with phase(stats, 'build'):
+            if cache is not None:
+                graph = cache.graph(terrain, compact)
+            else:
+                graph = CompactTerrainGraph(terrain) if compact else TerrainGraph(terrain)
 
     if not graph.princesses:
         if verbose:
             print('No princess to save.')
-        return []
+        return Path(graph)
 
-    dragon_path, teleport_active = shortest_path_any(graph.nodes.get((0, 0)), {graph.dragon}, graph)
+    if graph.dragon is None:
+        if verbose:
+            print('There is no hope to kill dragon in ' + str(max_turns) + ' turns.')
+        return Path(graph)
+
+    # walled off dragon or princess is rejected before any search, if graph has reachability index
+    reachability = graph.reachability
+    if reachability is not None:
+        start = graph.vertex(graph.get_node(0, 0))
+        if not reachability.reachable(start, graph.vertex(graph.dragon)):
+            if verbose:
+                print('Dragon cannot be reached.')
+            return Path(graph)
+
+    map_legs = cache.for_map(graph, search) if cache is not None else None
+    with phase(stats, 'dragon'):
+        # dragon must be reached in less than max_turns, search does not need to look farther
+        arguments = (graph.get_node(0, 0), graph.dragon, max_turns - 1)
+        cached = map_legs.get(graph, 'dragon', arguments) if map_legs is not None else None
+        if cached is not None:
+            _, dragon_path, dragon_distance, teleport_active = cached[0]
+            dragon_path = Path.from_nodes(graph, dragon_path, dragon_distance)
+        else:
+            dragon_path, teleport_active = shortest_path_any(graph.get_node(0, 0), {graph.dragon}, graph,
+                                                             search=search, stats=stats, max_distance=max_turns - 1)
+            dragon_distance = get_trace_distance(graph, dragon_path)
+            if map_legs is not None:
+                map_legs.put('dragon', arguments, [(graph.dragon, dragon_path, dragon_distance, teleport_active)])
     if verbose:
-        print('To dragon its', get_trace_distance(graph, dragon_path), 'turns', 'with' if teleport_active else 'without',
-              'teleport.')
+        print('To dragon its', dragon_distance, 'turns', 'with' if teleport_active else 'without', 'teleport.')
         print_path(dragon_path)
 
-    if get_trace_distance(graph, dragon_path) >= max_turns:
+    if dragon_distance >= max_turns:
         if verbose:
             print('There is no hope to kill dragon in ' + str(max_turns) + ' turns.')
-        return []
+        return Path(graph)
+
+    if reachability is not None:
+        dragon = graph.vertex(graph.dragon)
+        if not all(reachability.reachable(dragon, graph.vertex(princess), teleport_active)
+                   for princess in graph.princesses):
+            if verbose:
+                print('Not all princesses can be saved.')
+            return Path(graph)
+
+    if tour == 'held_karp' and len(graph.princesses) > MAX_HELD_KARP_PRINCESSES:
+        # tour is not exact anymore, caller is told even without verbose
+        warnings.warn('{} princesses are too many for Held-Karp tour (at most {}), using anytime tour.'.format(
+            len(graph.princesses), MAX_HELD_KARP_PRINCESSES), RuntimeWarning, stacklevel=2)
+        tour = 'anytime'
 
     # dragon slayed, time to save princesses, YAY
     # we need to save all princesses in smallest amount of time, (Travelling salesman problem)
-    # since we have only 3 princesses we can try all 3! possible cases
-    permutations = list(itertools.permutations(graph.princesses, len(graph.princesses)))
+    with phase(stats, 'princesses'):
+        if tour in {'held_karp', 'anytime'}:
+            if workers == 1:
+                matrix = key_point_matrix(graph, graph.dragon, teleport_active, search, stats, map_legs)
+            else:
+                from parallel_matrix import parallel_key_point_matrix     # it imports this module
+                matrix = parallel_key_point_matrix(graph, graph.dragon, teleport_active, search, stats, workers)
+        if tour == 'held_karp':
+            princesses_path, princesses_distance, _ = held_karp_tour(graph.dragon, graph.princesses, matrix,
+                                                                     teleport_active)
+        elif tour == 'anytime':
+            princesses_path, princesses_distance, _, gap, rounds = anytime_tour(graph.dragon, graph.princesses,
+                                                                                matrix, teleport_active, budget)
+            if verbose and princesses_path:
+                print('Tour after {} improvements is at most {} turns longer than optimal.'.format(rounds, gap))
+        else:
+            princesses_path, princesses_distance = _permutations_tour(graph, teleport_active, search, stats,
+                                                                      map_legs)
+
+    if not princesses_path:
+        if verbose:
+            print('Not all princesses can be saved.')
+        return Path(graph)
+
+    if verbose:
+        print('To collect all {} princeses its'.format(len(graph.princesses)), princesses_distance, 'turns.')
+        print_path(princesses_path)
+
+    return dragon_path.then(Path.from_nodes(graph, princesses_path, princesses_distance))
+
+
+def _permutations_tour(graph, teleport_active, search, stats, map_legs=None):
+    """
+    With only few princesses we can try all k! possible orders, starting at dragon
+    :param map_legs: MapLegs (see cache.py), legs missing in calculated_paths are looked up there, or None
+    :return: tuple (path, distance), path is Path, [] if not all princesses can be saved
+    """
+    permutations = itertools.permutations(graph.princesses, len(graph.princesses))
 
-    first_try = True
     princesses_path = []
-    princesses_distance = 0
+    princesses_distance = sys.maxsize
+    hits = misses = 0
 
     # saves already calculated paths (dynamic programming)
-    calculated_paths = {}       # {((Node1(...), Node2(...), teleport_active): [Node1(...), Node3(...), ...]}
+    calculated_paths = {}       # {(Node1(...), Node2(...), tp_on_now): ([Node1(...), ...], distance, tp_on_after), ...}
     for permutation in permutations:
         previous_place = graph.dragon   # where to start when looking for princesses
-        current_princesses_path = []    # currently calculated path
+        legs = []                       # paths of currently calculated permutation, joined only for winner
+        current_distance = 0
         tp_on_now = teleport_active     # determined whether teleport is active this permutation
 
-        for i in range(len(permutation)):
-            princess = permutation[i]
-            if (previous_place, princess, teleport_active) in calculated_paths.keys():  # already have calculated this
-                princess_path = calculated_paths.get((previous_place, princess, tp_on_now))
-            else:
-                princess_path, tp_on_now = shortest_path_any(previous_place, {princess}, graph, tp_on_now)
-                # save path to calculated_paths
-                key = (previous_place, princess, teleport_active)
-                calculated_paths[key] = princess_path[:]
-                if tp_on_now:     # and if teleports are active, we can asume walking takes least this long
-                    calculated_paths[(previous_place, princess, False)] = calculated_paths.get(key)
-
-            # concat paths, we need joining Node only once, hence [:-1]
-            current_princesses_path = current_princesses_path[:-1] + princess_path
+        for princess in permutation:
+            key = (previous_place, princess, tp_on_now)
+            if key not in calculated_paths and map_legs is not None:
+                cached = map_legs.get(graph, 'permutations', key)
+                if cached is not None:
+                    path, distance, tp_on_after = cached[0][1:]
+                    calculated_paths[key] = (Path.from_nodes(graph, path, distance), distance, tp_on_after)
+            if key in calculated_paths:
+                hits += 1
+            else:       # not calculated yet
+                misses += 1
+                path, tp_on_after = shortest_path_any(previous_place, {princess}, graph, tp_on_now, search, stats)
+                calculated_paths[key] = (path, get_trace_distance(graph, path, tp_on_now), tp_on_after)
+                if map_legs is not None:
+                    map_legs.put('permutations', key, [(princess,) + calculated_paths[key]])
+            princess_path, distance, tp_on_now = calculated_paths[key]
+            if not princess_path:       # princess cannot be reached
+                legs = []
+                break
+
+            legs.append(princess_path)
+            current_distance += distance
             previous_place = princess
 
         # compare distances, winner is with lower distance cost
-        if first_try or get_trace_distance(graph, current_princesses_path) < princesses_distance:
-            princesses_path = current_princesses_path
-            princesses_distance = get_trace_distance(graph, current_princesses_path)
-            first_try = False
-
-    if verbose:
-        print('To collect all {} princeses its'.format(len(graph.princesses)), princesses_distance, 'turns.')
-        print_path(princesses_path)
-
-    return dragon_path[:-1] + princesses_path
+        if legs and current_distance < princesses_distance:
+            # concat paths, joining Node is kept only once
+            princesses_path = reduce(Path.then, legs)
+            princesses_distance = current_distance
+
+    if stats is not None:
+        stats.add(cache_hits=hits, cache_misses=misses)
+    return princesses_path, princesses_distance
 
 
 def main():
@@ -0,0 +1,165 @@
+"""
+Key point matrix (see main.key_point_matrix) built by pool of worker processes.
+
+Tiles of map and indexes of its key tiles are copied into multiprocessing.shared_memory once per matrix, worker
+attaches to it on first search of that map and wraps tiles in CompactTerrainGraph.from_buffer, so map is never
+pickled and workers do not parse it. Every search of main.key_point_searches is sent to pool as indexes of its
+source and targets, worker sends back only distances and traces of targets as array('i') of tile indexes.
+Nodes are created in parent from them.
+
+Pool is started once per process and reused by every later matrix, (starting processes costs more than searches
+of small map), or caller passes its own executor. Worker keeps last map attached until it gets search of other map.
+
+    matrix = parallel_key_point_matrix(graph, graph.dragon, workers=8)
+    held_karp_tour(graph.dragon, graph.princesses, matrix)
+
+Searches which need preprocessed data on graph ('alt', 'hpa') cannot be used, workers have only tiles.
+"""
+import gc
+import pickle
+import sys
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+from landmarks import terrain_tiles
+from main import CompactTerrainGraph, find_paths, get_predecesors_trace, key_point_searches
+from search_stats import SearchStats
+
+UNSUPPORTED_SEARCHES = ('alt', 'hpa')
+
+_pool = None                # ProcessPoolExecutor shared by calls in this process, see shared_pool
+_pool_workers = None        # workers argument _pool was started with
+
+_worker_map = None          # name of shared memory of map attached in worker
+_worker_graph = None        # CompactTerrainGraph over shared tiles of that map
+_worker_memory = None       # SharedMemory, kept referenced while graph uses it
+
+
+def shared_pool(workers=None):
+    """
+    :param workers: number of processes, None for number of CPUs
+    :return: ProcessPoolExecutor of this process, started on first call and again when workers change
+    """
+    global _pool, _pool_workers
+    if _pool is None or _pool_workers != workers:
+        shutdown_pool()
+        _pool = ProcessPoolExecutor(workers)
+        _pool_workers = workers
+    return _pool
+
+
+def shutdown_pool():
+    """
+    Stops pool of shared_pool, next call starts new one
+    """
+    global _pool, _pool_workers
+    if _pool is not None:
+        _pool.shutdown()
+    _pool = _pool_workers = None
+
+
+def _attach(name, width, height, tables_size):
+    """
+    Attaches worker to map in shared memory, (tiles followed by pickled key tiles), previous map is released
+    """
+    global _worker_map, _worker_graph, _worker_memory
+    if _worker_map == name:
+        return
+    if _worker_memory is not None:
+        _worker_graph = None
+        gc.collect()        # graph can be in reference cycle (planners), its views of tiles must be gone before close
+        _worker_memory.close()
+    _worker_memory = shared_memory.SharedMemory(name)
+    _worker_map = name
+    size = width * height
+    dragon, princesses, generators, teleports = pickle.loads(_worker_memory.buf[size:size + tables_size])
+    tiles = _worker_memory.buf[:size]     # buffer can be rounded up to page size
+    _worker_graph = CompactTerrainGraph.from_buffer(tiles, width, height, dragon, princesses, generators, teleports)
+
+
+def _search(shared_map, source, targets, tp_active, search, count):
+    """
+    Runs one search of key point matrix in worker
+    :param shared_map: tuple (name, width, height, tables_size), arguments of _attach
+    :param source: tile index
+    :param targets: array('i') of tile indexes
+    :param count: true to count search into SearchStats
+    :return: tuple (rows, counters)
+        - rows: list of (target, distance, trace, teleport_activated) for reachable targets,
+          trace is array('i') of tile indexes without teleport hubs
+        - counters: SearchStats.counters, or None
+    """
+    _attach(*shared_map)
+    graph = _worker_graph
+    stats = SearchStats() if count else None
+    distances, predecessors = find_paths(graph, source, set(targets), tp_active, False, search, stats)
+    size = len(graph.tiles)
+    generator = ord('G')
+    rows = []
+    for target in targets:
+        state = (target, tp_active)
+        distance = distances.get(state, sys.maxsize)
+        if distance == sys.maxsize:
+            continue
+        trace = array('i', (vertex for vertex, _ in get_predecesors_trace(predecessors, state) if vertex < size))
+        rows.append((target, distance, trace, tp_active or any(graph.tiles[vertex] == generator for vertex in trace)))
+    return rows, stats.counters if count else None
+
+
+def parallel_key_point_matrix(graph, start, teleports_activated=False, search='dijkstra', stats=None, workers=None,
+                              executor=None):
+    """
+    Same as main.key_point_matrix, searches run in worker processes
+    :param graph: TerrainGraph or CompactTerrainGraph
+    :param workers: number of processes of shared_pool, None for number of CPUs
+    :param executor: ProcessPoolExecutor to use instead of shared_pool, (workers is ignored)
+    :param stats: SearchStats, counters of workers are added into it, or None
+    :raises ValueError: if search needs preprocessed data on graph
+    """
+    if search in UNSUPPORTED_SEARCHES:
+        raise ValueError('Search {!r} cannot be used in worker processes.'.format(search))
+
+    def index(node):
+        return node.y * width + node.x
+
+    tiles, width, height = terrain_tiles(graph)       # shorter rows of TerrainGraph are padded by 'N'
+    dragon = index(graph.dragon) if graph.dragon is not None else -1
+    if hasattr(graph, 'tiles'):     # groups are already arrays of indexes
+        teleports = graph.teleports
+    else:
+        teleports = {ord(symbol): array('i', map(index, group)) for symbol, group in graph.teleports.items()}
+    tables = pickle.dumps((dragon, array('i', map(index, graph.princesses)), array('i', map(index, graph.generators)),
+                           teleports))
+    size = width * height
+    searches = key_point_searches(graph, start, teleports_activated)
+
+    memory = shared_memory.SharedMemory(create=True, size=size + len(tables))
+    try:
+        memory.buf[:size] = tiles
+        memory.buf[size:size + len(tables)] = tables
+        shared_map = (memory.name, width, height, len(tables))
+        pool = executor if executor is not None else shared_pool(workers)
+        try:
+            futures = [pool.submit(_search, shared_map, index(source), array('i', map(index, end_nodes)), tp_active,
+                                   search, stats is not None)
+                       for source, end_nodes, tp_active in searches]
+            results = [future.result() for future in futures]
+        except BrokenProcessPool:
+            if executor is None:    # next call starts new pool
+                shutdown_pool()
+            raise
+    finally:
+        memory.close()
+        memory.unlink()
+
+    matrix = {}
+    for (source, _, tp_active), (rows, counters) in zip(searches, results):
+        if counters is not None:
+            stats.add(**counters)
+        matrix[(source, tp_active)] = {
+            graph.get_node(target % width, target // width):
+                ([graph.get_node(vertex % width, vertex // width) for vertex in trace], distance, tp_after)
+            for target, distance, trace, tp_after in rows}
+    return matrix
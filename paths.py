@@ -0,0 +1,186 @@
+"""
+Compact path results.
+
+Path stores tiles as indexes (y * width + x) in array('i') and knows its cost, Nodes are created only when
+path is iterated or indexed. Paths are joined with then() without copying tiles, joined path keeps list of
+segments, (arrays of joined paths). write_path writes whole path with one write call, as Nodes, coordinates
+or directions.
+
+    path = save_princess(terrain, 1000)         # Path
+    get_trace_distance(graph, path)             # path.cost, path is not walked again
+    write_path(path, 'rle')                     # 'R3D2T(5,7)L...'
+"""
+import itertools
+import sys
+from array import array
+
+STYLES = ('default', 'verbose', 'minimal', 'directions', 'rle')
+DIRECTIONS = {(1, 0): 'R', (-1, 0): 'L', (0, 1): 'D', (0, -1): 'U'}
+
+
+class Path:
+    __slots__ = ('graph', 'segments', 'count', 'cost', 'length')
+
+    def __init__(self, graph, indexes=None, cost=None):
+        """
+        :param graph: graph Nodes of path are taken from, must have width
+        :param indexes: array('i') of tile indexes, None for empty path
+        :param cost: sum of distances on path, None if it is not known
+        """
+        self.graph = graph
+        # [(array('i'), first_used_position), ...]     list can be shared by more paths, (see then)
+        self.segments = [(indexes, 0)] if indexes else []
+        self.count = len(self.segments)     # path is made of first count segments
+        self.cost = cost if indexes else sys.maxsize
+        self.length = len(indexes) if indexes else 0
+
+    @classmethod
+    def from_vertices(cls, graph, vertices, cost=None):
+        """
+        :param vertices: vertices of graph as found by search, teleport hubs are skipped
+        """
+        if hasattr(graph, 'tiles'):     # vertex is already index
+            size = len(graph.tiles)
+            return cls(graph, array('i', (vertex for vertex in vertices if vertex < size)), cost)
+        width = graph.width
+        return cls(graph, array('i', (vertex.y * width + vertex.x for vertex in vertices if vertex.x >= 0)), cost)
+
+    @classmethod
+    def from_nodes(cls, graph, nodes, cost=None):
+        """
+        :param nodes: list of Nodes, or Path which is returned as it is
+        """
+        if isinstance(nodes, Path):
+            return nodes
+        width = graph.width
+        return cls(graph, array('i', (node.y * width + node.x for node in nodes)), cost)
+
+    def then(self, other):
+        """
+        Continues path with other path, which starts where this one ends, joining tile is kept only once.
+        Tiles are never copied. Segments of other are appended to list of segments, which new path shares
+        with this one, so it costs O(number of segments of other), O(1) for leg found by search. Only when this
+        path was already continued before, its segments are copied into new list, O(number of its segments).
+        :return: new Path, this one and other are not changed
+        """
+        if not other:
+            return self
+        if not self:
+            return other
+        segments = self.segments
+        if len(segments) != self.count:     # list is already continued by other path
+            segments = segments[:self.count]
+        added = other.segments[:other.count]
+        segments.append((added[0][0], added[0][1] + 1))
+        segments.extend(added[1:])
+
+        joined = Path(self.graph)
+        joined.segments = segments
+        joined.count = len(segments)
+        joined.length = self.length + other.length - 1
+        joined.cost = None if self.cost is None or other.cost is None else self.cost + other.cost
+        return joined
+
+    def _segments(self):
+        return itertools.islice(self.segments, self.count)
+
+    def indexes(self):
+        """
+        :return: array('i') of tile indexes of whole path
+        """
+        result = array('i')
+        for indexes, start in self._segments():
+            result.extend(indexes[start:] if start else indexes)
+        return result
+
+    def coords(self):
+        """
+        :return: generator of (x, y)
+        """
+        width = self.graph.width
+        for indexes, start in self._segments():
+            for i in range(start, len(indexes)):
+                yield indexes[i] % width, indexes[i] // width
+
+    def __iter__(self):
+        get_node = self.graph.get_node
+        return (get_node(x, y) for x, y in self.coords())
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return list(self)[i]
+        if i < 0:
+            i += self.length
+        for indexes, start in self._segments():
+            if i < len(indexes) - start:
+                index = indexes[start + i]
+                return self.graph.get_node(index % self.graph.width, index // self.graph.width)
+            i -= len(indexes) - start
+        raise IndexError('Path index out of range')
+
+    def __eq__(self, other):
+        if isinstance(other, Path):
+            return self.indexes() == other.indexes() and self.graph.width == other.graph.width
+        if isinstance(other, (list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return 'Path({}, cost={})'.format(list(self.coords()), self.cost)
+
+
+def _coords(path):
+    if isinstance(path, Path):
+        return path.coords()
+    return ((node.x, node.y) for node in path)
+
+
+def directions(path):
+    """
+    :return: list of steps, 'R', 'L', 'D', 'U' or 'T(x,y)' for teleport to x, y
+    """
+    steps = []
+    previous = None
+    for x, y in _coords(path):
+        if previous is not None:
+            steps.append(DIRECTIONS.get((x - previous[0], y - previous[1])) or 'T({},{})'.format(x, y))
+        previous = x, y
+    return steps
+
+
+def format_path(path, style='default'):
+    """
+    :param path: Path or list of Nodes
+    :param style: one of STYLES
+        - 'default', 'verbose': Node on every line
+        - 'minimal': (x,y) on every line
+        - 'directions': single line of steps from first tile, (see directions)
+        - 'rle': same as 'directions', repeated step is followed by number of repeats, 'RRRD' is 'R3D'
+    :return: text without trailing new line
+    """
+    if style in {'default', 'verbose'}:
+        return '\n'.join(map(str, path))
+    if style == 'minimal':
+        return '\n'.join('({},{})'.format(x, y) for x, y in _coords(path))
+    if style == 'directions':
+        return ''.join(directions(path))
+    if style == 'rle':
+        runs = []
+        for step, group in itertools.groupby(directions(path)):
+            count = sum(1 for _ in group)
+            runs.append(step if count == 1 else step + str(count))
+        return ''.join(runs)
+    raise ValueError('Unknown path style: ' + str(style))
+
+
+def write_path(path, style='default', f=None):
+    """
+    Writes path in style (see format_path) with single write call
+    :param f: text file, sys.stdout by default
+    """
+    text = format_path(path, style)
+    if text:
+        (f or sys.stdout).write(text + '\n')
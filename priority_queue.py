@@ -0,0 +1,73 @@
+import heapq
+
+
+class PriorityQueue:
+    """
+    Min priority queue with decrease-key, built on heapq with lazy deletion.
+
+    Every push of already queued item with lower priority leaves old entry inside heap,
+    stale entries are skipped when popped. Items with equal priority are popped in order
+    of items themselves, so they must be comparable (same as (priority, item) tuples in heapq).
+    """
+
+    def __init__(self):
+        self._heap = []             # [(priority, item), ...]     may contain stale entries
+        self._priorities = {}       # {item: priority, ...}       current priority of queued items
+
+    def __len__(self):
+        return len(self._priorities)
+
+    def __bool__(self):
+        return bool(self._priorities)
+
+    def __contains__(self, item):
+        return item in self._priorities
+
+    def push(self, item, priority):
+        """
+        Inserts item into queue, or decreases its priority if it is already queued
+        :param item: comparable and hashable item
+        :param priority: new priority, ignored if item is queued with lower or same priority
+        :return: True if queue was changed, False otherwise
+        """
+        current = self._priorities.get(item)
+        if current is not None and current <= priority:
+            return False
+        self._priorities[item] = priority
+        heapq.heappush(self._heap, (priority, item))
+        return True
+
+    def pop(self):
+        """
+        Removes item with lowest priority from queue
+        :return: tuple (priority, item)
+        :raises IndexError: if queue is empty
+        """
+        heap = self._heap
+        priorities = self._priorities
+        while heap:
+            priority, item = heapq.heappop(heap)
+            if priorities.get(item) == priority:    # skip stale entries
+                del priorities[item]
+                return priority, item
+        raise IndexError('pop from empty priority queue')
+
+    def peek(self):
+        """
+        :return: tuple (priority, item) with lowest priority without removing it
+        :raises IndexError: if queue is empty
+        """
+        heap = self._heap
+        priorities = self._priorities
+        while heap:
+            priority, item = heap[0]
+            if priorities.get(item) == priority:
+                return priority, item
+            heapq.heappop(heap)
+        raise IndexError('peek from empty priority queue')
+
+    def priority(self, item):
+        """
+        :return: current priority of queued item, None if item is not queued
+        """
+        return self._priorities.get(item)
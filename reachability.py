@@ -0,0 +1,121 @@
+"""
+Reachability index, tells in O(1) whether target can be reached at all, so searches never explore whole
+component of map only to find out that target is walled off by cliffs.
+
+Passable tiles next to each other are connected both ways, so walking components are found with union-find
+in one pass over map. Components with activated teleports are walking components joined by teleport groups.
+Impassable tile ('N') can be entered but not left, it is reachable from components of its passable neighbours.
+
+    graph.reachability = ReachabilityIndex(graph)
+    save_princess(graph, 1000)      # unreachable dragon or princess is rejected before any search
+
+Index describes map at the time it was built, graph.set_tile drops it.
+"""
+import sys
+from array import array
+
+from landmarks import terrain_tiles
+
+NONE = -1       # label of impassable tile
+
+
+def _find(parent, i):
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]       # path halving
+        i = parent[i]
+    return i
+
+
+def _union(parent, a, b):
+    a, b = _find(parent, a), _find(parent, b)
+    if a != b:
+        parent[max(a, b)] = min(a, b)
+
+
+class ReachabilityIndex:
+    def __init__(self, graph):
+        """
+        Builds index of TerrainGraph or CompactTerrainGraph
+        """
+        self.graph = graph
+        tiles, width, _ = terrain_tiles(graph)      # shorter rows of TerrainGraph are padded by impassable tiles
+        self.width = width
+        size = len(tiles)
+
+        table = bytearray(256)
+        for symbol, cost in graph.FOOT_DISTANCE.items():
+            table[ord(symbol)] = cost != sys.maxsize
+        passable = tiles.translate(table)
+
+        # walking components, tile joins tile on its left and tile below it, vertical pair is skipped
+        # when pair on its left is passable too, they are already joined through both rows
+        parent = array('i', range(size))
+        for i in range(size):
+            if not passable[i]:
+                continue
+            left = i % width > 0 and passable[i - 1]
+            if left:
+                if parent[i] == i:      # not joined with row above yet, (most tiles)
+                    parent[i] = parent[i - 1]
+                else:
+                    _union(parent, i, i - 1)
+            below = i + width
+            if below < size and passable[below] and not (left and passable[below - 1]):
+                _union(parent, i, below)
+        walk = array('i', [NONE]) * size
+        for i in range(size):
+            if passable[i]:
+                walk[i] = _find(parent, i)
+
+        # teleport components, union-find over walking components
+        parent = array('i', range(size))
+        for group in self._teleport_groups():
+            for i in group[1:]:
+                _union(parent, walk[group[0]], walk[i])
+        teleport = array('i', [NONE]) * size
+        for i in range(size):
+            if passable[i]:
+                teleport[i] = _find(parent, walk[i])
+
+        self.walk = walk                # walking component of every tile, NONE for impassable
+        self.teleport = teleport        # component with activated teleports of every tile, NONE for impassable
+        # walking components where teleports can be activated
+        self.generators = {walk[self._index(graph.vertex(node))] for node in graph.generators}
+
+    def reachable(self, source, target, teleports_activated=False, generators_activate=True):
+        """
+        :param source: source tile vertex, other parameters are same as in main.dijkstra
+        :param target: target tile vertex
+        :return: true if there is path from source to target
+        """
+        s, t = self._index(source), self._index(target)
+        if s == t:
+            return True
+        own = self.walk[s]
+        if own == NONE:     # impassable source cannot be left
+            return False
+        labels = self.walk
+        if teleports_activated or generators_activate and own in self.generators:
+            labels, own = self.teleport, self.teleport[s]
+        if labels[t] != NONE:
+            return labels[t] == own
+
+        width, size, x = self.width, len(labels), t % self.width
+        for neighbour, exists in ((t - width, t >= width), (t + width, t + width < size), (t - 1, x > 0),
+                                  (t + 1, x < width - 1)):
+            if exists and labels[neighbour] == own:
+                return True
+        return False
+
+    def _index(self, vertex):
+        x, y = self.graph.coords(vertex)
+        return y * self.width + x
+
+    def _teleport_groups(self):
+        """
+        :return: list of teleport groups, group is list of tile indexes
+        """
+        graph = self.graph
+        if hasattr(graph, 'tiles'):     # vertex is already index
+            return [list(group) for group in graph.teleports.values()]
+        return [[self._index(node) for node in group] for group in graph.teleports.values()]
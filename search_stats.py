@@ -0,0 +1,65 @@
+"""
+Opt-in instrumentation of searches, pass SearchStats() as stats to save_princess (or to single search)
+and read counters and phase timings afterwards. Without stats nothing is counted or timed.
+"""
+import time
+from contextlib import contextmanager, nullcontext
+
+
+class SearchStats:
+    COUNTERS = (
+        'searches',                 # number of searches run
+        'pushes',                   # states pushed into queue (heap or buckets)
+        'pops',                     # states popped from queue, including stale bucket entries
+        'relaxations',              # edges examined from expanded states
+        'expanded',                 # states settled
+        'teleport_activations',     # states which entered teleport layer by stepping on 'G'
+        'cache_hits',               # path between same places found in cache
+        'cache_misses',             # path between places had to be searched
+    )
+
+    def __init__(self):
+        self.counters = dict.fromkeys(self.COUNTERS, 0)     # {name: count, ...}
+        self.timings = {}                                   # {phase: seconds, ...}     summed over all calls
+
+    def add(self, **counts):
+        """
+        Adds counts to counters, for example stats.add(pushes=10, pops=8)
+        """
+        for name, count in counts.items():
+            self.counters[name] += count
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Context manager, adds time spent inside it to phase
+        """
+        started = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - started
+
+    def as_dict(self):
+        """
+        :return: {'counters': {name: count, ...}, 'timings': {phase: seconds, ...}}
+        """
+        return {'counters': dict(self.counters), 'timings': dict(self.timings)}
+
+    def log_line(self):
+        """
+        :return: single line, counters and then timings, for example 'searches=2 pushes=40 ... build=0.0012s'
+        """
+        counters = ['{}={}'.format(name, count) for name, count in self.counters.items()]
+        timings = ['{}={:.4f}s'.format(name, seconds) for name, seconds in self.timings.items()]
+        return ' '.join(counters + timings)
+
+    def __str__(self):
+        return self.log_line()
+
+
+def phase(stats, name):
+    """
+    :return: stats.phase(name), or context manager doing nothing when stats is None
+    """
+    return nullcontext() if stats is None else stats.phase(name)
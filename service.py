@@ -0,0 +1,193 @@
+"""
+Long running solve service, maps are parsed and graphs built once, later requests for same map only search.
+
+Clients connect over Unix socket (or localhost TCP) and send JSON requests, one per line, every request gets
+one JSON response line, in order:
+    {"op": "upload", "map": ["CCD", "PCC"]}                 ->  {"map_id": "..."}
+    {"op": "load", "file": "generated/3py.txt"}             ->  {"map_id": "..."}
+    {"op": "solve", "map_id": "...", "turns": 1000}         ->  {"turns": 12, "path": [[0, 0], ...]}
+    {"op": "batch", "requests": [{...}, {...}]}             ->  {"results": [{...}, {...}]}
+Solve accepts same options as batch.solve_map (compact, tour, search) and style of path:
+'coords' ([[x, y], ...], default), 'minimal' (['(x,y)', ...]), 'verbose' (['Node(...)', ...]),
+'directions' ('RRDT(5,7)L...') or 'rle' ('R2DT(5,7)L...'), same text as paths.format_path.
+Errors are returned as {"error": "ValueError: ..."}.
+
+Solving runs in pool of worker processes, every worker keeps its own SolveCache (see cache.py) keyed by map_id,
+so graphs and legs stay warm in workers. Map is sent to worker only when worker does not have its graph yet.
+Requests of batch run concurrently and same solve requested by more clients at once is computed only once.
+
+    python service.py --socket /tmp/princesses.sock --workers 4
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+from cache import LRU, SolveCache
+from main import load_map_from_file, save_princess, get_trace_distance, SEARCHES
+from paths import format_path
+
+STYLES = ('coords', 'minimal', 'verbose', 'directions', 'rle')
+
+_worker_cache = None        # SolveCache of worker process, created by first solve
+
+
+def _solve(map_id, terrain, max_turns, compact, tour, search):
+    """
+    Solves map in worker process
+    :param terrain: list of map lines, None if worker is expected to have graph of map_id already
+    :return: tuple (turns, path), path is list of Nodes, turns is None if there is no solution,
+        None if terrain is None and worker does not have graph
+    """
+    global _worker_cache
+    if _worker_cache is None:
+        _worker_cache = SolveCache()
+    graph = _worker_cache.graph(terrain, compact, bytes.fromhex(map_id))
+    if graph is None:
+        return None
+    path = save_princess(graph, max_turns, tour=tour, search=search, cache=_worker_cache)
+    return get_trace_distance(graph, path) if path else None, list(path)
+
+
+class SolveService:
+    def __init__(self, workers=None, max_maps=64, executor=None):
+        """
+        :param workers: number of worker processes, None for number of CPUs
+        :param max_maps: number of maps kept, least recently used map is forgotten first
+        :param executor: executor to solve in instead of new process pool
+        """
+        self.maps = LRU(max_maps)       # {map_id: [line, ...], ...}
+        self.executor = executor if executor is not None else ProcessPoolExecutor(workers)
+        self.running = {}               # {(map_id, turns, compact, tour, search): Future, ...}     solves in progress
+
+    def add_map(self, terrain):
+        """
+        :return: map_id, sha256 of map
+        """
+        map_id = hashlib.sha256('\n'.join(terrain).encode()).hexdigest()
+        self.maps.put(map_id, terrain)
+        return map_id
+
+    async def handle(self, request):
+        """
+        :param request: dictionary, see module documentation
+        :return: response dictionary
+        """
+        try:
+            op = request.get('op')
+            if op == 'upload':
+                return {'map_id': self.add_map([str(line) for line in request['map']])}
+            if op == 'load':
+                return {'map_id': self.add_map(load_map_from_file(request['file']))}
+            if op == 'solve':
+                return await self.solve(request)
+            if op == 'batch':
+                return {'results': await asyncio.gather(*(self.handle(item) for item in request['requests']))}
+            raise ValueError('Unknown op: ' + str(op))
+        except Exception as e:      # client always gets response, whatever solving of its map raised
+            return {'error': '{}: {}'.format(type(e).__name__, e)}
+
+    async def solve(self, request):
+        terrain = self.maps.get(request['map_id'])
+        if terrain is None:
+            raise KeyError('Unknown map: ' + str(request['map_id']))
+        style = request.get('style', 'coords')
+        if style not in STYLES:
+            raise ValueError('Unknown style: ' + str(style))
+        search = request.get('search', 'dijkstra')
+        if search not in SEARCHES:
+            raise ValueError('Unknown search: ' + str(search))
+        key = (request['map_id'], int(request['turns']), bool(request.get('compact', False)),
+               request.get('tour', 'held_karp'), search)
+
+        future = self.running.get(key)
+        if future is None:      # nobody asked for same solve yet
+            future = asyncio.ensure_future(self._run(terrain, key))
+            self.running[key] = future
+            future.add_done_callback(lambda _: self.running.pop(key, None))
+        turns, path = await asyncio.shield(future)
+        if style == 'coords':
+            return {'turns': turns, 'path': [[node.x, node.y] for node in path]}
+        text = format_path(path, style)
+        return {'turns': turns, 'path': text.splitlines() if style in {'minimal', 'verbose'} else text}
+
+    async def _run(self, terrain, key):
+        """
+        Solves in pool, map is sent again with its lines only when worker does not have its graph
+        :param key: (map_id, turns, compact, tour, search)
+        """
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(self.executor, _solve, key[0], None, *key[1:])
+        if result is None:
+            result = await loop.run_in_executor(self.executor, _solve, key[0], terrain, *key[1:])
+        return result
+
+    async def _connection(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                except ValueError as e:
+                    response = {'error': 'ValueError: ' + str(e)}
+                else:
+                    response = await self.handle(request) if isinstance(request, dict) else \
+                        {'error': 'ValueError: request must be JSON object'}
+                writer.write(json.dumps(response).encode() + b'\n')
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def start(self, path=None, host='127.0.0.1', port=0):
+        """
+        Starts listening on Unix socket path, or on TCP host and port when path is None
+        :return: asyncio.Server
+        """
+        limit = 2 ** 30     # uploaded maps are single line of JSON
+        if path is not None:
+            return await asyncio.start_unix_server(self._connection, path, limit=limit)
+        return await asyncio.start_server(self._connection, host, port, limit=limit)
+
+    def close(self):
+        self.executor.shutdown()
+
+
+async def request(reader, writer, message):
+    """
+    Client side, sends one request and waits for its response
+    :return: response dictionary
+    """
+    writer.write(json.dumps(message).encode() + b'\n')
+    await writer.drain()
+    return json.loads(await reader.readline())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve save_princess over Unix socket or localhost TCP.')
+    parser.add_argument('--socket', default=None, help='Unix socket path')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765, help='TCP port, used when --socket is not given')
+    parser.add_argument('--workers', type=int, default=None, help='number of processes, default is number of CPUs')
+    parser.add_argument('--maps', nargs='*', default=[], help='map files loaded at start, their ids are printed')
+    args = parser.parse_args(argv)
+
+    service = SolveService(args.workers)
+    for file in args.maps:
+        print(file, service.add_map(load_map_from_file(file)))
+
+    async def serve():
+        server = await service.start(args.socket, args.host, args.port)
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    finally:
+        service.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,53 +1,158 @@
+"""
+Seeded generator of random maps, from small test maps to stress maps of 10000x10000 tiles.
+
+Key tiles ('D', 'P', 'G' and teleports) are placed first on distinct random tiles, then rows are generated
+one by one as random bytes translated into 'C', 'H' and 'N' by lookup table, key tiles of row are put into it
+and row is written, so whole map is never held in memory. Same seed and parameters give same map.
+
+    write_terrain('generated/big.txt', 10000, 10000, seed=1, teleport_density=0.001, generators=2)
+    write_terrain('generated/big.map', 10000, 10000, seed=1)     # binary map, see binary_map.py
+    python terrain_generator.py generated/big.map --size 10000 10000 --seed 1
+"""
+import argparse
+import os
 import random
 import string
-import os
-import functools
+from array import array
+
+SYMBOLS_PROBABILITY = {'C': 10, 'H': 5, 'N': 10}
+# raised whenever same seed and parameters start to give different map, (benchmark baselines depend on it)
+VERSION = 2
+TELEPORT_SYMBOLS = b'0123456789'
+
 
+def symbol_table(symbols_probability=None):
+    """
+    :param symbols_probability: weights of 'C', 'H' and 'N' tiles, SYMBOLS_PROBABILITY by default
+    :return: table for bytes.translate, random byte -> symbol, weights are rounded to multiples of 1/256
+    """
+    if symbols_probability is None:
+        symbols_probability = SYMBOLS_PROBABILITY
+    total = sum(symbols_probability.values())
+    table = bytearray()
+    cumulative = 0
+    for symbol, weight in symbols_probability.items():
+        cumulative += weight
+        table += symbol.encode() * (round(cumulative * 256 / total) - len(table))
+    return bytes(table)
 
-# noinspection PyPep8Naming
-def get_random_CHN_symbol():
-    symbols_probability = {'C': 10, 'H': 5, 'N': 10}
-    _sum = functools.reduce(lambda l, r: l+r, symbols_probability.values())
-    random_int = random.randint(1, _sum)
-    current_num = 0
-    for key, value in symbols_probability.items():
-        current_num += value
-        if current_num >= random_int:
-            return key
 
+def place_key_tiles(width, height, rng, princesses=3, dragons=1, generators=0, teleport_density=0.0,
+                    teleport_groups=10):
+    """
+    Chooses distinct tiles for key tiles
+    :param teleport_density: fraction of tiles which become teleports
+    :param teleport_groups: number of teleport groups, teleports get digits 0 to teleport_groups-1
+    :return: dictionary {symbol: array('i', [index, ...]), ...}, sorted tile indexes (y*width+x) of every symbol
+    :raises ValueError: if key tiles do not fit into map
+    """
+    if not 1 <= teleport_groups <= len(TELEPORT_SYMBOLS):
+        raise ValueError('Number of teleport groups must be from 1 to 10.')
+    size = width * height
+    teleports = round(teleport_density * size)
+    counts = [(ord('D'), int(dragons)), (ord('P'), int(princesses)), (ord('G'), int(generators))]
+    if sum(count for _, count in counts) + teleports > size:
+        raise ValueError('Key tiles do not fit into {}x{} map.'.format(width, height))
+
+    indexes = rng.sample(range(size), sum(count for _, count in counts) + teleports)
+    key_tiles = {}
+    start = 0
+    for symbol, count in counts:
+        key_tiles[symbol] = indexes[start:start + count]
+        start += count
+    digits = rng.choices(TELEPORT_SYMBOLS[:teleport_groups], k=teleports)
+    for index, symbol in zip(indexes[start:], digits):
+        key_tiles.setdefault(symbol, []).append(index)
+    return {symbol: array('i', sorted(group)) for symbol, group in key_tiles.items() if group}
+
+
+def generate_rows(width, height, rng, key_tiles, symbols_probability=None):
+    """
+    :param key_tiles: result of place_key_tiles
+    :return: generator of rows of map as bytes, without new line
+    """
+    table = symbol_table(symbols_probability)
+    rows = {}       # {y: [(x, symbol), ...], ...}
+    for symbol, group in key_tiles.items():
+        for index in group:
+            rows.setdefault(index // width, []).append((index % width, symbol))
 
-def generate_random_terrain(width=5, height=5, num_of_princesses=3):
-    _terrain = ['' for i in range(height)]
     for y in range(height):
-        for x in range(width):
-            _terrain[y] += get_random_CHN_symbol()
+        row = rng.randbytes(width).translate(table)
+        if y in rows:
+            row = bytearray(row)
+            for x, symbol in rows[y]:
+                row[x] = symbol
+            row = bytes(row)
+        yield row
+
+
+def generate_random_terrain(width=5, height=5, num_of_princesses=3, teleport_density=0.0, num_of_generators=0,
+                            rng=random, symbols_probability=None, num_of_dragons=1):
+    """
+    :param symbols_probability: weights of 'C', 'H' and 'N' tiles, SYMBOLS_PROBABILITY by default
+    :param teleport_density: fraction of tiles which become teleports, (digits 0-9)
+    :param num_of_generators: number of 'G' tiles
+    :param rng: source of randomness, pass random.Random(seed) for same terrain every time
+    :return: list of map lines
+    """
+    key_tiles = place_key_tiles(width, height, rng, num_of_princesses, num_of_dragons, num_of_generators,
+                                teleport_density)
+    return [row.decode() for row in generate_rows(width, height, rng, key_tiles, symbols_probability)]
 
-    dragon_coords = (random.randint(0, width-1), random.randint(0, height-1))
-    princesses_coords = []
-    for princess_num in range(num_of_princesses):
-        princess_coords = (random.randint(0, width-1), random.randint(0, height-1))
-        while princess_coords in princesses_coords or princess_coords == dragon_coords:
-            princess_coords = (random.randint(0, width-1), random.randint(0, height-1))
-        princesses_coords.append(princess_coords)
 
-    new_line = list(_terrain[dragon_coords[1]])
-    new_line[dragon_coords[0]] = 'D'
-    _terrain[dragon_coords[1]] = ''.join(new_line)
+def write_terrain(file, width, height, seed=None, princesses=3, dragons=1, generators=0, teleport_density=0.0,
+                  teleport_groups=10, symbols_probability=None, binary=None):
+    """
+    Generates map and writes it row by row into file
+    :param seed: seed of random.Random, None for different map every time
+    :param binary: write binary map (see binary_map.py), None to decide by extension of file
+    other parameters are same as in place_key_tiles and generate_rows
+    """
+    rng = random.Random(seed)
+    key_tiles = place_key_tiles(width, height, rng, princesses, dragons, generators, teleport_density,
+                                teleport_groups)
+    rows = generate_rows(width, height, rng, key_tiles, symbols_probability)
+    if binary is None:
+        binary = file.endswith('.map')
 
-    for princess in princesses_coords:
-        new_line = list(_terrain[princess[1]])
-        new_line[princess[0]] = 'P'
-        _terrain[princess[1]] = ''.join(new_line)
+    with open(file, 'wb') as f:
+        if binary:
+            from binary_map import write_header     # it imports main, text maps do not need it
+            dragons = key_tiles.get(ord('D'))
+            groups = [key_tiles.get(symbol, array('i')) for symbol in TELEPORT_SYMBOLS]
+            write_header(f, width, height, dragons[0] if dragons else -1, key_tiles.get(ord('P'), array('i')),
+                         key_tiles.get(ord('G'), array('i')), groups)
+            for row in rows:
+                f.write(row)
+        else:
+            for row in rows:
+                f.write(row + b'\n')
 
-    return _terrain
 
-file = ''.join(random.SystemRandom().choice(string.ascii_lowercase + string.digits) for _ in range(3)) + '.txt'
-path = os.path.join('generated', file)
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate random map into text or binary (.map) file.')
+    parser.add_argument('file', nargs='?', default=None, help='output file, random name in generated/ by default')
+    parser.add_argument('--size', type=int, nargs=2, default=[20, 20], metavar=('WIDTH', 'HEIGHT'))
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--princesses', type=int, default=3)
+    parser.add_argument('--dragons', type=int, default=1)
+    parser.add_argument('--generators', type=int, default=0)
+    parser.add_argument('--teleport-density', type=float, default=0.0)
+    parser.add_argument('--teleport-groups', type=int, default=10)
+    parser.add_argument('--weights', type=int, nargs=3, default=None, metavar=('C', 'H', 'N'),
+                        help='weights of C, H and N tiles, default is 10 5 10')
+    args = parser.parse_args(argv)
 
-terrain = generate_random_terrain(20, 20)
+    file = args.file
+    if file is None:
+        name = ''.join(random.SystemRandom().choice(string.ascii_lowercase + string.digits) for _ in range(3))
+        file = os.path.join('generated', name + '.txt')
+    weights = dict(zip('CHN', args.weights)) if args.weights else None
+    write_terrain(file, *args.size, args.seed, args.princesses, args.dragons, args.generators, args.teleport_density,
+                  args.teleport_groups, weights)
+    print('Written into ' + file)
 
-print('Written into ' + file)
 
-with open(path, 'w') as f:
-    for line in terrain:
-        f.write(line + '\n')
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+import random
+import time
+import unittest
+
+import sys
+
+from main import CompactTerrainGraph, key_point_matrix, held_karp_tour, anytime_tour, save_princess, \
+    get_trace_distance
+
+
+class AnytimeTourTests(unittest.TestCase):
+    def random_map(self, seed, size, princesses):
+        rnd = random.Random(seed)
+        terrain = [[rnd.choice('CCCHHN') for _ in range(size)] for _ in range(size)]
+        for symbol in 'P' * princesses + 'G11' + 'D':
+            terrain[rnd.randrange(1, size)][rnd.randrange(size)] = symbol
+        terrain[0][0] = 'C'
+        return CompactTerrainGraph([''.join(line) for line in terrain])
+
+    def test_close_to_held_karp(self):
+        for seed in range(5):
+            g = self.random_map(seed, 15, 7)
+            matrix = key_point_matrix(g, g.dragon)
+            expected = held_karp_tour(g.dragon, g.princesses, matrix)
+            trace, distance, teleport_activated, gap, rounds = anytime_tour(g.dragon, g.princesses, matrix,
+                                                                            budget=0.2)
+            if not expected[0]:
+                self.assertEqual(trace, [])
+                continue
+            self.assertEqual(distance, expected[1])     # perturbed orders are searched until budget runs out
+            self.assertGreaterEqual(gap, 0)
+            self.assertLessEqual(distance - gap, expected[1])      # lower bound is below optimum
+            self.assertEqual(get_trace_distance(g, trace), distance)
+            self.assertTrue(g.princesses <= set(trace))
+
+    def test_budget(self):
+        g = self.random_map(1, 40, 30)
+        matrix = key_point_matrix(g, g.dragon)
+        _, _, _, _, rounds = anytime_tour(g.dragon, g.princesses, matrix, budget=0)
+        self.assertEqual(rounds, 0)
+        _, first_distance, _, _, _ = anytime_tour(g.dragon, g.princesses, matrix, budget=0)
+        started = time.perf_counter()
+        trace, distance, _, _, rounds = anytime_tour(g.dragon, g.princesses, matrix, budget=0.5)
+        self.assertGreaterEqual(time.perf_counter() - started, 0.5)     # whole budget is used
+        self.assertGreater(rounds, 0)
+        self.assertLess(distance, first_distance)
+        self.assertTrue(g.princesses <= set(trace))
+
+    def test_save_princess(self):
+        terrain = [
+            "CHCP",
+            "CNPN",
+            "DNHP"
+        ]
+        g = CompactTerrainGraph(terrain)
+        path = save_princess(g, 10, tour='anytime')
+        self.assertEqual(get_trace_distance(g, path), get_trace_distance(g, save_princess(g, 10)))
+        self.assertEqual(anytime_tour(g.dragon, set(), {}), ([], sys.maxsize, False, 0, 0))
+
+
+    def test_edge_cases(self):
+        teleport_only = [
+            "CNNP",
+            "0NN0",
+            "DGPN",
+        ]
+        g = CompactTerrainGraph(teleport_only)
+        path = save_princess(g, 10, tour='anytime')
+        self.assertEqual(get_trace_distance(g, path), get_trace_distance(g, save_princess(g, 10)))
+        self.assertIn(g.get_node(3, 0), path)
+
+        unreachable = [
+            "CCP",
+            "NNN",
+            "DCP",
+        ]
+        g = CompactTerrainGraph(unreachable)
+        trace, distance, _, _, _ = anytime_tour(g.dragon, g.princesses, key_point_matrix(g, g.dragon))
+        self.assertEqual((trace, distance), ([], sys.maxsize))
+        self.assertEqual(save_princess(g, 10, tour='anytime'), [])
+
+        self.assertEqual(save_princess(CompactTerrainGraph(["CPCP"]), 10, tour='anytime'), [])     # no dragon
+
+        # many princesses on single row, so best tour is known
+        g = CompactTerrainGraph(["CD" + "P" * 13, "C" * 15])
+        path = save_princess(g, 20, tour='anytime')
+        self.assertEqual(get_trace_distance(g, path), 14)
+
+
+if __name__ == '__main__':
+    unittest.main()
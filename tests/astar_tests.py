@@ -0,0 +1,71 @@
+import unittest
+
+from main import TerrainGraph, CompactTerrainGraph, find_paths, astar_heuristic, shortest_path_all, \
+    shortest_path_any, save_princess, get_trace_distance
+
+
+class AStarTests(unittest.TestCase):
+    terrain = [
+        "CCCCCCCCCC",
+        "CHHHHHHHHC",
+        "CCCCCCCCNC",
+        "NNNNNNNCNC",
+        "CCCCCCCCNC",
+        "CCCCCCCCCC",
+    ]
+
+    def test_heuristic_without_teleports(self):
+        g = CompactTerrainGraph(self.terrain)
+        h = astar_heuristic(g, {g.vertex(g.get_node(9, 5))})
+        self.assertEqual(h((g.vertex(g.get_node(0, 0)), False)), 14)
+        self.assertEqual(h((g.vertex(g.get_node(9, 5)), False)), 0)
+
+    def test_heuristic_with_teleports(self):
+        g = TerrainGraph(["G1CCC", "CCCC1"])
+        h = astar_heuristic(g, {g.get_node(3, 1)})
+        # teleport exit (4, 1) is next to target
+        self.assertEqual(h((g.get_node(0, 0), False)), 1)
+        self.assertEqual(h((g.get_node(0, 0), True)), 1)
+        self.assertEqual(h((g.hubs['1'], True)), 1)
+        # generators cannot activate teleports
+        h = astar_heuristic(g, {g.get_node(3, 1)}, generators_activate=False)
+        self.assertEqual(h((g.get_node(0, 0), False)), 4)
+
+    def test_expands_less(self):
+        g = CompactTerrainGraph(self.terrain)
+        source, target = g.vertex(g.get_node(0, 0)), g.vertex(g.get_node(7, 0))
+        dijkstra_distances, _ = find_paths(g, source, {target})
+        astar_distances, _ = find_paths(g, source, {target}, search='astar')
+        self.assertEqual(dijkstra_distances[(target, False)], astar_distances[(target, False)])
+        self.assertLess(len(astar_distances), len(dijkstra_distances))
+
+    def test_same_distances_as_dijkstra(self):
+        terrain = [
+            "CNHC0",
+            "CHNCG",
+            "DNNHC",
+            "CP0CC"
+        ]
+        for graph_class in (TerrainGraph, CompactTerrainGraph):
+            g = graph_class(terrain)
+            destinations = {g.get_node(x, y) for x in range(4) for y in range(4)}
+            dijkstra = shortest_path_all(g.get_node(0, 0), destinations, g)
+            astar = shortest_path_all(g.get_node(0, 0), destinations, g, search='astar')
+            self.assertEqual({node: path[1:] for node, path in dijkstra.items()},
+                             {node: path[1:] for node, path in astar.items()})
+            path, _ = shortest_path_any(g.get_node(0, 0), {g.get_node(3, 3)}, g, search='astar')
+            self.assertEqual(get_trace_distance(g, path), 6)
+
+    def test_save_princess(self):
+        terrain = [
+            "CHCP",
+            "CNPN",
+            "DNHP"
+        ]
+        for tour in ('held_karp', 'permutations'):
+            self.assertEqual(save_princess(terrain, 10, tour=tour, search='astar'), save_princess(terrain, 10))
+        self.assertRaises(ValueError, save_princess, terrain, 10, search='bfs')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from array import array
+
+from batch import expand_maps, solve_map, solve_maps, write_jsonl
+from binary_map import EXTENSION, HEADER, convert
+
+
+class BatchTests(unittest.TestCase):
+    maps = {
+        'a.txt': ["CDCP"],
+        'b.txt': ["CNHC", "CHNC", "DNNH", "CPCC"],
+        'c.txt': ["CNDP"],     # dragon cannot be reached
+        'd.txt': ["CDC", "PC"],     # rows have different width
+    }
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        for name, terrain in self.maps.items():
+            with open(os.path.join(self.directory.name, name), 'w') as f:
+                f.write('\n'.join(terrain) + '\n')
+        self.files = expand_maps([self.directory.name])
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_expand_maps(self):
+        self.assertEqual([os.path.basename(file) for file in self.files], ['a.txt', 'b.txt', 'c.txt', 'd.txt'])
+        pattern = os.path.join(self.directory.name, '[ab].txt')
+        self.assertEqual(expand_maps([pattern, self.files[0]]), self.files[:2])
+
+    def test_solve_map(self):
+        self.assertEqual(solve_map(self.files[0], 10), {'map': self.files[0], 'turns': 3,
+                                                        'path': [[0, 0], [1, 0], [2, 0], [3, 0]]})
+        self.assertEqual(solve_map(self.files[2], 10), {'map': self.files[2], 'turns': None, 'path': []})
+        self.assertIn('ValueError', solve_map(self.files[3], 10, compact=True)['error'])
+
+    def test_binary_map(self):
+        binary_file = os.path.join(self.directory.name, 'b' + EXTENSION)
+        convert(self.files[1], binary_file)
+        self.assertIn(binary_file, expand_maps([self.directory.name]))
+        result = solve_map(binary_file, 100)
+        self.assertEqual(result['turns'], 4)
+        self.assertEqual(result['path'], solve_map(self.files[1], 100)['path'])
+
+    def test_bad_map_between_good_maps(self):
+        with tempfile.TemporaryDirectory() as directory:
+            files = [os.path.join(directory, name) for name in ('a.txt', 'b' + EXTENSION, 'c.txt')]
+            for file, terrain in zip(files[::2], (["CDCP"], ["CPCD"])):
+                with open(file, 'w') as f:
+                    f.write('\n'.join(terrain) + '\n')
+            convert(files[0], files[1])
+            with open(files[1], 'r+b') as f:     # princess table points far out of map
+                f.seek(HEADER.size)
+                f.write(array('i', [10 ** 6]).tobytes())
+
+            results = list(solve_maps(files, 10, workers=1))
+            self.assertEqual([result['map'] for result in results], files)
+            self.assertEqual(results[0]['turns'], 3)
+            self.assertIn('Binary map is corrupt', results[1]['error'])
+            self.assertEqual(results[2]['turns'], 5)
+            self.assertRaises(TypeError, solve_map, files[0], 'ten')     # bug is not hidden as broken map
+
+    def test_same_results_in_processes(self):
+        expected = list(solve_maps(self.files, 100, workers=1))
+        self.assertEqual([result['map'] for result in expected], self.files)
+        self.assertEqual(list(solve_maps(self.files, 100, workers=2, chunk_size=1)), expected)
+        unordered = solve_maps(self.files, 100, workers=2, chunk_size=3, ordered=False)
+        self.assertEqual(sorted(unordered, key=lambda result: result['map']), expected)
+
+    def test_write_jsonl(self):
+        f = io.StringIO()
+        self.assertEqual(write_jsonl(solve_maps(self.files[:2], 100, workers=1), f), 2)
+        lines = f.getvalue().splitlines()
+        self.assertEqual(json.loads(lines[1])['turns'], 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import json
+import os
+import tempfile
+import unittest
+
+from benchmark import Case, PHASES, generate_case, cases, run, run_case, measure, compare, main
+from terrain_generator import VERSION as GENERATOR_VERSION
+
+
+class BenchmarkTests(unittest.TestCase):
+    def test_cases_are_reproducible(self):
+        case = Case(30, 3, 0.02, 'random', 7)
+        terrain = generate_case(case)
+        self.assertEqual(terrain, generate_case(case))
+        self.assertNotEqual(terrain, generate_case(case._replace(seed=8)))
+        self.assertEqual(len(terrain), 30)
+        self.assertEqual(sum(line.count('P') for line in terrain), 3)
+        self.assertEqual(sum(line.count('G') for line in terrain), 1)
+        self.assertEqual(generate_case(case._replace(generators='start'))[0][1], 'G')
+
+    def test_run(self):
+        case_list = cases([10], [1, 2], [0.0], ['none', 'start'])
+        self.assertEqual(len(case_list), 4)
+        results = run(case_list, compact=True, repeat=1, memory=True)
+        self.assertEqual(len(results['cases']), 4)
+        for phases in results['cases'].values():
+            self.assertEqual(set(phases.keys()), set(PHASES))
+            self.assertTrue(all(phase['peak_bytes'] is not None for phase in phases.values()))
+            self.assertGreater(phases['shortest_path_any']['expansions'], 0)
+
+    def test_expansions_of_timed_search(self):
+        case = Case(20, 2, 0.0, 'none', 1)
+        for search in ('dijkstra', 'lpa'):
+            once = run_case(case, search=search, repeat=1)
+            repeated = run_case(case, search=search, repeat=3)      # every run starts with new planner
+            for phase in ('shortest_path_any', 'shortest_path_all'):
+                self.assertGreater(once[phase]['expansions'], 0)
+                self.assertEqual(repeated[phase]['expansions'], once[phase]['expansions'])
+
+    def test_measure_setup(self):
+        calls = []
+        result, seconds, peak = measure(lambda argument: calls.append(argument) or argument, 3, True,
+                                        lambda: len(calls))
+        self.assertEqual(calls, [0, 1, 2, 3])
+        self.assertEqual(result, 2)
+        self.assertIsNotNone(peak)
+
+    def test_compare(self):
+        baseline = {'generator_version': GENERATOR_VERSION,
+                    'cases': {'a': {'build': {'seconds': 1.0}, 'save_princess': {'seconds': 0.001}}}}
+        results = {'generator_version': GENERATOR_VERSION,
+                   'cases': {'a': {'build': {'seconds': 1.5}, 'save_princess': {'seconds': 0.005}},
+                             'b': {'build': {'seconds': 9.0}}}}
+        self.assertEqual(compare(results, baseline), [('a', 'build', 1.0, 1.5)])
+        self.assertEqual(compare(results, baseline, tolerance=1.0), [])
+
+    def test_baseline_of_other_generator(self):
+        results = run(cases([5], [1], [0.0], ['none']), repeat=1)
+        self.assertEqual(results['generator_version'], GENERATOR_VERSION)
+        self.assertTrue(all(name.endswith('-v{}'.format(GENERATOR_VERSION)) for name in results['cases']))
+        for version in (None, GENERATOR_VERSION - 1):
+            baseline = dict(results, generator_version=version)
+            self.assertRaises(ValueError, compare, results, baseline)
+        with tempfile.TemporaryDirectory() as directory:
+            file = os.path.join(directory, 'baseline.json')
+            with open(file, 'w') as f:
+                json.dump({'cases': results['cases']}, f)       # saved before version was stored
+            self.assertEqual(main(['--sizes', '5', '--teleports', '0', '--generators', 'none', '--repeat', '1',
+                                   '--baseline', file]), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+
+from main import TerrainGraph, CompactTerrainGraph, dijkstra, bidirectional, best_state, shortest_path_any, \
+    save_princess, get_trace_distance
+from search_stats import SearchStats
+
+
+class BidirectionalTests(unittest.TestCase):
+    def test_reverse_neighbours(self):
+        terrain = [
+            "CNH0",
+            "GHNC",
+            "DN0H",
+        ]
+        for graph_class in (TerrainGraph, CompactTerrainGraph):
+            g = graph_class(terrain)
+            vertices = [g.vertex(g.get_node(x, y)) for x in range(4) for y in range(3)]
+            for teleports_activated in (False, True):
+                edges = {(u, v, cost) for u in vertices for v, cost in g.neighbours(u, teleports_activated)
+                         if g.coords(v)[0] >= 0}
+                reversed_edges = {(u, v, cost) for v in vertices
+                                  for u, cost in g.reverse_neighbours(v, teleports_activated) if g.coords(u)[0] >= 0}
+                self.assertEqual(edges, reversed_edges)
+        # cost is paid when leaving tile
+        g = TerrainGraph(["CH"])
+        self.assertEqual(g.reverse_neighbours(g.get_node(0, 0)), [(g.get_node(1, 0), 2)])
+
+    def test_same_distances_as_dijkstra(self):
+        terrain = [
+            "CHG1N",
+            "HNNNC",
+            "0CNCN",
+            "NNN1P",
+        ]
+        for graph_class in (TerrainGraph, CompactTerrainGraph):
+            g = graph_class(terrain)
+            vertices = [g.vertex(g.get_node(x, y)) for y in range(4) for x in range(5)]
+            for source in vertices:
+                for teleports_activated in (False, True):
+                    for target in vertices:
+                        expected, _ = dijkstra(g, source, {target}, teleports_activated)
+                        distances, _ = bidirectional(g, source, {target}, teleports_activated)
+                        self.assertEqual(best_state(expected, target)[1], best_state(distances, target)[1])
+
+    def test_ragged_rows(self):
+        g = TerrainGraph(["CCCC", "C", "CHCCP"])
+        source, target = g.vertex(g.get_node(0, 0)), g.vertex(g.get_node(4, 2))
+        distances, _ = bidirectional(g, source, {target})
+        self.assertEqual(best_state(distances, target)[1], 7)
+
+    def test_walled_off_target(self):
+        g = CompactTerrainGraph(["CCN", "CNC", "NCP"])
+        path, teleport_activated = shortest_path_any(g.get_node(0, 0), {g.get_node(2, 2)}, g, search='bidirectional')
+        self.assertEqual((path, teleport_activated), ([], False))
+
+    def test_meets_behind_teleport(self):
+        terrain = ["G0" + "C" * 38] + ["C" * 40 for _ in range(38)] + ["C" * 39 + "0"]
+        g = CompactTerrainGraph(terrain)
+        stats = SearchStats()
+        path, teleport_activated = shortest_path_any(g.get_node(0, 0), {g.get_node(39, 38)}, g,
+                                                     search='bidirectional', stats=stats)
+        self.assertEqual((get_trace_distance(g, path), teleport_activated), (2, True))
+        self.assertLess(stats.counters['expanded'], 20)
+
+    def test_far_generator_is_not_searched(self):
+        terrain = ["C" * 40 for _ in range(39)] + ["0" + "C" * 38 + "G"]
+        terrain[0] = "CCCCP0" + "C" * 34
+        g = CompactTerrainGraph(terrain)
+        source, target = g.vertex(g.get_node(0, 0)), g.vertex(g.get_node(4, 0))
+        expected = SearchStats()
+        dijkstra(g, source, {target}, stats=expected)
+        stats = SearchStats()
+        distances, _ = bidirectional(g, source, {target}, stats=stats)
+        self.assertEqual(best_state(distances, target)[1], 4)
+        self.assertEqual(stats.counters['searches'], 1)
+        self.assertLessEqual(stats.counters['expanded'], expected.counters['expanded'])
+        self.assertLess(stats.counters['expanded'], 30)
+
+        # generator close enough, path over teleports is searched with walking distance as budget
+        terrain[0] = "CG" + "C" * 37 + "P"
+        g = CompactTerrainGraph(terrain)
+        source, target = g.vertex(g.get_node(0, 0)), g.vertex(g.get_node(39, 0))
+        stats = SearchStats()
+        distances, _ = bidirectional(g, source, {target}, stats=stats)
+        self.assertEqual(best_state(distances, target), ((target, True), 39))
+        self.assertEqual(stats.counters['searches'], 2)
+
+    def test_save_princess(self):
+        terrain = [
+            "CNP0",
+            "CNNN",
+            "DGC0",
+            "PNNN",
+        ]
+        g = TerrainGraph(terrain)
+        for tour in ('held_karp', 'permutations'):
+            expected = save_princess(terrain, 10, tour=tour)
+            path = save_princess(terrain, 10, tour=tour, search='bidirectional')
+            self.assertTrue(path)
+            self.assertEqual(get_trace_distance(g, expected), get_trace_distance(g, path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import os
+import tempfile
+import unittest
+from array import array
+
+import binary_map
+from main import CompactTerrainGraph, save_princess, get_trace_distance
+
+
+class BinaryMapTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.text_file = os.path.join(self.directory.name, 'map.txt')
+        self.binary_file = os.path.join(self.directory.name, 'map' + binary_map.EXTENSION)
+        self.write_map(["CDCP"])
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write_map(self, terrain):
+        with open(self.text_file, 'w') as f:
+            f.write('\n'.join(terrain) + '\n')
+
+    def test_round_trip(self):
+        terrains = [
+            ["CDCP"],
+            ["CCHP",
+             "0NNN",
+             "CDG0"],           # princess behind teleports of one group
+            ["C0C1",
+             "NNNN",
+             "D1P0"],           # two teleport groups
+            ["CCP",
+             "NNN",
+             "DCP"],            # unreachable princesses
+            ["CHP",
+             "PNC"],            # no dragon
+        ]
+        for terrain in terrains:
+            self.write_map(terrain)
+            binary_map.convert(self.text_file, self.binary_file)
+            width, height = len(terrain[0]), len(terrain)
+            self.assertEqual(os.path.getsize(self.binary_file), binary_map.ALIGNMENT + width * height)
+            g = binary_map.load(self.binary_file)
+            expected = CompactTerrainGraph(terrain)
+            self.assertEqual((g.width, g.height), (width, height))
+            self.assertEqual(bytes(g.tiles), bytes(expected.tiles))
+            self.assertEqual(g.dragon, expected.dragon)
+            self.assertEqual(g.princesses, expected.princesses)
+            self.assertEqual(g.generators, expected.generators)
+            self.assertEqual(g.teleports, expected.teleports)
+            self.assertEqual(get_trace_distance(g, save_princess(g, 10)),
+                             get_trace_distance(expected, save_princess(expected, 10)))
+
+    def test_set_tile_does_not_change_file(self):
+        binary_map.convert(self.text_file, self.binary_file)
+        g = binary_map.load(self.binary_file)
+        g.set_tile(0, 0, 'H')
+        self.assertEqual(g.get_node(0, 0).value, 'H')
+        self.assertEqual(binary_map.load(self.binary_file).get_node(0, 0).value, 'C')
+
+    def test_load_graph(self):
+        binary_map.convert(self.text_file, self.binary_file)
+        self.assertIsInstance(binary_map.load_graph(self.binary_file), CompactTerrainGraph)
+        self.assertIsInstance(binary_map.load_graph(self.text_file, compact=True), CompactTerrainGraph)
+        self.assertNotIsInstance(binary_map.load_graph(self.text_file), CompactTerrainGraph)
+
+    def test_invalid_file(self):
+        self.assertRaises(ValueError, binary_map.load, self.text_file)
+        binary_map.convert(self.text_file, self.binary_file)
+        with open(self.binary_file, 'rb') as f:
+            data = f.read()
+        for length in (10, binary_map.HEADER.size + 4, len(data) - 1):
+            with open(self.binary_file, 'wb') as f:
+                f.write(data[:length])
+            self.assertRaises(ValueError, binary_map.load, self.binary_file)
+
+
+    def test_corrupt_tables(self):
+        self.write_map(["CCGD",
+                        "0CP0"])
+        binary_map.convert(self.text_file, self.binary_file)
+        with open(self.binary_file, 'rb') as f:
+            data = f.read()
+        fields = list(binary_map.HEADER.unpack_from(data))
+        teleports = binary_map.HEADER.size + 4 * (fields[4] + fields[5])     # first index of group '0'
+
+        def corrupt(dragon=None, teleport=None):
+            changed = bytearray(data)
+            if dragon is not None:
+                binary_map.HEADER.pack_into(changed, 0, *fields[:3], dragon, *fields[4:])
+            if teleport is not None:
+                changed[teleports:teleports + 4] = array('i', [teleport]).tobytes()
+            with open(self.binary_file, 'wb') as f:
+                f.write(changed)
+
+        for dragon, teleport in ((100, None), (-2, None), (0, None), (None, 1), (None, -1), (None, 8)):
+            corrupt(dragon, teleport)
+            with self.assertRaisesRegex(ValueError, 'Binary map is corrupt'):
+                binary_map.load(self.binary_file)
+        corrupt(-1, None)       # dragon is missing in table, tile is not checked
+        self.assertIsNone(binary_map.load(self.binary_file).dragon)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import hashlib
+import os
+import tempfile
+import unittest
+
+from cache import LRU, SolveCache
+from main import TerrainGraph, CompactTerrainGraph, save_princess, get_trace_distance
+from search_stats import SearchStats
+
+
+class CacheTests(unittest.TestCase):
+    def test_lru(self):
+        lru = LRU(2)
+        lru.put('a', 1)
+        lru.put('b', 2)
+        self.assertEqual(lru.get('a'), 1)
+        lru.put('c', 3)
+        self.assertIsNone(lru.get('b'))
+        self.assertEqual((lru.get('a'), lru.get('c'), len(lru)), (1, 3, 2))
+
+    def test_graphs_are_reused(self):
+        terrain = [
+            "CDCP",
+            "CH",
+            "PNC",
+        ]
+        cache = SolveCache()
+        g = cache.graph(list(terrain))
+        self.assertIs(cache.graph(list(terrain)), g)
+        fingerprint = hashlib.sha256('\n'.join(terrain).encode()).digest()
+        self.assertIs(cache.graph(None, fingerprint=fingerprint), g)
+        self.assertIsNone(cache.graph(None, compact=True, fingerprint=fingerprint))
+        self.assertEqual(cache.fingerprint(g), cache.fingerprint(TerrainGraph(terrain)))
+
+        terrain = ["CD", "P0", "0P"]
+        self.assertIsInstance(cache.graph(terrain, compact=True), CompactTerrainGraph)
+        self.assertEqual(cache.fingerprint(cache.graph(terrain, compact=True)),
+                         cache.fingerprint(cache.graph(terrain)))
+
+    def test_second_solve_does_not_search(self):
+        terrains = [
+            ["CNNP",
+             "0NN0",
+             "DGPN"],           # one princess only behind teleports
+            ["CCP",
+             "NNN",
+             "DCP"],            # princess unreachable
+        ]
+        for terrain in terrains:
+            for tour in ('held_karp', 'permutations'):
+                for compact in (False, True):
+                    cache = SolveCache()
+                    expected = save_princess(terrain, 10, tour=tour, compact=compact)
+                    self.assertEqual(save_princess(terrain, 10, tour=tour, compact=compact, cache=cache), expected)
+                    stats = SearchStats()
+                    self.assertEqual(save_princess(terrain, 10, tour=tour, compact=compact, cache=cache,
+                                                   stats=stats), expected)
+                    self.assertEqual(stats.counters['searches'], 0)
+                    self.assertEqual(stats.counters['cache_misses'], 0)
+
+    def test_legs_shared_between_graph_types_and_disk(self):
+        terrain = [
+            "CCHC",
+            "DNGP",
+            "0CHP",
+            "NN0C",
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'legs.sqlite')
+            cache = SolveCache(path=path)
+            expected = save_princess(TerrainGraph(terrain), 10, cache=cache)
+            cache.close()
+
+            cache = SolveCache(path=path)
+            stats = SearchStats()
+            g = CompactTerrainGraph(terrain)
+            path_nodes = save_princess(g, 10, cache=cache, stats=stats)
+            self.assertEqual(stats.counters['searches'], 0)
+            self.assertEqual(path_nodes, expected)
+            self.assertEqual(get_trace_distance(g, path_nodes), get_trace_distance(g, save_princess(g, 10)))
+
+            # map changed, old legs are not used
+            g.set_tile(1, 1, 'C')
+            stats = SearchStats()
+            changed = save_princess(g, 10, cache=cache, stats=stats)
+            self.assertGreater(stats.counters['searches'], 0)
+            self.assertEqual(get_trace_distance(g, changed), get_trace_distance(g, save_princess(g, 10)))
+            cache.close()
+
+    def test_eviction(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = SolveCache(max_legs=1, path=os.path.join(directory, 'legs.sqlite'), max_bytes=100)
+            for i in range(10):
+                cache.put(str(i), 'x' * 40)
+            total, = cache.db.execute('SELECT SUM(size) FROM legs').fetchone()
+            self.assertLessEqual(total, 100)
+            self.assertEqual(cache.get('9'), 'x' * 40)
+            self.assertIsNone(cache.get('0'))
+            cache.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
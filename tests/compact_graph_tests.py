@@ -0,0 +1,96 @@
+import os
+import tempfile
+import unittest
+
+import sys
+
+from main import CompactTerrainGraph, TerrainGraph, Node, shortest_path_all, get_trace_distance, save_princess
+
+
+class CompactTerrainGraphTests(unittest.TestCase):
+    def test_nodes_are_created_from_tiles(self):
+        g = CompactTerrainGraph(["CD", "PH"])
+        self.assertEqual(g.get_node(1, 0), Node('D', 1, 0))
+        self.assertEqual(g.get_node(1, 1), Node('H', 1, 1))
+        self.assertIsNone(g.get_node(2, 0))
+        self.assertEqual(g.dragon, Node('D', 1, 0))
+        self.assertEqual(g.princesses, {Node('P', 0, 1)})
+
+    def test_neighbours_same_as_terrain_graph(self):
+        terrain = [
+            "CNHC",
+            "CHNC",
+            "DNNH",
+        ]
+        g = TerrainGraph(terrain)
+        c = CompactTerrainGraph(terrain)
+        for node in g.nodes.values():
+            self.assertEqual(g.get_neighbours(node), c.get_neighbours(c.get_node(node.x, node.y)))
+
+    def test_different_line_widths(self):
+        self.assertRaises(ValueError, CompactTerrainGraph, ["CC", "C"])
+        self.assertRaises(ValueError, CompactTerrainGraph, [])
+
+    def test_from_file(self):
+        terrain = [
+            "CNH0P",
+            "G1NNC",
+            "DCP10",
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            file = os.path.join(directory, 'map.txt')
+            with open(file, 'w') as f:
+                f.write('\r\n'.join(terrain) + '\n\n')
+            expected = CompactTerrainGraph(terrain)
+            for chunk_size in (1, 5, 1 << 20):     # rows split over chunks
+                g = CompactTerrainGraph.from_file(file, chunk_size)
+                self.assertEqual((g.width, g.height), (5, 3))
+                self.assertEqual(g.tiles, expected.tiles)
+                self.assertEqual(g.dragon, expected.dragon)
+                self.assertEqual(g.princesses, expected.princesses)
+                self.assertEqual(g.generators, expected.generators)
+                self.assertEqual(g.teleports, expected.teleports)
+
+            with open(file, 'w') as f:
+                f.write('CP\nPC')         # no dragon, no new line at end
+            g = CompactTerrainGraph.from_file(file, 1)
+            self.assertIsNone(g.dragon)
+            self.assertEqual(g.princesses, CompactTerrainGraph(["CP", "PC"]).princesses)
+
+            for text in ("CC\nC\n", "CC\n\nCC\n", "\n"):
+                with open(file, 'w') as f:
+                    f.write(text)
+                self.assertRaises(ValueError, CompactTerrainGraph.from_file, file)
+
+    def test_shortest_path_all(self):
+        terrain = [
+            "CNHC",
+            "CHNC",
+            "DNNH",
+            "CPCC"
+        ]
+        g = CompactTerrainGraph(terrain)
+        paths = shortest_path_all(g.get_node(0, 0), {g.get_node(1, 3), g.get_node(3, 0)}, g)
+        self.assertEqual(paths[g.get_node(1, 3)][1], 4)
+        self.assertEqual(paths[g.get_node(3, 0)][1], 10)
+        for trace, distance, _ in paths.values():
+            self.assertEqual(get_trace_distance(g, trace), distance)
+
+    def test_unreachable(self):
+        g = CompactTerrainGraph(["CN", "NC"])
+        paths = shortest_path_all(g.get_node(0, 0), {g.get_node(1, 1)}, g)
+        self.assertEqual(paths, {Node('C', 1, 1): ([], sys.maxsize, False)})
+
+    def test_save_princess(self):
+        terrain = [
+            "CHCP",
+            "CNPN",
+            "DNHP"
+        ]
+        path = save_princess(terrain, 10, compact=True)
+        self.assertEqual(get_trace_distance(CompactTerrainGraph(terrain), path),
+                         get_trace_distance(TerrainGraph(terrain), save_princess(terrain, 10)))
+
+
+if __name__ == '__main__':
+    unittest.main()
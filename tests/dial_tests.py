@@ -0,0 +1,41 @@
+import unittest
+
+from main import TerrainGraph, CompactTerrainGraph, dial, dijkstra, shortest_path_all, save_princess, \
+    get_trace_distance
+
+
+class DialTests(unittest.TestCase):
+    terrain = [
+        "CNHC0H",
+        "CHNCGC",
+        "DN1HCC",
+        "CP0CC1",
+        "HHHNCP",
+    ]
+
+    def test_same_distances_as_dijkstra(self):
+        for graph_class in (TerrainGraph, CompactTerrainGraph):
+            g = graph_class(self.terrain)
+            for teleports_activated in (False, True):
+                everything = {g.vertex(g.get_node(x, y)) for x in range(6) for y in range(5)}
+                expected, _ = dijkstra(g, g.vertex(g.get_node(0, 0)), everything, teleports_activated)
+                distances, predecessors = dial(g, g.vertex(g.get_node(0, 0)), everything, teleports_activated)
+                self.assertEqual(expected, distances)
+
+    def test_zero_cost_teleports(self):
+        g = CompactTerrainGraph(["G0N0C1NNN1P"])
+        paths = shortest_path_all(g.get_node(0, 0), {g.get_node(10, 0)}, g, search='dial')
+        trace, distance, teleport_activated = paths[g.get_node(10, 0)]
+        self.assertEqual((distance, teleport_activated), (4, True))
+        self.assertEqual(get_trace_distance(g, trace), 4)
+
+    def test_save_princess(self):
+        for compact in (False, True):
+            expected = save_princess(self.terrain, 10, compact=compact)
+            path = save_princess(self.terrain, 10, compact=compact, search='dial')
+            g = TerrainGraph(self.terrain)
+            self.assertEqual(get_trace_distance(g, expected), get_trace_distance(g, path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+
+from distance_field import np, TerrainGrid
+from main import TerrainGraph, CompactTerrainGraph, dijkstra, best_state, shortest_path_all, shortest_path_any, \
+    save_princess, get_trace_distance, key_point_matrix
+
+
+@unittest.skipIf(np is None, 'numpy is not installed')
+class DistanceFieldTests(unittest.TestCase):
+    def test_same_distances_as_dijkstra(self):
+        terrain = [
+            "CNHC0H",
+            "CHNCGC",
+            "DN1HCC",
+            "CP0CC1",
+            "HHHNCP",
+        ]
+        for graph_class in (TerrainGraph, CompactTerrainGraph):
+            g = graph_class(terrain)
+            grid = TerrainGrid(g)
+            for teleports_activated in (False, True):
+                everything = {g.vertex(g.get_node(x, y)) for x in range(6) for y in range(5)}
+                expected, _ = dijkstra(g, g.vertex(g.get_node(0, 0)), everything, teleports_activated)
+                distances, _ = grid.distance_field((0, 0), teleports_activated)
+                for x in range(6):
+                    for y in range(5):
+                        state, distance = best_state(expected, g.vertex(g.get_node(x, y)))
+                        self.assertEqual(distance, distances[:, y, x].min())
+
+    def test_grid_is_built_once(self):
+        terrain = [
+            "CCHP",
+            "DNCC",
+            "CCNP",
+        ]
+        for graph_class in (TerrainGraph, CompactTerrainGraph):
+            g = graph_class(terrain)
+            key_point_matrix(g, g.dragon, search='numpy')
+            grid = g.grid
+            self.assertIsNotNone(grid)
+            key_point_matrix(g, g.dragon, search='numpy')
+            self.assertIs(g.grid, grid)
+            g.set_tile(1, 1, 'C')
+            self.assertIsNone(g.grid)
+            trace, _ = shortest_path_any(g.get_node(0, 0), {g.get_node(3, 2)}, g, search='numpy')
+            self.assertEqual(trace.cost, 5)     # through new tile
+
+    def test_path_through_generator(self):
+        g = CompactTerrainGraph(["C0HHC", "GNNNC", "CCCC0"])
+        grid = TerrainGrid(g)
+        distances, directions = grid.distance_field((0, 0))
+        self.assertEqual(distances[1, 0, 4], 5)
+        self.assertEqual(grid.path(distances, directions, (4, 0)),
+                         [(0, 0, 0), (0, 1, 1), (0, 0, 1), (1, 0, 1), (4, 2, 1), (4, 1, 1), (4, 0, 1)])
+        self.assertEqual(grid.path(distances, directions, (1, 0), 0), [(0, 0, 0), (1, 0, 0)])
+
+    def test_unreachable(self):
+        g = TerrainGraph(["CN", "NC"])
+        grid = TerrainGrid(g)
+        distances, directions = grid.distance_field((0, 0))
+        self.assertEqual(grid.path(distances, directions, (1, 1)), [])
+
+    def test_save_princess(self):
+        terrain = [
+            "CCGCP",
+            "0NNNC",
+            "CNDN0",
+            "CCCCP",
+            "NNNNN",
+            "PCCCC",
+        ]
+        for compact in (False, True):
+            self.assertEqual(save_princess(terrain, 10, compact=compact, search='numpy'), [])   # walled off
+            terrain[4] = "NNNNC"
+            expected = save_princess(terrain, 20, compact=compact)
+            path = save_princess(terrain, 20, compact=compact, search='numpy')
+            g = TerrainGraph(terrain)
+            self.assertTrue(path)
+            self.assertEqual(get_trace_distance(g, expected), get_trace_distance(g, list(path)))
+            terrain[4] = "NNNNN"
+
+    def test_shortest_path_all(self):
+        g = TerrainGraph(["GCCC", "0CCC", "CCCC", "CCD0"])
+        paths = shortest_path_all(g.get_node(0, 0), {g.get_node(2, 3)}, g, search='numpy')
+        trace, distance, teleport_activated = paths[g.get_node(2, 3)]
+        self.assertEqual((distance, teleport_activated), (2, True))
+        self.assertEqual(get_trace_distance(g, trace), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+
+import sys
+import warnings
+
+from main import CompactTerrainGraph, Node, key_point_matrix, held_karp_tour, save_princess, get_trace_distance, \
+    MAX_HELD_KARP_PRINCESSES
+
+
+class HeldKarpTests(unittest.TestCase):
+    def test_key_point_matrix(self):
+        terrain = [
+            "DCGP",
+            "NNNC",
+            "P1N1"
+        ]
+        g = CompactTerrainGraph(terrain)
+        matrix = key_point_matrix(g, g.dragon)
+        self.assertEqual(set(matrix.keys()), {(g.dragon, False), (g.get_node(3, 0), False), (g.get_node(0, 2), False),
+                                              (g.dragon, True), (g.get_node(3, 0), True), (g.get_node(0, 2), True),
+                                              (g.get_node(2, 0), True)})
+        trace, distance, teleport_activated = matrix[(g.dragon, False)][g.get_node(3, 0)]
+        self.assertEqual((distance, teleport_activated), (3, True))     # walking over 'G'
+        self.assertEqual(trace, [g.dragon, Node('C', 1, 0), Node('G', 2, 0), Node('P', 3, 0)])
+        # princess in corner is reachable only by teleport
+        self.assertNotIn(g.get_node(0, 2), matrix[(g.dragon, False)])
+        self.assertEqual(matrix[(g.get_node(2, 0), True)][g.get_node(0, 2)][1], 4)
+
+    def test_tour_uses_generator(self):
+        terrain = [
+            "DCGP",
+            "NNNC",
+            "P1N1"
+        ]
+        g = CompactTerrainGraph(terrain)
+        trace, distance, teleport_activated = held_karp_tour(g.dragon, g.princesses, key_point_matrix(g, g.dragon))
+        self.assertEqual((distance, teleport_activated), (6, True))
+        self.assertEqual(trace, [g.dragon, Node('C', 1, 0), Node('G', 2, 0), Node('P', 3, 0), Node('C', 3, 1),
+                                 Node('1', 3, 2), Node('1', 1, 2), Node('P', 0, 2)])
+
+    def test_unreachable_princess(self):
+        g = CompactTerrainGraph(["DCN", "CNP"])
+        self.assertEqual(held_karp_tour(g.dragon, g.princesses, key_point_matrix(g, g.dragon)),
+                         ([], sys.maxsize, False))
+        self.assertEqual(save_princess(["CDNP"], 10), [])
+
+    def test_same_as_permutations(self):
+        terrain = [
+            "CHCPC",
+            "CNPNH",
+            "DNHPC",
+            "CHCCP"
+        ]
+        for compact in (False, True):
+            held_karp = save_princess(terrain, 10, compact=compact)
+            permutations = save_princess(terrain, 10, compact=compact, tour='permutations')
+            self.assertEqual(held_karp, permutations)
+
+    def test_too_many_princesses(self):
+        terrain = ["CD" + "P" * (MAX_HELD_KARP_PRINCESSES + 1), "C" * (MAX_HELD_KARP_PRINCESSES + 3)]
+        g = CompactTerrainGraph(terrain)
+        self.assertRaises(ValueError, held_karp_tour, g.dragon, g.princesses, {})
+        with self.assertWarns(RuntimeWarning):
+            path = save_princess(g, 10, budget=0.1)
+        self.assertEqual(get_trace_distance(g, path), MAX_HELD_KARP_PRINCESSES + 2)
+        self.assertEqual(path[-1], g.get_node(MAX_HELD_KARP_PRINCESSES + 2, 0))
+
+    def test_many_princesses_are_exact(self):
+        g = CompactTerrainGraph(["CD" + "P" * MAX_HELD_KARP_PRINCESSES, "C" * (MAX_HELD_KARP_PRINCESSES + 2)])
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')      # anytime tour is not used
+            path = save_princess(g, 10)
+        self.assertEqual(get_trace_distance(g, path), MAX_HELD_KARP_PRINCESSES + 1)
+
+    def test_unknown_tour(self):
+        self.assertRaises(ValueError, save_princess, ["CDP"], 10, tour='greedy')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+
+from hierarchy import ClusterHierarchy
+from main import TerrainGraph, CompactTerrainGraph, dijkstra, find_paths, best_state, save_princess, \
+    get_trace_distance, get_predecesors_trace
+from search_stats import SearchStats
+
+
+class HierarchyTests(unittest.TestCase):
+    def test_exact_mode_same_distances_as_dijkstra(self):
+        maps = [
+            ["CHCG0H", "CNHNCC", "DCCHPN", "0HNCCH"],
+            ["CCG1C", "NNNNN", "1HCNP", "CCCNC"],       # right part only behind teleport, corner walled off
+            ["CCCHCC", "C", "CHCCPC", "CCC"],           # ragged rows, TerrainGraph only
+        ]
+        for terrain in maps:
+            graph_classes = (TerrainGraph, CompactTerrainGraph) if len(set(map(len, terrain))) == 1 else \
+                (TerrainGraph,)
+            for graph_class in graph_classes:
+                g = graph_class(terrain)
+                vertices = [g.vertex(g.get_node(x, y)) for y, line in enumerate(terrain) for x in range(len(line))]
+                for cluster_size in (1, 3, 4):
+                    g.hierarchy = ClusterHierarchy(g, cluster_size, spacing=1)
+                    for teleports_activated in (False, True):
+                        for target in vertices:
+                            expected, _ = dijkstra(g, vertices[0], {target}, teleports_activated)
+                            distances, predecessors = find_paths(g, vertices[0], {target}, teleports_activated,
+                                                                 search='hpa')
+                            state, distance = best_state(distances, target)
+                            self.assertEqual(best_state(expected, target)[1], distance)
+                            if target != vertices[0] and state in predecessors:
+                                self.assertEqual(get_predecesors_trace(predecessors, state)[0][0], vertices[0])
+
+    def test_save_princess(self):
+        terrain = [
+            "CNP0C",
+            "CNNNC",
+            "DGC0C",
+            "PNNNP",
+        ]
+        for graph_class in (TerrainGraph, CompactTerrainGraph):
+            g = graph_class(terrain)
+            g.hierarchy = ClusterHierarchy(g, 3, spacing=1)
+            for tour in ('held_karp', 'permutations'):
+                path = save_princess(g, 10, tour=tour, search='hpa')
+                self.assertTrue(path)
+                self.assertEqual(get_trace_distance(g, path), get_trace_distance(g, save_princess(g, 10, tour=tour)))
+
+    def test_bound_of_approximate_mode(self):
+        # single border between two clusters, its only entrance is in middle of it
+        g = CompactTerrainGraph(["C" * 16 for _ in range(8)])
+        g.hierarchy = ClusterHierarchy(g, 8)
+        source, target = g.vertex(g.get_node(0, 0)), g.vertex(g.get_node(15, 0))
+        distances, _ = find_paths(g, source, {target}, search='hpa')
+        _, distance = best_state(distances, target)
+        self.assertEqual(distance, 15 + 2 * 4)
+        self.assertLessEqual(distance, 15 + (2 * (8 // 2) + 1) * 2)
+
+    def test_impassable_target_behind_border(self):
+        g = TerrainGraph(["CCCN"])
+        g.hierarchy = ClusterHierarchy(g, 3)
+        target = g.get_node(3, 0)
+        distances, _ = find_paths(g, g.get_node(0, 0), {target}, search='hpa')
+        self.assertEqual(best_state(distances, target)[1], 3)
+
+    def test_refines_only_path(self):
+        g = CompactTerrainGraph(["C" * 40 for _ in range(40)])
+        g.hierarchy = ClusterHierarchy(g, 8)
+        g.hierarchy.build()
+        source, target = g.vertex(g.get_node(2, 2)), g.vertex(g.get_node(37, 37))
+        expanded = {}
+        for search in ('dijkstra', 'hpa'):
+            stats = SearchStats()
+            find_paths(g, source, {target}, search=search, stats=stats)
+            expanded[search] = stats.counters['expanded']
+        self.assertLess(expanded['hpa'], expanded['dijkstra'] / 10)
+
+    def test_hierarchy_is_built_when_missing(self):
+        terrain = [
+            "CCNP",
+            "CNDC",
+            "CCCC",
+        ]
+        g = TerrainGraph(terrain)
+        distances, _ = find_paths(g, g.get_node(0, 0), {g.dragon}, search='hpa')
+        self.assertIsInstance(g.hierarchy, ClusterHierarchy)
+        self.assertEqual(best_state(distances, g.dragon)[1], 5)
+        self.assertEqual(get_trace_distance(g, save_princess(terrain, 10, search='hpa')), 7)
+        g.set_tile(1, 1, 'C')
+        self.assertIsNone(g.hierarchy)
+        self.assertRaises(ValueError, ClusterHierarchy, g, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
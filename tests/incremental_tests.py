@@ -0,0 +1,136 @@
+import random
+import unittest
+
+from incremental import IncrementalPlanner
+from main import TerrainGraph, CompactTerrainGraph, dijkstra, find_paths, best_state, save_princess, \
+    get_trace_distance, get_predecesors_trace
+from search_stats import SearchStats
+
+
+class IncrementalTests(unittest.TestCase):
+    def assert_same_as_dijkstra(self, g, source, teleports_activated):
+        nodes = (g.get_node(x, y) for y in range(g.height) for x in range(g.width))
+        vertices = [g.vertex(node) for node in nodes if node is not None]     # short rows have missing tiles
+        expected, _ = dijkstra(g, source, set(vertices), teleports_activated)
+        distances, predecessors = find_paths(g, source, set(vertices), teleports_activated, search='lpa')
+        for target in vertices:
+            state, distance = best_state(distances, target)
+            self.assertEqual(best_state(expected, target)[1], distance)
+            if state in predecessors:
+                self.assertEqual(get_predecesors_trace(predecessors, state)[0][0], source)
+
+    def test_same_distances_as_dijkstra_after_edits(self):
+        terrain = [
+            "CHC0N",
+            "NNGNC",
+            "DCHCP",
+            "CN1HC",
+        ]
+        symbols = 'CCHHNN0123G'
+        for graph_class in (TerrainGraph, CompactTerrainGraph):
+            rnd = random.Random(7)
+            g = graph_class(terrain)
+            source = g.vertex(g.get_node(0, 0))
+            for _ in range(60):
+                x, y = rnd.randrange(1, 5), rnd.randrange(4)
+                if g.get_node(x, y).value not in 'DP':
+                    g.set_tile(x, y, rnd.choice(symbols))
+                for teleports_activated in (False, True):
+                    self.assert_same_as_dijkstra(g, source, teleports_activated)
+
+    def test_wall_closed_and_opened(self):
+        g = CompactTerrainGraph(["CCNP", "CCCC"])
+        source, target = g.vertex(g.get_node(0, 0)), g.vertex(g.get_node(3, 0))
+        self.assertEqual(best_state(find_paths(g, source, {target}, search='lpa')[0], target)[1], 5)
+        g.set_tile(2, 1, 'N')
+        self.assertEqual(find_paths(g, source, {target}, search='lpa')[0].get((target, False)), None)
+        g.set_tile(2, 0, 'H')
+        self.assertEqual(best_state(find_paths(g, source, {target}, search='lpa')[0], target)[1], 4)
+
+    def test_ragged_rows(self):
+        g = TerrainGraph(["CCCC", "C", "CHCP"])
+        source = g.vertex(g.get_node(0, 0))
+        self.assertRaises(ValueError, g.set_tile, 2, 1, 'C')     # tile missing in short row
+        for teleports_activated in (False, True):
+            self.assert_same_as_dijkstra(g, source, teleports_activated)
+        g.set_tile(1, 2, 'C')
+        self.assert_same_as_dijkstra(g, source, False)
+
+    def test_set_tile_updates_graph(self):
+        terrain = [
+            "CNH0",
+            "CGNC",
+            "DP0P",
+        ]
+        for graph_class in (TerrainGraph, CompactTerrainGraph):
+            g = graph_class(terrain)
+            self.assertEqual(g.set_tile(0, 0, 'C'), [])
+            g.set_tile(1, 1, 'C')
+            self.assertEqual(g.generators, set())
+            g.set_tile(0, 2, 'P')
+            self.assertIsNone(g.dragon)
+            self.assertIn(g.get_node(0, 2), g.princesses)
+            g.set_tile(3, 0, 'D')
+            self.assertEqual(g.dragon, g.get_node(3, 0))
+            self.assertRaises(ValueError, g.set_tile, 0, 0, 'D')
+            self.assertRaises(ValueError, g.set_tile, 4, 0, 'C')
+            self.assertRaises(ValueError, g.set_tile, 0, 0, 'X')
+
+            # graph after edits behaves same as graph built from edited map
+            rebuilt = graph_class(["CNHD",
+                                   "CCNC",
+                                   "PP0P"])
+            self.assertEqual(g.princesses, rebuilt.princesses)
+            self.assertEqual(len(g.teleports), 1)
+            for x in range(4):
+                for y in range(3):
+                    self.assertEqual(g.get_neighbours(g.get_node(x, y), True),
+                                     rebuilt.get_neighbours(rebuilt.get_node(x, y), True))
+
+    def test_emptied_teleport_group(self):
+        g = CompactTerrainGraph(["C1CCC1"])
+        source = g.vertex(g.get_node(0, 0))
+        target = g.vertex(g.get_node(5, 0))
+        self.assertEqual(best_state(find_paths(g, source, {target}, True, search='lpa')[0], target)[1], 1)
+        g.set_tile(5, 0, 'C')
+        self.assertEqual(best_state(find_paths(g, source, {target}, True, search='lpa')[0], target)[1], 5)
+        g.set_tile(1, 0, 'C')
+        g.set_tile(4, 0, '1')
+        self.assertEqual(best_state(find_paths(g, source, {target}, True, search='lpa')[0], target)[1], 5)
+
+    def test_repair_expands_less_than_new_search(self):
+        g = CompactTerrainGraph(["C" * 60 for _ in range(60)])
+        source, target = g.vertex(g.get_node(0, 0)), g.vertex(g.get_node(59, 59))
+        planner = IncrementalPlanner(g, source)
+        g.planners[(source, False, True)] = planner
+        planner.search({target})
+        g.set_tile(50, 55, 'N')
+        stats = SearchStats()
+        distances, _ = find_paths(g, source, {target}, search='lpa', stats=stats)
+        self.assertEqual(best_state(distances, target)[1], 118)
+        self.assertLess(stats.counters['expanded'], 60 * 60 / 10)
+
+    def test_save_princess(self):
+        terrain = [
+            "CNP0",
+            "CNNN",
+            "DGC0",
+            "PNNN",
+        ]
+        for graph_class in (TerrainGraph, CompactTerrainGraph):
+            g = graph_class(terrain)
+            for tour in ('held_karp', 'permutations'):
+                path = save_princess(g, 10, tour=tour, search='lpa')
+                self.assertTrue(path)
+                self.assertEqual(get_trace_distance(g, path), get_trace_distance(g, save_princess(g, 10, tour=tour)))
+            g.set_tile(1, 2, 'C')       # generator removed, princess behind teleport cannot be saved
+            self.assertEqual(save_princess(g, 10, search='lpa'), [])
+            g.set_tile(1, 1, 'C')
+            path = save_princess(g, 10, search='lpa')
+            self.assertEqual(get_trace_distance(g, path), get_trace_distance(g, save_princess(g, 10)))
+            g.set_tile(0, 2, 'C')       # dragon removed
+            self.assertEqual(save_princess(g, 10, search='lpa'), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
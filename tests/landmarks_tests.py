@@ -0,0 +1,115 @@
+import os
+import tempfile
+import unittest
+
+from landmarks import LandmarkIndex
+from main import TerrainGraph, CompactTerrainGraph, dijkstra, find_paths, best_state, save_princess, \
+    get_trace_distance
+from search_stats import SearchStats
+
+
+class LandmarksTests(unittest.TestCase):
+    def test_bounds_are_lower_than_distances(self):
+        terrain = [
+            "CNH0N",
+            "GHNCC",
+            "DN0HN",
+            "NNNNP",
+        ]
+        for graph_class in (TerrainGraph, CompactTerrainGraph):
+            g = graph_class(terrain)
+            index = LandmarkIndex.build(g, 3)
+            self.assertEqual(len(index.landmarks), 3)
+            vertices = [g.vertex(g.get_node(x, y)) for x in range(5) for y in range(4)]
+            for teleports_activated in (False, True):
+                for target in vertices:
+                    heuristic = index.heuristic({target}, teleports_activated)
+                    for source in vertices:
+                        distances, _ = dijkstra(g, source, {target}, teleports_activated)
+                        _, distance = best_state(distances, target)
+                        layer = teleports_activated or g.symbol(source) == 'G'
+                        self.assertLessEqual(heuristic((source, layer)), distance)
+
+    def test_same_distances_as_dijkstra(self):
+        maps = [
+            ["CCG1", "NNNN", "1HCP"],           # princess only behind teleport
+            ["CHCN", "HNCC", "CNNP"],           # walled off corner
+            ["CCCH", "C", "CHCCP"],             # ragged rows, TerrainGraph only
+        ]
+        for terrain in maps:
+            graph_classes = (TerrainGraph, CompactTerrainGraph) if len(set(map(len, terrain))) == 1 else \
+                (TerrainGraph,)
+            for graph_class in graph_classes:
+                g = graph_class(terrain)
+                g.landmarks = LandmarkIndex.build(g, 2)
+                vertices = [g.vertex(g.get_node(x, y)) for y, line in enumerate(terrain) for x in range(len(line))]
+                for teleports_activated in (False, True):
+                    for target in vertices:
+                        expected, _ = dijkstra(g, vertices[0], {target}, teleports_activated)
+                        distances, _ = find_paths(g, vertices[0], {target}, teleports_activated, search='alt')
+                        self.assertEqual(best_state(expected, target)[1], best_state(distances, target)[1])
+
+    def test_save_princess(self):
+        terrain = [
+            "CNP0",
+            "CNNN",
+            "DGC0",
+            "PNNN",
+        ]
+        g = CompactTerrainGraph(terrain)
+        g.landmarks = LandmarkIndex.build(g, 2)
+        path = save_princess(g, 10, search='alt')
+        self.assertTrue(path)
+        self.assertEqual(get_trace_distance(g, path), get_trace_distance(g, save_princess(g, 10)))
+
+    def test_expands_less(self):
+        g = CompactTerrainGraph(["C" * 30 for _ in range(10)] + ["N" * 25 + "C" * 5] + ["C" * 30 for _ in range(19)])
+        g.landmarks = LandmarkIndex.build(g, 4)
+        source, target = g.vertex(g.get_node(5, 5)), g.vertex(g.get_node(25, 20))
+        expanded = {}
+        for search in ('dijkstra', 'alt'):
+            stats = SearchStats()
+            find_paths(g, source, {target}, search=search, stats=stats)
+            expanded[search] = stats.counters['expanded']
+        self.assertLess(expanded['alt'], expanded['dijkstra'] / 2)
+
+    def test_index_is_built_when_missing(self):
+        terrain = [
+            "CCNP",
+            "CNDC",
+            "CCCC",
+        ]
+        g = CompactTerrainGraph(terrain)
+        distances, _ = find_paths(g, g.vertex(g.get_node(0, 0)), {g.vertex(g.dragon)}, search='alt')
+        self.assertIsInstance(g.landmarks, LandmarkIndex)
+        self.assertEqual(best_state(distances, g.vertex(g.dragon))[1], 5)
+        self.assertEqual(get_trace_distance(g, save_princess(terrain, 10, search='alt')), 7)
+        g.set_tile(1, 1, 'C')
+        self.assertIsNone(g.landmarks)
+
+    def test_save_and_load(self):
+        terrain = [
+            "CNH0",
+            "GCNC",
+            "DN0P",
+        ]
+        g = CompactTerrainGraph(terrain)
+        index = LandmarkIndex.build(g, 3)
+        with tempfile.TemporaryDirectory() as directory:
+            file = os.path.join(directory, 'map.txt.alt')
+            index.save(file)
+            loaded = LandmarkIndex.load(file, TerrainGraph(terrain))   # same map, other graph class
+            self.assertEqual(list(loaded.landmarks), list(index.landmarks))
+            self.assertEqual([list(a) for pair in loaded.tables[True] for a in pair],
+                             [list(a) for pair in index.tables[True] for a in pair])
+            self.assertRaises(ValueError, LandmarkIndex.load, file, TerrainGraph(["CCD"]))
+
+            map_file = os.path.join(directory, 'other.txt')
+            other = TerrainGraph(["CCD", "PCC"])
+            LandmarkIndex.for_map(map_file, other, 2)
+            self.assertTrue(os.path.exists(map_file + '.alt'))
+            self.assertEqual(len(LandmarkIndex.for_map(map_file, other, 5).landmarks), 2)    # loaded, not built
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+
+from distance_field import np
+from hierarchy import ClusterHierarchy
+from landmarks import LandmarkIndex
+from main import CompactTerrainGraph, SEARCHES, find_paths, shortest_path_any, save_princess
+from search_stats import SearchStats
+
+
+class MaxDistanceTests(unittest.TestCase):
+    # dragon is 8 turns from start, rest of map is big and open
+    terrain = ["C" * 60 for _ in range(60)]
+    terrain[0] = "CCCCCCCCD" + "C" * 50 + "P"
+
+    searches = [search for search in SEARCHES if search != 'numpy' or np is not None]
+
+    def graph(self, search):
+        g = CompactTerrainGraph(self.terrain)
+        if search == 'alt':
+            g.landmarks = LandmarkIndex.build(g, 2)
+        if search == 'hpa':
+            g.hierarchy = ClusterHierarchy(g, 8, 1)
+        return g
+
+    def test_boundary(self):
+        for search in self.searches:
+            g = self.graph(search)
+            path, _ = shortest_path_any(g.get_node(0, 0), {g.dragon}, g, search=search, max_distance=8)
+            self.assertEqual(len(path), 9)
+            path, _ = shortest_path_any(g.get_node(0, 0), {g.dragon}, g, search=search, max_distance=7)
+            self.assertEqual(path, [])
+
+    def test_states_over_budget_are_not_returned(self):
+        for search in self.searches:
+            g = self.graph(search)
+            distances, _ = find_paths(g, g.vertex(g.get_node(0, 0)), {g.vertex(g.get_node(59, 59))}, search=search,
+                                      max_distance=5)
+            self.assertTrue(distances)
+            self.assertLessEqual(max(distances.values()), 5)
+
+    def test_save_princess_inside_turn_limit(self):
+        path = save_princess(self.terrain, 9, compact=True)
+        self.assertEqual(len(path), 60)
+        self.assertEqual(path, save_princess(self.terrain, 1000, compact=True))
+
+    def test_no_hope_fails_fast(self):
+        stats = SearchStats()
+        self.assertEqual(save_princess(self.terrain, 8, compact=True, stats=stats), [])
+        # only tiles at most 7 turns from start are expanded
+        self.assertEqual(stats.counters['expanded'], 36)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+
+from main import TerrainGraph, CompactTerrainGraph, key_point_matrix, save_princess, get_trace_distance
+from parallel_matrix import parallel_key_point_matrix, shared_pool, shutdown_pool
+from search_stats import SearchStats
+
+
+class ParallelMatrixTests(unittest.TestCase):
+    def test_same_as_key_point_matrix(self):
+        terrain = [
+            "CCHP0",
+            "GNNNC",
+            "DCHC0",
+            "NNNNP",
+        ]
+        for graph_class in (TerrainGraph, CompactTerrainGraph):
+            g = graph_class(terrain)
+            for teleports_activated in (False, True):
+                expected = key_point_matrix(g, g.dragon, teleports_activated)
+                stats = SearchStats()
+                matrix = parallel_key_point_matrix(g, g.dragon, teleports_activated, stats=stats, workers=2)
+                if graph_class is CompactTerrainGraph:
+                    self.assertEqual(matrix, expected)
+                else:   # workers search compact graph, its paths of same length can differ
+                    self.assertEqual({key: {destination: leg[1:] for destination, leg in row.items()}
+                                      for key, row in matrix.items()},
+                                     {key: {destination: leg[1:] for destination, leg in row.items()}
+                                      for key, row in expected.items()})
+                self.assertEqual(stats.counters['searches'], len(expected))
+
+    def test_ragged_rows(self):
+        terrain = [
+            "CCCD",
+            "CN",
+            "CCCP",
+        ]
+        g = TerrainGraph(terrain)
+        path = save_princess(g, 100, workers=2)
+        self.assertEqual(get_trace_distance(g, path), get_trace_distance(g, save_princess(g, 100)))
+
+    def test_unreachable_princess(self):
+        terrain = [
+            "CDNP",
+            "PCNN",
+        ]
+        g = CompactTerrainGraph(terrain)
+        matrix = parallel_key_point_matrix(g, g.dragon, workers=2)
+        self.assertEqual(set(matrix[(g.dragon, False)]), {g.get_node(0, 1)})
+        self.assertEqual(save_princess(g, 10, workers=2), [])
+
+    def test_pool_is_reused(self):
+        maps = [
+            ["CDCP",
+             "PNNC"],
+            ["CCGD",
+             "0NP0"],           # other map in same workers, princess only behind teleports
+            ["CP",
+             "ND"],
+        ]
+        pool = shared_pool(1)
+        with ProcessPoolExecutor(1) as executor:
+            for terrain in maps + maps:
+                g = CompactTerrainGraph(terrain)
+                expected = key_point_matrix(g, g.dragon)
+                self.assertEqual(parallel_key_point_matrix(g, g.dragon, workers=1), expected)
+                self.assertEqual(parallel_key_point_matrix(g, g.dragon, executor=executor), expected)
+        self.assertIs(shared_pool(1), pool)
+        self.assertIsNot(shared_pool(2), pool)
+        shutdown_pool()
+
+    def test_unsupported_search(self):
+        g = CompactTerrainGraph(["CDCP"])
+        self.assertRaises(ValueError, parallel_key_point_matrix, g, g.dragon, search='alt')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import io
+import unittest
+
+from distance_field import np
+from hierarchy import ClusterHierarchy
+from landmarks import LandmarkIndex
+from main import TerrainGraph, CompactTerrainGraph, SEARCHES, shortest_path_any, save_princess, get_trace_distance
+from paths import Path, format_path, write_path
+
+
+class PathsTests(unittest.TestCase):
+    def test_cost_is_distance_of_trace(self):
+        terrain = [
+            "CHC0N",
+            "NCGNN",
+            "DCHNP",
+            "CN1N0",
+        ]
+        for graph_class in (TerrainGraph, CompactTerrainGraph):
+            g = graph_class(terrain)
+            g.landmarks = LandmarkIndex.build(g, 2)
+            g.hierarchy = ClusterHierarchy(g, 3)
+            start = g.get_node(0, 0)
+            for search in SEARCHES:
+                if search == 'numpy' and np is None:
+                    continue
+                # (4, 2) is behind walls, reached only through teleports when they are activated
+                for target, teleports_activated in ((g.get_node(2, 1), False), (g.get_node(2, 1), True),
+                                                    (g.get_node(0, 3), False), (g.get_node(4, 2), True)):
+                    path, _ = shortest_path_any(start, {target}, g, teleports_activated, search)
+                    self.assertEqual(path.cost, get_trace_distance(g, list(path), teleports_activated))
+                    self.assertEqual(path[0], start)
+                    self.assertEqual(path[-1], target)
+
+    def test_then(self):
+        g = CompactTerrainGraph(["CC", "CC", "CC", "CC"])
+        first = Path.from_nodes(g, [g.get_node(0, 0), g.get_node(0, 1), g.get_node(0, 2)], 3)
+        second = Path.from_nodes(g, [g.get_node(0, 2), g.get_node(0, 3)], 1)
+        third = Path.from_nodes(g, [g.get_node(0, 3), g.get_node(1, 3)])
+        joined = first.then(second)
+        self.assertEqual(len(joined), 4)
+        self.assertEqual(joined.cost, 4)
+        self.assertEqual(joined, [g.get_node(0, y) for y in range(4)])
+        self.assertEqual(joined[2], g.get_node(0, 2))
+        self.assertEqual(joined[-1], g.get_node(0, 3))
+        self.assertEqual(joined[1:3], [g.get_node(0, 1), g.get_node(0, 2)])
+        self.assertEqual(len(first), 3)     # joined paths are not changed
+
+        whole = joined.then(third)
+        self.assertIsNone(whole.cost)
+        self.assertEqual(list(whole.coords()), [(0, 0), (0, 1), (0, 2), (0, 3), (1, 3)])
+        self.assertEqual(whole.indexes().tolist(), [0, 2, 4, 6, 7])
+        self.assertEqual(whole, Path.from_nodes(g, list(whole)))
+        self.assertIs(Path(g).then(whole), whole)
+        self.assertEqual(Path(g), [])
+        self.assertEqual(get_trace_distance(g, Path(g)), get_trace_distance(g, []))
+
+    def test_then_shares_segments(self):
+        g = CompactTerrainGraph(["CCCC", "CCCC"])
+        right = Path.from_nodes(g, [g.get_node(0, 0), g.get_node(1, 0)], 1)
+        down = Path.from_nodes(g, [g.get_node(1, 0), g.get_node(1, 1)], 1)
+        further = Path.from_nodes(g, [g.get_node(1, 0), g.get_node(2, 0), g.get_node(3, 0)], 2)
+        legs = [right] + [Path.from_nodes(g, [g.get_node(x, 0), g.get_node(x + 1, 0)], 1) for x in range(1, 3)]
+
+        tour = right.then(down)
+        self.assertIs(tour.segments, right.segments)        # list of right is continued, not copied
+        branch = right.then(further)                        # right was already continued, new list
+        self.assertIsNot(branch.segments, tour.segments)
+        self.assertEqual(list(tour.coords()), [(0, 0), (1, 0), (1, 1)])
+        self.assertEqual(list(branch.coords()), [(0, 0), (1, 0), (2, 0), (3, 0)])
+        self.assertEqual(list(right.coords()), [(0, 0), (1, 0)])
+        self.assertEqual(len(right), 2)
+
+        joined = legs[0]
+        for leg in legs[1:]:
+            joined = joined.then(leg)
+        self.assertEqual((joined, joined.cost), (branch, 3))
+
+    def test_save_princess(self):
+        terrain = [
+            "CCGCP",
+            "0NNNC",
+            "CNDN0",
+            "CCCCP",
+        ]
+        for compact in (False, True):
+            g = CompactTerrainGraph(terrain) if compact else TerrainGraph(terrain)
+            for tour in ('held_karp', 'permutations', 'anytime'):
+                path = save_princess(g, 10, tour=tour)
+                self.assertIsInstance(path, Path)
+                self.assertTrue(path)
+                self.assertEqual(get_trace_distance(g, path), get_trace_distance(g, list(path)))
+            for failing in (["CCP", "PNC"], ["CDNP"], ["CCCDP"]):      # no dragon, walled off, too far
+                path = save_princess(failing, 3, compact=compact)
+                self.assertIsInstance(path, Path)
+                self.assertEqual(path, [])
+
+    def test_styles(self):
+        g = TerrainGraph(["CC0H", "CNCG", "CC0C"])
+        path = Path.from_nodes(g, [g.get_node(x, y) for x, y in ((0, 0), (1, 0), (2, 0), (2, 2), (1, 2), (0, 2),
+                                                                    (0, 1))])
+        self.assertEqual(format_path(path, 'minimal'), '(0,0)\n(1,0)\n(2,0)\n(2,2)\n(1,2)\n(0,2)\n(0,1)')
+        self.assertEqual(format_path(path, 'verbose'), '\n'.join(str(node) for node in path))
+        self.assertEqual(format_path(path, 'directions'), 'RRT(2,2)LLU')
+        self.assertEqual(format_path(path, 'rle'), 'R2T(2,2)L2U')
+        self.assertEqual(format_path(list(path), 'rle'), 'R2T(2,2)L2U')
+        self.assertRaises(ValueError, format_path, path, 'unknown')
+
+        f = io.StringIO()
+        write_path(path, 'rle', f)
+        self.assertEqual(f.getvalue(), 'R2T(2,2)L2U\n')
+        f = io.StringIO()
+        write_path(Path(g), 'rle', f)
+        self.assertEqual(f.getvalue(), '')
+
+
+if __name__ == '__main__':
+    unittest.main()
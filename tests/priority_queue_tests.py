@@ -0,0 +1,46 @@
+import unittest
+
+from priority_queue import PriorityQueue
+
+
+class PriorityQueueTests(unittest.TestCase):
+    def test_pop_in_priority_order(self):
+        pq = PriorityQueue()
+        pq.push('a', 5)
+        pq.push('b', 1)
+        pq.push('c', 3)
+        self.assertEqual([pq.pop(), pq.pop(), pq.pop()], [(1, 'b'), (3, 'c'), (5, 'a')])
+        self.assertFalse(pq)
+
+    def test_decrease_key(self):
+        pq = PriorityQueue()
+        pq.push('a', 5)
+        pq.push('b', 4)
+        self.assertTrue(pq.push('a', 2))
+        self.assertFalse(pq.push('b', 7))     # higher priority is ignored
+        self.assertEqual(len(pq), 2)
+        self.assertEqual(pq.priority('a'), 2)
+        self.assertEqual(pq.pop(), (2, 'a'))
+        self.assertEqual(pq.pop(), (4, 'b'))
+        self.assertRaises(IndexError, pq.pop)
+
+    def test_ties_are_popped_by_item_order(self):
+        pq = PriorityQueue()
+        for item in ['d', 'b', 'c', 'a']:
+            pq.push(item, 1)
+        self.assertEqual([pq.pop()[1] for _ in range(4)], ['a', 'b', 'c', 'd'])
+
+    def test_push_after_pop(self):
+        pq = PriorityQueue()
+        pq.push('a', 3)
+        pq.push('a', 1)
+        self.assertEqual(pq.pop(), (1, 'a'))
+        self.assertNotIn('a', pq)
+        pq.push('a', 3)
+        self.assertEqual(pq.peek(), (3, 'a'))
+        self.assertEqual(pq.pop(), (3, 'a'))
+        self.assertRaises(IndexError, pq.pop)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import itertools
+import random
+import unittest
+
+from main import TerrainGraph, CompactTerrainGraph, dijkstra, best_state, find_paths, save_princess
+from reachability import ReachabilityIndex
+from search_stats import SearchStats
+
+
+class ReachabilityTests(unittest.TestCase):
+    def assert_same_as_dijkstra(self, terrain, graph_classes=(TerrainGraph, CompactTerrainGraph)):
+        for graph_class in graph_classes:
+            g = graph_class(terrain)
+            index = ReachabilityIndex(g)
+            vertices = [g.vertex(g.get_node(x, y)) for y, line in enumerate(terrain) for x in range(len(line))]
+            for source in vertices:
+                for teleports_activated, generators_activate in itertools.product((False, True), repeat=2):
+                    distances, _ = dijkstra(g, source, set(), teleports_activated, generators_activate)
+                    for target in vertices:
+                        self.assertEqual(index.reachable(source, target, teleports_activated, generators_activate),
+                                         (target, False) in distances or (target, True) in distances)
+
+    def test_same_as_dijkstra(self):
+        rnd = random.Random(3)
+        for _ in range(20):
+            self.assert_same_as_dijkstra([''.join(rnd.choice('CCHNNN01G') for _ in range(7)) for _ in range(5)])
+
+    def test_teleport_only_route(self):
+        terrain = [
+            "G0N1C",
+            "CCNNN",
+            "NNN0P",
+            "1NNNN",
+        ]
+        self.assert_same_as_dijkstra(terrain)
+        g = CompactTerrainGraph(terrain)
+        index = ReachabilityIndex(g)
+        source, target = g.vertex(g.get_node(1, 1)), g.vertex(g.get_node(4, 2))
+        self.assertFalse(index.reachable(source, target, generators_activate=False))
+        self.assertTrue(index.reachable(source, target))
+        self.assertFalse(index.reachable(source, g.vertex(g.get_node(4, 0))))    # group '1' is cut off
+
+    def test_ragged_rows(self):
+        terrain = [
+            "CCCD",
+            "CN",
+            "CCCP",
+        ]
+        self.assert_same_as_dijkstra(terrain, (TerrainGraph,))     # compact graph needs rows of same width
+        g = TerrainGraph(terrain)
+        g.reachability = ReachabilityIndex(g)
+        self.assertEqual(save_princess(g, 10), save_princess(TerrainGraph(terrain), 10))
+        self.assertTrue(save_princess(g, 10))
+
+    def test_unreachable_targets_are_not_searched(self):
+        terrain = ["C" * 50 for _ in range(50)]
+        terrain[48] = "N" * 50
+        terrain[49] = "P" + "C" * 49
+        g = CompactTerrainGraph(terrain)
+        source, target = g.vertex(g.get_node(0, 0)), g.vertex(g.get_node(0, 49))
+        g.reachability = ReachabilityIndex(g)
+        stats = SearchStats()
+        self.assertEqual(find_paths(g, source, {target}, stats=stats), ({}, {}))
+        self.assertEqual(stats.counters['expanded'], 0)
+
+        wall = g.vertex(g.get_node(0, 48))
+        distances, _ = find_paths(g, source, {target, wall})
+        self.assertEqual(best_state(distances, wall)[1], 48)
+
+    def test_save_princess(self):
+        terrain = [
+            "CCCCC",
+            "CDCNN",
+            "CCCNP",
+            "CCCCN",
+        ]
+        for graph_class in (TerrainGraph, CompactTerrainGraph):
+            g = graph_class(terrain)
+            g.reachability = ReachabilityIndex(g)
+            stats = SearchStats()
+            self.assertEqual(save_princess(g, 10, stats=stats), [])
+            self.assertNotIn('princesses', stats.timings)
+            g.set_tile(4, 3, 'C')
+            self.assertIsNone(g.reachability)
+            g.reachability = ReachabilityIndex(g)
+            self.assertTrue(save_princess(g, 10))
+            g.set_tile(1, 1, 'C')
+            g.set_tile(2, 0, 'N')
+            g.set_tile(2, 1, 'N')
+            g.set_tile(2, 2, 'D')
+            g.set_tile(2, 3, 'N')
+            g.reachability = ReachabilityIndex(g)
+            self.assertEqual(save_princess(g, 10), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+
+from main import TerrainGraph, CompactTerrainGraph, find_paths, shortest_path_any, save_princess
+from search_stats import SearchStats
+
+
+class SearchStatsTests(unittest.TestCase):
+    terrain = [
+        "CNHC0H",
+        "CHNCGC",
+        "DN1HCC",
+        "CP0CC1",
+        "HHHNCP",
+    ]
+
+    def test_counters_of_search(self):
+        for search in ('dijkstra', 'astar', 'dial'):
+            g = CompactTerrainGraph(["CCG", "0N0"])
+            stats = SearchStats()
+            distances, _ = find_paths(g, g.vertex(g.get_node(0, 0)), {g.vertex(g.get_node(2, 1))}, search=search,
+                                      stats=stats)
+            counters = stats.counters
+            self.assertEqual(counters['searches'], 1)
+            self.assertEqual(counters['teleport_activations'], 1)
+            self.assertGreaterEqual(counters['pops'], counters['expanded'])
+            self.assertGreaterEqual(counters['pushes'], counters['expanded'])
+            self.assertGreaterEqual(counters['relaxations'], counters['pushes'] - 1)
+            self.assertLessEqual(counters['expanded'], len(distances))
+
+    def test_phases_of_save_princess(self):
+        stats = SearchStats()
+        path = save_princess(self.terrain, 10, stats=stats)
+        self.assertEqual(path, save_princess(self.terrain, 10))
+        self.assertEqual(set(stats.timings.keys()), {'build', 'dragon', 'princesses', 'search', 'trace'})
+        self.assertGreater(stats.counters['searches'], 1)
+
+    def test_cache_of_permutations(self):
+        stats = SearchStats()
+        save_princess(TerrainGraph(["CDPP", "CCPC"]), 10, tour='permutations', stats=stats)
+        # 3! orders of 3 legs, only 3 + 6 legs are different
+        self.assertEqual(stats.counters['cache_misses'], 9)
+        self.assertEqual(stats.counters['cache_hits'], 9)
+
+    def test_export(self):
+        stats = SearchStats()
+        g = TerrainGraph(["CCD"])
+        shortest_path_any(g.get_node(0, 0), {g.dragon}, g, stats=stats)
+        exported = stats.as_dict()
+        self.assertEqual(exported['counters']['expanded'], 3)
+        self.assertEqual(set(exported['timings'].keys()), {'search', 'trace'})
+        self.assertTrue(stats.log_line().startswith('searches=1 pushes=3 pops=3 relaxations='))
+
+
+if __name__ == '__main__':
+    unittest.main()
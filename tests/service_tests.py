@@ -0,0 +1,142 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import service
+from main import save_princess, get_trace_distance, TerrainGraph
+from paths import format_path
+from service import SolveService, request
+
+
+class BrokenExecutor(ThreadPoolExecutor):
+    def submit(self, *args, **kwargs):
+        raise RuntimeError('worker died')
+
+
+class ServiceTests(unittest.TestCase):
+    def run_client(self, solve_service, client, unix=False):
+        async def run():
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'service.sock') if unix else None
+                server = await solve_service.start(path)
+                async with server:
+                    if unix:
+                        reader, writer = await asyncio.open_unix_connection(path)
+                    else:
+                        reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+                    try:
+                        return await client(reader, writer)
+                    finally:
+                        writer.close()
+        try:
+            return asyncio.run(run())
+        finally:
+            solve_service.close()
+
+    def test_upload_and_solve(self):
+        terrain = [
+            "CCGCP",
+            "0NNNC",
+            "CNDN0",
+            "CCCCP",
+        ]
+        expected = save_princess(terrain, 10)
+
+        async def client(reader, writer):
+            map_id = (await request(reader, writer, {'op': 'upload', 'map': terrain}))['map_id']
+            return [await request(reader, writer, {'op': 'solve', 'map_id': map_id, 'turns': 10, 'style': style})
+                    for style in ('coords', 'minimal', 'verbose', 'rle')]
+
+        for unix in (False, True):
+            coords, minimal, verbose, rle = self.run_client(SolveService(workers=1), client, unix)
+            self.assertEqual(coords['turns'], get_trace_distance(TerrainGraph(terrain), expected))
+            self.assertEqual(coords['path'], [[node.x, node.y] for node in expected])
+            self.assertEqual(minimal['path'], ['({},{})'.format(node.x, node.y) for node in expected])
+            self.assertEqual(verbose['path'], [str(node) for node in expected])
+            self.assertEqual(rle['path'], format_path(expected, 'rle'))
+
+    def test_map_is_sent_only_to_cold_worker(self):
+        terrain = ["CDCP"]
+        solve_service = SolveService(executor=ThreadPoolExecutor(1))     # worker cache is in this process
+        service._worker_cache = None
+        map_id = solve_service.add_map(terrain)
+        self.assertIsNone(service._solve(map_id, None, 10, False, 'held_karp', 'dijkstra'))
+
+        async def client(reader, writer):
+            return await request(reader, writer, {'op': 'solve', 'map_id': map_id, 'turns': 10})
+
+        self.assertEqual(self.run_client(solve_service, client)['turns'], 3)
+        turns, path = service._solve(map_id, None, 10, False, 'held_karp', 'dijkstra')
+        self.assertEqual((turns, len(path)), (3, 4))
+
+    def test_batch_and_errors(self):
+        terrain = ["CDCP"]
+        no_dragon = ["CCP", "PNC"]
+
+        async def client(reader, writer):
+            map_id = solve_service.add_map(terrain)
+            solve = {'op': 'solve', 'map_id': map_id, 'turns': 10}
+            batch = await request(reader, writer, {'op': 'batch', 'requests': [
+                solve, solve, dict(solve, turns=1), dict(solve, map_id='x'), dict(solve, style='unknown'),
+                dict(solve, map_id=solve_service.add_map(no_dragon))]})
+            writer.write(b'not json\n')
+            invalid = await reader.readline()
+            unknown = await request(reader, writer, {'op': 'nothing'})
+            return batch, invalid, unknown
+
+        solve_service = SolveService(workers=1)
+        batch, invalid, unknown = self.run_client(solve_service, client)
+        results = batch['results']
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(results[0]['turns'], 3)
+        self.assertEqual(results[2], {'turns': None, 'path': []})
+        self.assertIn('KeyError', results[3]['error'])
+        self.assertIn('Unknown style', results[4]['error'])
+        self.assertEqual(results[5], {'turns': None, 'path': []})
+        self.assertIn(b'ValueError', invalid)
+        self.assertIn('Unknown op', unknown['error'])
+
+    def test_unexpected_error_gets_response(self):
+        async def client(reader, writer):
+            map_id = (await request(reader, writer, {'op': 'upload', 'map': ["CDCP"]}))['map_id']
+            failed = await request(reader, writer, {'op': 'solve', 'map_id': map_id, 'turns': 10})
+            uploaded = await request(reader, writer, {'op': 'upload', 'map': ["CCDP"]})
+            return failed, uploaded
+
+        failed, uploaded = self.run_client(SolveService(executor=BrokenExecutor(1)), client)
+        self.assertEqual(failed, {'error': 'RuntimeError: worker died'})
+        self.assertIn('map_id', uploaded)
+
+    def test_concurrent_clients(self):
+        terrain = [
+            "CCHP",
+            "CNNC",
+            "PCDH",
+        ]
+        solve_service = SolveService(workers=2)
+
+        async def run():
+            server = await solve_service.start()
+            map_id = solve_service.add_map(terrain)
+            async with server:
+                async def client():
+                    reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+                    try:
+                        return await request(reader, writer, {'op': 'solve', 'map_id': map_id, 'turns': 10,
+                                                              'tour': 'permutations'})
+                    finally:
+                        writer.close()
+                return await asyncio.gather(*(client() for _ in range(5)))
+
+        try:
+            results = asyncio.run(run())
+        finally:
+            solve_service.close()
+        self.assertTrue(all(result == results[0] for result in results))
+        self.assertEqual(results[0]['turns'], get_trace_distance(TerrainGraph(terrain), save_princess(terrain, 10)))
+
+
+if __name__ == '__main__':
+    unittest.main()
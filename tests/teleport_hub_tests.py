@@ -0,0 +1,45 @@
+import unittest
+
+from main import TerrainGraph, CompactTerrainGraph, Node, shortest_path_all, get_trace_distance
+
+
+class TeleportHubTests(unittest.TestCase):
+    terrain = [
+        "G0C1",
+        "0CC0",
+        "C1C0"
+    ]
+
+    def test_groups_and_hubs(self):
+        g = TerrainGraph(self.terrain)
+        self.assertEqual(set(g.teleports.keys()), {'0', '1'})
+        self.assertEqual(len(g.teleports['0']), 4)
+        self.assertEqual(len(g.hubs), 2)
+        # tile is connected only with hub of its group, not with every other tile
+        self.assertEqual(list(g.neighbours(g.get_node(1, 0), True))[-1], (g.hubs['0'], 0))
+        self.assertEqual(len(list(g.neighbours(g.hubs['0']))), 4)
+
+    def test_get_neighbours_contains_teleport_exits(self):
+        for graph_class in (TerrainGraph, CompactTerrainGraph):
+            g = graph_class(self.terrain)
+            neighbours = g.get_neighbours(g.get_node(3, 2), True)
+            self.assertEqual(neighbours, {Node('0', 3, 1): 0, Node('C', 2, 2): 1, Node('0', 1, 0): 0,
+                                          Node('0', 0, 1): 0})
+            self.assertEqual(g.get_distance_to_neighbour(g.get_node(3, 2), g.get_node(0, 1), True), 0)
+            self.assertEqual(g.get_distance_to_neighbour(g.get_node(3, 2), g.get_node(0, 1), False),
+                             TerrainGraph.FOOT_DISTANCE['N'])
+
+    def test_hubs_are_not_in_traces(self):
+        for graph_class in (TerrainGraph, CompactTerrainGraph):
+            g = graph_class(self.terrain)
+            trace, distance, teleport_activated = shortest_path_all(g.get_node(0, 0), {g.get_node(1, 2)}, g)[
+                g.get_node(1, 2)]
+            # G -> 0 -> teleport 0 -> 1 -> teleport 1
+            self.assertEqual((distance, teleport_activated), (2, True))
+            self.assertEqual(len(trace), 5)
+            self.assertTrue(all(0 <= node.x < 4 and 0 <= node.y < 3 for node in trace))
+            self.assertEqual(get_trace_distance(g, trace), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import os
+import random
+import tempfile
+import unittest
+
+import binary_map
+from main import CompactTerrainGraph
+from terrain_generator import generate_random_terrain, place_key_tiles, symbol_table, write_terrain
+
+
+class TerrainGeneratorTests(unittest.TestCase):
+    def test_generate_random_terrain(self):
+        terrain = generate_random_terrain(30, 20, 4, 0.05, 2, random.Random(3))
+        self.assertEqual(terrain, generate_random_terrain(30, 20, 4, 0.05, 2, random.Random(3)))
+        self.assertNotEqual(terrain, generate_random_terrain(30, 20, 4, 0.05, 2, random.Random(4)))
+        self.assertEqual(len(terrain), 20)
+        self.assertTrue(all(len(line) == 30 for line in terrain))
+        text = ''.join(terrain)
+        self.assertEqual(text.count('D'), 1)
+        self.assertEqual(text.count('P'), 4)
+        self.assertEqual(text.count('G'), 2)
+        self.assertEqual(sum(text.count(digit) for digit in '0123456789'), 30)
+        self.assertEqual(set(text) - set('CHNDPG0123456789'), set())
+
+    def test_key_tiles(self):
+        key_tiles = place_key_tiles(10, 10, random.Random(0), princesses=5, dragons=0, generators=3,
+                                    teleport_density=0.2, teleport_groups=2)
+        self.assertNotIn(ord('D'), key_tiles)
+        self.assertEqual(set(key_tiles), set(b'PG01'))
+        indexes = [index for group in key_tiles.values() for index in group]
+        self.assertEqual(len(indexes), 28)
+        self.assertEqual(len(set(indexes)), 28)
+        self.assertRaises(ValueError, place_key_tiles, 2, 2, random.Random(0), princesses=4)
+        self.assertRaises(ValueError, place_key_tiles, 2, 2, random.Random(0), teleport_groups=11)
+
+    def test_symbol_table(self):
+        table = symbol_table({'C': 1, 'H': 0, 'N': 3})
+        self.assertEqual(len(table), 256)
+        self.assertEqual(table.count(b'C'), 64)
+        self.assertEqual(table.count(b'N'), 192)
+
+    def test_write_terrain(self):
+        with tempfile.TemporaryDirectory() as directory:
+            text_file = os.path.join(directory, 'map.txt')
+            binary_file = os.path.join(directory, 'map' + binary_map.EXTENSION)
+            parameters = dict(seed=5, princesses=3, generators=2, teleport_density=0.02)
+            write_terrain(text_file, 40, 30, **parameters)
+            write_terrain(binary_file, 40, 30, **parameters)
+
+            expected = CompactTerrainGraph.from_file(text_file)
+            g = binary_map.load(binary_file)
+            self.assertEqual((g.width, g.height), (40, 30))
+            self.assertEqual(bytes(g.tiles), bytes(expected.tiles))
+            self.assertEqual(g.dragon, expected.dragon)
+            self.assertEqual(g.princesses, expected.princesses)
+            self.assertEqual(g.generators, expected.generators)
+            self.assertEqual(g.teleports, expected.teleports)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,7 +2,7 @@ import unittest
 
 import sys
 
-from main import shortest_path_all, TerrainGraph, Node
+from main import shortest_path_all, save_princess, TerrainGraph, Node
 
 
 class Tests(unittest.TestCase):
@@ -56,10 +56,36 @@ class Tests(unittest.TestCase):
         paths = shortest_path_all(source, destinations, g, False)
 
         expected = {}
-        self.add_to_expected(expected, g, [(0, 0), (0, 1), (3, 3), (2, 3)], 3, True)
+        self.add_to_expected(expected, g, [(0, 0), (0, 1), (3, 3), (2, 3)], 2, True)
 
         self.assertEqual(expected, paths)
 
+    def test_teleport_detour_through_generator(self):
+        terrain = [
+            "C0HHC",
+            "GNNNC",
+            "CCCC0"
+        ]
+        g = TerrainGraph(terrain)
+        source = g.get_node(0, 0)
+        destinations = {g.get_node(4, 0), g.get_node(1, 0)}
+        paths = shortest_path_all(source, destinations, g, False)
+
+        expected = {}
+        self.add_to_expected(expected, g, [(0, 0), (0, 1), (0, 0), (1, 0), (4, 2), (4, 1), (4, 0)], 5, True)
+        self.add_to_expected(expected, g, [(0, 0), (1, 0)], 1, False)
+
+        self.assertEqual(expected, paths)
+
+    def test_graph_is_not_changed(self):
+        terrain = [
+            "G0C0"
+        ]
+        g = TerrainGraph(terrain)
+        edges = {node: dict(neighbours) for node, neighbours in g.edges.items()}
+        shortest_path_all(g.get_node(0, 0), {g.get_node(2, 0)}, g, False)
+        self.assertEqual(edges, g.edges)
+
     def test_unreachable(self):
         terrain = [
             "CN",
@@ -74,6 +100,16 @@ class Tests(unittest.TestCase):
 
         self.assertEqual(expected, paths)
 
+    def test_save_princess_without_dragon(self):
+        terrain = [
+            "CCH",
+            "PNC",
+            "CCP"
+        ]
+        for compact in (False, True):
+            self.assertEqual(save_princess(terrain, 100, compact=compact), [])
+            self.assertEqual(save_princess(terrain, 100, compact=compact, tour='permutations'), [])
+
     def construct_expected_path(self, graph, coords):
         expected_path = []
         for coord in coords: